@@ -14,10 +14,12 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 
-from ovs.dal.hybrids.albanode import AlbaNode
-from ovs.dal.lists.albanodelist import AlbaNodeList
 from ovs.extensions.generic.logger import Logger
 from ..helpers.ci_constants import CIConstants
+from ..helpers.lazy import LazyImport
+
+AlbaNode = LazyImport('ovs.dal.hybrids.albanode', 'AlbaNode')
+AlbaNodeList = LazyImport('ovs.dal.lists.albanodelist', 'AlbaNodeList')
 
 
 class AlbaNodeHelper(CIConstants):
@@ -29,7 +31,7 @@ class AlbaNodeHelper(CIConstants):
     IGNORE_KEYS = ('_error', '_duration', '_version', '_success')
 
     @classmethod
-    def _map_alba_nodes(cls, *args, **kwargs):
+    def map_alba_nodes(cls, *args, **kwargs):
         """
         Will map the alba_node_id with its guid counterpart and return the map dict
         """
@@ -72,7 +74,7 @@ class AlbaNodeHelper(CIConstants):
     @staticmethod
     def get_disk_by_ip(ip, diskname):
         albanode = AlbaNodeHelper.get_albanode_by_ip(ip)
-        mapping = AlbaNodeHelper._map_node_disks(albanode)
+        mapping = AlbaNodeHelper.map_node_disks(albanode)
         if diskname in mapping:
             return {"diskname": diskname,
                     "aliases": mapping[diskname]
@@ -81,7 +83,14 @@ class AlbaNodeHelper(CIConstants):
             raise KeyError('Did not find disk {0} in the mapping for albanode with ip {1}. Currently mapped {2}'.format(diskname, ip, mapping))
 
     @staticmethod
-    def _map_node_disks(albanode):
+    def map_node_disks(albanode):
+        """
+        Map the disks of an alba node to their aliases, as reported by the stack of the node
+        :param albanode: alba node
+        :type albanode: ovs.dal.hybrids.albanode.AlbaNode
+        :return: aliases mapped by disk name (e.g. sdb)
+        :rtype: dict
+        """
         mapping = {}
         stack = albanode.client.get_stack()
         for slot_id, slot_info in stack.iteritems():
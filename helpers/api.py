@@ -22,12 +22,13 @@ import time
 import urllib
 import hashlib
 import logging
-import requests
 from requests.packages.urllib3 import disable_warnings
 from requests.packages.urllib3.exceptions import InsecurePlatformWarning
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 from requests.packages.urllib3.exceptions import SNIMissingWarning
 from ovs.extensions.generic.logger import Logger
+from ..helpers.instrumentation import Instrumentation
+from ..helpers.transport import RequestsTransport
 logging.getLogger('urllib3').setLevel(logging.WARNING)
 
 
@@ -67,14 +68,16 @@ class OVSClient(object):
     Represents the OVS client
     """
     _logger = Logger('helpers-api')
+    _default_transport = None
 
     disable_warnings(InsecurePlatformWarning)
     disable_warnings(InsecureRequestWarning)
     disable_warnings(SNIMissingWarning)
 
-    def __init__(self, ip, username, password, verify=False, version='*', port=None, raw_response=False):
+    def __init__(self, ip, username, password, verify=False, version='*', port=None, raw_response=False, transport=None):
         """
         Initializes the object with credentials and connection information
+        :param transport: executes the requests (see helpers.transport). Defaults to the default transport
         """
         if username is None and password is None:
             raise RuntimeError('Credentials should be None (no authentication) or a tuple containing username and client_secret (authenticated)')
@@ -88,22 +91,34 @@ class OVSClient(object):
         self._verify = verify
         self._version = version
         self._raw_response = raw_response
+        self._transport = transport or OVSClient._default_transport or RequestsTransport()
         try:
             from ovs.extensions.storage.volatilefactory import VolatileFactory
             self._volatile_client = VolatileFactory.get_client()
         except ImportError:
             self._volatile_client = None
 
+    @staticmethod
+    def set_default_transport(transport):
+        """
+        Change the transport of all clients created afterwards, eg to record or replay the API traffic
+        :param transport: transport to use. None restores the RequestsTransport
+        :type transport: ci.api_lib.helpers.transport.RequestsTransport
+        :return: None
+        """
+        OVSClient._default_transport = transport
+
     def _connect(self):
         """
         Authenticates to the api
         """
         headers = {'Accept': 'application/json',
                    'Authorization': 'No Auth'}
-        raw_response = requests.post(url='{0}/oauth2/token/'.format(self._url),
-                                     data={'grant_type': 'password', 'username': self.username, 'password': self.password},
-                                     headers=headers,
-                                     verify=self._verify)
+        raw_response = self._transport.request('POST',
+                                               url='{0}/oauth2/token/'.format(self._url),
+                                               data={'grant_type': 'password', 'username': self.username, 'password': self.password},
+                                               headers=headers,
+                                               verify=self._verify)
 
         try:
             response = self._process(response=raw_response, overrule_raw=True)
@@ -185,17 +200,18 @@ class OVSClient(object):
             else:
                 raise HttpException(status_code, message)
 
-    def _call(self, api, params, func, **kwargs):
+    def _call(self, api, params, method, **kwargs):
         if not api.endswith('/'):
             api = '{0}/'.format(api)
         if not api.startswith('/'):
             api = '/{0}'.format(api)
+        Instrumentation.count(Instrumentation.API_CALLS)
         if self._volatile_client is not None:
             self._token = self._volatile_client.get(self._key)
         first_connect = self._token is None
         headers, _url = self._prepare(params=params)
         try:
-            return self._process(func(url=_url.format(api), headers=headers, verify=self._verify, **kwargs))
+            return self._process(self._transport.request(method, url=_url.format(api), headers=headers, verify=self._verify, **kwargs))
         except ForbiddenException:
             if self._volatile_client is not None:
                 self._volatile_client.delete(self._key)
@@ -203,7 +219,7 @@ class OVSClient(object):
                 raise
             self._token = None
             headers, _url = self._prepare(params=params)
-            return self._process(func(url=_url.format(api), headers=headers, verify=self._verify, **kwargs))
+            return self._process(self._transport.request(method, url=_url.format(api), headers=headers, verify=self._verify, **kwargs))
         except Exception:
             if self._volatile_client is not None:
                 self._volatile_client.delete(self._key)
@@ -214,7 +230,7 @@ class OVSClient(object):
         Executes a DELETE call
         :param api: Specification for to fill out in the URL, eg: /alba/backends/<albabackend_guid>
         """
-        return self._call(api=api, params={}, func=requests.delete)
+        return self._call(api=api, params={}, method='DELETE')
 
     def get(self, api, params=None):
         """
@@ -222,7 +238,7 @@ class OVSClient(object):
         :param api: Specification for to fill out in the URL, eg: /vpools/<vpool_guid>/shrink_vpool
         :param params: Additional query parameters, eg: _dynamics
         """
-        return self._call(api=api, params=params, func=requests.get)
+        return self._call(api=api, params=params, method='GET')
 
     def post(self, api, data=None, params=None):
         """
@@ -231,7 +247,7 @@ class OVSClient(object):
         :param data: Data to post
         :param params: Additional query parameters, eg: _dynamics
         """
-        return self._call(api=api, params=params, func=requests.post, data=self._to_json(data))
+        return self._call(api=api, params=params, method='POST', data=self._to_json(data))
 
     def put(self, api, data=None, params=None):
         """
@@ -240,7 +256,7 @@ class OVSClient(object):
         :param data: Data to put
         :param params: Additional query parameters, eg: _dynamics
         """
-        return self._call(api=api, params=params, func=requests.put, data=self._to_json(data))
+        return self._call(api=api, params=params, method='PUT', data=self._to_json(data))
 
     def patch(self, api, data=None, params=None):
         """
@@ -249,8 +265,9 @@ class OVSClient(object):
         :param data: Data to patch
         :param params: Additional query parameters, eg: _dynamics
         """
-        return self._call(api=api, params=params, func=requests.patch, data=self._to_json(data))
+        return self._call(api=api, params=params, method='PATCH', data=self._to_json(data))
 
+    @Instrumentation.instrument('OVSClient.wait_for_task', timer=Instrumentation.TASK_WAIT)
     def wait_for_task(self, task_id, timeout=None):
         """
         Waits for a task to complete
@@ -277,7 +294,7 @@ class OVSClient(object):
                     previous_metadata = task_metadata
                 else:
                     OVSClient._logger.debug('Still waiting for task {0}...'.format(task_id))
-                time.sleep(1)
+                self._transport.sleep(1)
             else:
                 OVSClient._logger.debug('Task {0} finished, got: {1}'.format(task_id, task_metadata))
                 return task_metadata['successful'], task_metadata['result']
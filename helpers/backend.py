@@ -14,13 +14,17 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 
-from ovs.dal.hybrids.albabackend import AlbaBackend
-from ovs.dal.lists.albabackendlist import AlbaBackendList
-from ovs.dal.lists.backendlist import BackendList
-from ovs.dal.lists.backendtypelist import BackendTypeList
 from ovs.extensions.generic.logger import Logger
+from ..helpers.albanode import AlbaNodeHelper
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..helpers.exceptions import PresetNotFoundError, AlbaBackendNotFoundError
+from ..helpers.lazy import LazyImport
+
+AlbaBackend = LazyImport('ovs.dal.hybrids.albabackend', 'AlbaBackend')
+AlbaBackendList = LazyImport('ovs.dal.lists.albabackendlist', 'AlbaBackendList')
+BackendList = LazyImport('ovs.dal.lists.backendlist', 'BackendList')
+BackendTypeList = LazyImport('ovs.dal.lists.backendtypelist', 'BackendTypeList')
 
 
 class BackendHelper(CIConstants):
@@ -121,13 +125,16 @@ class BackendHelper(CIConstants):
         :rtype: ovs.dal.hybrids.albabackend
         """
 
-        try:
-            return [alba_backend for alba_backend in AlbaBackendList.get_albabackends()
-                    if alba_backend.name == albabackend_name][0]
-        except IndexError:
+        albabackend_guid = IndexCache.lookup(IndexCache.ALBABACKEND_BY_NAME, BackendHelper._build_albabackend_index, albabackend_name)
+        if albabackend_guid is None:
             error_msg = "No Alba backend found with name: {0}".format(albabackend_name)
             BackendHelper.LOGGER.error(error_msg)
             raise NameError(error_msg)
+        return AlbaBackend(albabackend_guid)
+
+    @staticmethod
+    def _build_albabackend_index():
+        return dict((alba_backend.name, alba_backend.guid) for alba_backend in AlbaBackendList.get_albabackends())
 
     @classmethod
     def get_asd_safety(cls, albabackend_guid, asd_id, *args, **kwargs):
@@ -233,3 +240,50 @@ class BackendHelper(CIConstants):
             else:
                 return found_aliases[0].rsplit('/', 1)[-1]
         raise RuntimeError('Could not find a suitable disk alias to use. Only looking for {0} and object has {1}'.format(alias_prefixes, disk_object))
+
+    @classmethod
+    def get_claimed_osds(cls, albabackend_name):
+        """
+        Map the ASDs claimed by a local backend the way setup.json does
+        :param albabackend_name: name of a local alba backend
+        :type albabackend_name: str
+        :return: amount of ASDs per disk name, mapped by ip of the ASD manager
+        :rtype: dict
+        """
+        return cls.get_claimed_osds_per_backend([albabackend_name])[albabackend_name]
+
+    @classmethod
+    def get_claimed_osds_per_backend(cls, albabackend_names):
+        """
+        Map the ASDs claimed by multiple local backends the way setup.json does
+        The alba nodes and their disks are only fetched once for all backends
+        :param albabackend_names: names of local alba backends
+        :type albabackend_names: list
+        :return: amount of ASDs per disk name, mapped by ip of the ASD manager, mapped by backend name
+        :rtype: dict
+        """
+        if len(albabackend_names) == 0:
+            return {}
+        alba_nodes = AlbaNodeHelper.map_alba_nodes()
+        node_disknames = {}  # alba node id -> (alba node, disk name per alias)
+        claimed_osds = {}
+        for albabackend_name in albabackend_names:
+            osds = claimed_osds.setdefault(albabackend_name, {})
+            local_stack = cls.get_backend_local_stack(albabackend_name=albabackend_name)['local_stack']
+            for alba_node_id, alba_node_guid in alba_nodes.iteritems():
+                node_stack = dict((disk_alias, disk_info) for disk_alias, disk_info in local_stack.get(alba_node_id, {}).iteritems()
+                                  if len(disk_info.get('osds', {})) > 0)
+                if len(node_stack) == 0:
+                    continue
+                if alba_node_id not in node_disknames:
+                    albanode = AlbaNodeHelper.get_albanode(alba_node_guid)
+                    node_disknames[alba_node_id] = (albanode, dict((alias.rsplit('/', 1)[-1], diskname)
+                                                                   for diskname, aliases in AlbaNodeHelper.map_node_disks(albanode).iteritems()
+                                                                   for alias in aliases))
+                albanode, disknames = node_disknames[alba_node_id]
+                for disk_alias, disk_info in node_stack.iteritems():
+                    if disk_alias not in disknames:
+                        cls.LOGGER.warning('Could not map {0} on alba node {1} to a disk'.format(disk_alias, albanode.ip))
+                        continue
+                    osds.setdefault(albanode.ip, {})[disknames[disk_alias]] = len(disk_info['osds'])
+        return claimed_osds
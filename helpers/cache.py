@@ -0,0 +1,157 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+from threading import RLock
+from ovs.extensions.generic.logger import Logger
+
+
+class IndexCache(object):
+    """
+    Process-wide, TTL-bounded cache of lookup indexes over the model (eg name -> guid)
+    Indexes only hold guids and names so lookups still return fresh DAL objects.
+    Modules creating or deleting model objects invalidate the affected indexes.
+    Every index is built under its own lock, so building one index does not block lookups in the others.
+    """
+    LOGGER = Logger('helpers-ci_index_cache')
+    DEFAULT_TTL = 60  # Seconds an index stays valid
+
+    # Index names
+    ALBABACKEND_BY_NAME = 'albabackend_by_name'
+    DOMAIN_BY_NAME = 'domain_by_name'
+    ROLE_INVENTORY = 'role_inventory'
+    STORAGEDRIVERS_BY_DOMAIN = 'storagedrivers_by_domain'
+
+    _indexes = {}  # Index name -> (time the build started, index)
+    _generations = {}  # Index name -> amount of invalidations. An index built during an invalidation is not stored
+    _build_locks = {}
+    _lock = RLock()
+    _statistics = {}
+
+    def __init__(self):
+        pass
+
+    @classmethod
+    def _count(cls, name, counter):
+        statistics = cls._statistics.setdefault(name, {'hits': 0, 'misses': 0, 'invalidations': 0, 'fallbacks': 0})
+        statistics[counter] += 1
+
+    @classmethod
+    def _get_build_lock(cls, name):
+        with cls._lock:
+            if name not in cls._build_locks:
+                cls._build_locks[name] = RLock()
+            return cls._build_locks[name]
+
+    @classmethod
+    def get(cls, name, builder, ttl=DEFAULT_TTL, refresh=False):
+        """
+        Fetch an index, (re)building it when it is missing or expired
+        :param name: name of the index
+        :type name: str
+        :param builder: function building the index
+        :type builder: callable
+        :param ttl: seconds a built index stays valid
+        :type ttl: int
+        :param refresh: force a rebuild of the index
+        :type refresh: bool
+        :return: the index
+        :rtype: dict
+        """
+        requested = time.time()
+        with cls._lock:
+            entry = cls._indexes.get(name)
+            if entry is not None and refresh is False and requested - entry[0] <= ttl:
+                cls._count(name, 'hits')
+                return entry[1]
+        with cls._get_build_lock(name):
+            with cls._lock:
+                # The index might have been built by another thread in the meantime
+                entry = cls._indexes.get(name)
+                if entry is not None and (entry[0] >= requested or (refresh is False and time.time() - entry[0] <= ttl)):
+                    cls._count(name, 'hits')
+                    return entry[1]
+                cls._count(name, 'misses')
+                generation = cls._generations.get(name, 0)
+            start = time.time()
+            index = builder()
+            with cls._lock:
+                if cls._generations.get(name, 0) == generation:
+                    cls._indexes[name] = (start, index)
+            return index
+
+    @classmethod
+    def lookup(cls, name, builder, key, ttl=DEFAULT_TTL, fallback=None):
+        """
+        Look up a key in an index. A missing key triggers a single rebuild, as the object might have been created since
+        When a fallback is given, a missing key is resolved by the fallback instead of rebuilding the whole index,
+        so polling for an object which does not exist yet stays cheap. The index is dropped when the fallback finds it
+        :param name: name of the index
+        :type name: str
+        :param builder: function building the index
+        :type builder: callable
+        :param key: key to look up
+        :param ttl: seconds a built index stays valid
+        :type ttl: int
+        :param fallback: function resolving a single missing key, returning None when the object does not exist
+        :type fallback: callable
+        :return: the value or None when the key is not present
+        """
+        index = cls.get(name, builder, ttl=ttl)
+        if key in index:
+            return index[key]
+        if fallback is None:
+            return cls.get(name, builder, ttl=ttl, refresh=True).get(key)
+        with cls._lock:
+            cls._count(name, 'fallbacks')
+        value = fallback(key)
+        if value is not None:
+            cls.invalidate(name)
+        return value
+
+    @classmethod
+    def invalidate(cls, *names):
+        """
+        Drop indexes so they are rebuilt on their next use
+        :param names: names of the indexes to drop. All indexes are dropped when none are given
+        :return: None
+        """
+        with cls._lock:
+            if len(names) == 0:
+                names = set(cls._indexes.keys() + cls._build_locks.keys())
+            for name in names:
+                cls._generations[name] = cls._generations.get(name, 0) + 1
+                if cls._indexes.pop(name, None) is not None:
+                    cls.LOGGER.debug('Invalidated index {0}'.format(name))
+                    cls._count(name, 'invalidations')
+
+    @classmethod
+    def get_statistics(cls):
+        """
+        Fetch the hits, misses, invalidations and fallbacks per index
+        :return: statistics mapped by index name
+        :rtype: dict
+        """
+        with cls._lock:
+            return dict((name, dict(statistics)) for name, statistics in cls._statistics.iteritems())
+
+    @classmethod
+    def reset_statistics(cls):
+        """
+        Reset all counters
+        :return: None
+        """
+        with cls._lock:
+            cls._statistics.clear()
@@ -13,31 +13,129 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
-import json
+import os
+import time
+from threading import RLock
+from ovs.extensions.generic.logger import Logger
 from ci.api_lib.helpers.api import OVSClient
+from ci.api_lib.validate.schema import SetupSchema
+
+logger = Logger('helpers-ci_constants')
 
 
 class CIConstants(object):
     """
     Collection of multiple constants and constant related instances
+    The setup config is only read on first use and is read again when the file changes
+    An invalid config is only refused on first use. Afterwards, the last valid config is kept until the file is fixed
     """
 
     CONFIG_LOC = "/opt/OpenvStorage/ci/config/setup.json"
     TEST_SCENARIO_LOC = "/opt/OpenvStorage/ci/scenarios/"
     TESTRAIL_LOC = "/opt/OpenvStorage/ci/config/testrail.json"
+    CONFIG_CHECK_INTERVAL = 1  # Minimum amount of seconds between two checks of the modification time of the config file
 
-    with open(CONFIG_LOC, 'r') as JSON_CONFIG:
-        SETUP_CFG = json.load(JSON_CONFIG)
-
-    HYPERVISOR_INFO = SETUP_CFG['ci'].get('hypervisor')
-    DOMAIN_INFO = SETUP_CFG['setup']['domains']
-    BACKEND_INFO = SETUP_CFG['setup']['backends']
-    STORAGEROUTER_INFO = SETUP_CFG['setup']['storagerouters']
+    # source: path, dict or callable to load the config from instead of CONFIG_LOC
+    _config_state = {'source': None, 'config': None, 'mtime': None, 'checked': 0}
+    _config_lock = RLock()
 
     class classproperty(property):
         def __get__(self, cls, owner):
             return classmethod(self.fget).__get__(None, owner)()
 
+    @staticmethod
+    def set_config_source(source):
+        """
+        Change where the config is loaded from. The config is loaded again on its next use
+        :param source: path to a json file, the config itself or a callable returning the config. None restores CONFIG_LOC
+        :type source: str or dict or callable
+        :return: None
+        """
+        with CIConstants._config_lock:
+            CIConstants._config_state.update({'source': source, 'config': None, 'mtime': None})
+
+    @staticmethod
+    def _get_config_path():
+        source = CIConstants._config_state['source']
+        if source is None:
+            return CIConstants.CONFIG_LOC
+        if isinstance(source, basestring):
+            return source
+        return None
+
+    @staticmethod
+    def reload():
+        """
+        Load the config from its source and validate it against the setup.json schema
+        When a valid config was loaded before, an invalid one is logged and the last valid config is kept
+        :raises RuntimeError: when no valid config was loaded yet and the config is invalid, listing all problems
+        :raises ValueError: when no valid config was loaded yet and the config file is not valid JSON
+        :return: the config
+        :rtype: dict
+        """
+        with CIConstants._config_lock:
+            state = CIConstants._config_state
+            path = CIConstants._get_config_path()
+            mtime = None if path is None else os.stat(path).st_mtime
+            try:
+                if path is not None:
+                    config = SetupSchema.load(path)
+                else:
+                    source = state['source']
+                    config = source() if callable(source) else source
+                    SetupSchema.validate(config)
+            except (RuntimeError, ValueError) as ex:
+                if state['config'] is None:
+                    raise
+                # Eg a file which is being edited. It is read again once it changes
+                logger.error('Keeping the last valid config, the new config is invalid: {0}'.format(ex))
+                state.update({'mtime': mtime, 'checked': time.time()})
+                return state['config']
+            state.update({'config': config, 'mtime': mtime, 'checked': time.time()})
+            return config
+
+    @staticmethod
+    def get_config():
+        """
+        Fetch the config, loading it when it was not loaded yet or when its file has been modified since
+        :return: the config
+        :rtype: dict
+        """
+        state = CIConstants._config_state
+        config = state['config']
+        if config is not None:
+            if state['mtime'] is None or time.time() - state['checked'] < CIConstants.CONFIG_CHECK_INTERVAL:
+                return config
+            path = CIConstants._get_config_path()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                return config  # Keep using the last known config while the file is being replaced
+            state['checked'] = time.time()
+            if mtime == state['mtime']:
+                return config
+        return CIConstants.reload()
+
+    @classproperty
+    def SETUP_CFG(cls):
+        return cls.get_config()
+
+    @classproperty
+    def HYPERVISOR_INFO(cls):
+        return cls.get_config()['ci'].get('hypervisor')
+
+    @classproperty
+    def DOMAIN_INFO(cls):
+        return cls.get_config()['setup']['domains']
+
+    @classproperty
+    def BACKEND_INFO(cls):
+        return cls.get_config()['setup']['backends']
+
+    @classproperty
+    def STORAGEROUTER_INFO(cls):
+        return cls.get_config()['setup']['storagerouters']
+
     @classproperty
     def api(cls):
         return OVSClient(cls.SETUP_CFG['ci']['grid_ip'],
@@ -0,0 +1,288 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import Queue
+from ovs.extensions.generic.logger import Logger
+from ..helpers.thread import ThreadHelper
+
+
+class DAGNode(object):
+    """
+    Single step of a DAGExecutor
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    SUCCESS = 'SUCCESS'
+    FAILED = 'FAILED'
+    SKIPPED = 'SKIPPED'
+
+    def __init__(self, name, target, args=(), kwargs=None, dependencies=None, resource=None):
+        """
+        :param name: unique name of the step
+        :type name: str
+        :param target: function to execute
+        :type target: callable
+        :param args: positional arguments of the target
+        :type args: tuple
+        :param kwargs: keyword arguments of the target
+        :type kwargs: dict
+        :param dependencies: names of the steps which have to succeed before this step can start
+        :type dependencies: list
+        :param resource: steps sharing a resource never run simultaneously (eg a storagerouter ip)
+        :type resource: str
+        """
+        self.name = name
+        self.target = target
+        self.args = tuple(args)
+        self.kwargs = kwargs or {}
+        self.dependencies = list(dependencies or [])
+        self.resource = resource
+        self.status = DAGNode.PENDING
+        self.result = None
+        self.error = None
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0
+        return self.end - self.start
+
+
+class DAGExecutor(object):
+    """
+    Executes steps in dependency order, running independent steps concurrently on a bounded amount of workers
+    """
+    LOGGER = Logger('helpers-ci_dag_executor')
+
+    def __init__(self, max_workers=10, logger=LOGGER):
+        """
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :param logger: logging instance
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers should be at least 1')
+        self.max_workers = max_workers
+        self.logger = logger
+        self.nodes = {}
+        self._order = []
+        self._start = None
+        self._end = None
+
+    def add(self, name, target, args=(), kwargs=None, dependencies=None, resource=None):
+        """
+        Add a step. See DAGNode for the parameters
+        :return: the name of the step, so it can be used as a dependency
+        :rtype: str
+        """
+        if name in self.nodes:
+            raise ValueError('Step {0} has already been added'.format(name))
+        self.nodes[name] = DAGNode(name, target, args=args, kwargs=kwargs, dependencies=dependencies, resource=resource)
+        self._order.append(name)
+        return name
+
+    def restrict(self, names):
+        """
+        Drop all steps except the given ones. Dependencies on dropped steps are considered to be fulfilled
+        :param names: names of the steps to keep
+        :type names: list
+        :return: None
+        """
+        names = set(names)
+        unknown = names.difference(self.nodes)
+        if len(unknown) > 0:
+            raise ValueError('Unknown step(s) {0}'.format(', '.join(sorted(unknown))))
+        for name in self.nodes.keys():
+            if name not in names:
+                self.nodes.pop(name)
+        for node in self.nodes.itervalues():
+            node.dependencies = [dependency for dependency in node.dependencies if dependency in names]
+        self._order = [name for name in self._order if name in names]
+
+    def get_topological_order(self):
+        """
+        Order the steps so every step comes after its dependencies
+        :raises ValueError: when a dependency is unknown or the dependencies contain a cycle
+        :return: names of the steps
+        :rtype: list
+        """
+        for node in self.nodes.itervalues():
+            unknown = [dependency for dependency in node.dependencies if dependency not in self.nodes]
+            if len(unknown) > 0:
+                raise ValueError('Step {0} depends on unknown step(s) {1}'.format(node.name, ', '.join(unknown)))
+        order = []
+        visited = {}  # name -> True when done, False while visiting
+
+        def _visit(name, path):
+            if visited.get(name) is True:
+                return
+            if visited.get(name) is False:
+                raise ValueError('Dependency cycle detected: {0}'.format(' -> '.join(path + [name])))
+            visited[name] = False
+            for dependency in self.nodes[name].dependencies:
+                _visit(dependency, path + [name])
+            visited[name] = True
+            order.append(name)
+
+        for step_name in self._order:
+            _visit(step_name, [])
+        return order
+
+    def _get_dependents(self):
+        dependents = dict((name, []) for name in self.nodes)
+        for node in self.nodes.itervalues():
+            for dependency in node.dependencies:
+                dependents[dependency].append(node.name)
+        return dependents
+
+    def _skip(self, name, dependents, reason):
+        for dependent in dependents[name]:
+            node = self.nodes[dependent]
+            if node.status == DAGNode.PENDING:
+                node.status = DAGNode.SKIPPED
+                node.error = reason
+                self.logger.warning('Skipping step {0}: {1}'.format(dependent, reason))
+                self._skip(dependent, dependents, reason)
+
+    def execute(self, stop_on_error=False, callback=None):
+        """
+        Execute all steps
+        :param stop_on_error: do not start any new step after a step has failed
+        :type stop_on_error: bool
+        :param callback: called with every DAGNode as soon as it has finished (succeeded or failed)
+        :type callback: callable
+        :return: report (see get_report)
+        :rtype: dict
+        """
+        order = self.get_topological_order()
+        dependents = self._get_dependents()
+        work_queue = Queue.Queue()
+        done_queue = Queue.Queue()
+        interrupted = []
+
+        def _worker():
+            while True:
+                node = work_queue.get()
+                if node is None:
+                    return
+                node.start = time.time()
+                try:
+                    node.result = node.target(*node.args, **node.kwargs)
+                    node.status = DAGNode.SUCCESS
+                except Exception as ex:
+                    self.logger.exception('Step {0} failed'.format(node.name))
+                    node.error = str(ex)
+                    node.status = DAGNode.FAILED
+                except BaseException as ex:
+                    # Eg SystemExit or a gevent Timeout: the step fails, no new steps are started and this worker stops
+                    self.logger.exception('Step {0} was interrupted'.format(node.name))
+                    node.error = '{0}: {1}'.format(ex.__class__.__name__, ex)
+                    node.status = DAGNode.FAILED
+                    interrupted.append(node.name)
+                    raise
+                finally:
+                    node.end = time.time()
+                    done_queue.put(node)
+
+        workers = [ThreadHelper.start_thread(_worker, 'ci_dag_worker_{0}'.format(index)) for index in xrange(min(self.max_workers, max(len(order), 1)))]
+        self._start = time.time()
+        busy_resources = set()
+        running = 0
+        aborted = False
+        try:
+            while True:
+                if aborted is False:
+                    for name in order:
+                        node = self.nodes[name]
+                        if node.status != DAGNode.PENDING or running >= len(workers):
+                            continue
+                        if any(self.nodes[dependency].status != DAGNode.SUCCESS for dependency in node.dependencies):
+                            continue
+                        if node.resource is not None and node.resource in busy_resources:
+                            continue
+                        node.status = DAGNode.RUNNING
+                        if node.resource is not None:
+                            busy_resources.add(node.resource)
+                        running += 1
+                        self.logger.info('Starting step {0}'.format(name))
+                        work_queue.put(node)
+                if running == 0:
+                    break
+                node = done_queue.get()
+                running -= 1
+                busy_resources.discard(node.resource)
+                self.logger.info('Step {0} finished with status {1} after {2:.2f}s'.format(node.name, node.status, node.duration))
+                if node.status == DAGNode.FAILED:
+                    self._skip(node.name, dependents, 'Dependency {0} failed'.format(node.name))
+                    if stop_on_error is True or node.name in interrupted:
+                        aborted = True
+                if callback is not None:
+                    callback(node)
+        finally:
+            for _ in workers:
+                work_queue.put(None)
+            self._end = time.time()
+        if aborted is True:
+            for node in self.nodes.itervalues():
+                if node.status == DAGNode.PENDING:
+                    node.status = DAGNode.SKIPPED
+                    node.error = 'Execution was stopped after a failure'
+        return self.get_report()
+
+    def get_critical_path(self):
+        """
+        Determine the chain of dependent steps with the longest total duration
+        :return: tuple with the names of the steps in the chain and the total duration of the chain
+        :rtype: tuple(list, float)
+        """
+        longest = {}  # name -> (duration of the longest chain ending in this step, previous step)
+        for name in self.get_topological_order():
+            node = self.nodes[name]
+            previous = None
+            duration = 0
+            for dependency in node.dependencies:
+                if longest[dependency][0] > duration:
+                    duration = longest[dependency][0]
+                    previous = dependency
+            longest[name] = (duration + node.duration, previous)
+        if len(longest) == 0:
+            return [], 0
+        name = max(longest, key=lambda key: longest[key][0])
+        total = longest[name][0]
+        path = []
+        while name is not None:
+            path.insert(0, name)
+            name = longest[name][1]
+        return path, total
+
+    def get_report(self):
+        """
+        Fetch the results of the execution
+        :return: dict with the status, duration and error per step, the critical path and the total duration
+        :rtype: dict
+        """
+        critical_path, critical_duration = self.get_critical_path()
+        total = 0 if self._start is None or self._end is None else self._end - self._start
+        return {'steps': dict((name, {'status': node.status,
+                                      'duration': node.duration,
+                                      'error': node.error}) for name, node in self.nodes.iteritems()),
+                'critical_path': critical_path,
+                'critical_path_duration': critical_duration,
+                'serial_duration': sum(node.duration for node in self.nodes.itervalues()),
+                'total_duration': total,
+                'successful': all(node.status == DAGNode.SUCCESS for node in self.nodes.itervalues())}
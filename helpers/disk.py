@@ -14,15 +14,79 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 
-from ovs.dal.lists.disklist import DiskList
-from ovs.dal.lists.diskpartitionlist import DiskPartitionList
+from ..helpers.cache import IndexCache
+from ..helpers.lazy import LazyImport
 from ..helpers.storagerouter import StoragerouterHelper
 
+Disk = LazyImport('ovs.dal.hybrids.disk', 'Disk')
+DiskList = LazyImport('ovs.dal.lists.disklist', 'DiskList')
+
+
+class RoleInventory(object):
+    """
+    Index of the roles of all disks, built in a single pass over the disks and their partitions
+    """
+
+    def __init__(self):
+        self.roles_by_disk = {}  # (storagerouter guid, disk name) -> set of roles
+        self.roles_by_storagerouter = {}  # storagerouter guid -> set of roles
+        self.locations_by_role = {}  # role -> set of (storagerouter guid, disk name)
+        self.partition_roles_by_disk = {}  # (storagerouter guid, disk name) -> list of lists with roles, per partition
+
+    @classmethod
+    def build(cls, disks):
+        """
+        Build the inventory
+        :param disks: disks to index
+        :type disks: list (ovs.dal.hybrids.disk.Disk)
+        :return: the inventory
+        :rtype: RoleInventory
+        """
+        inventory = cls()
+        for disk in disks:
+            location = (disk.storagerouter_guid, disk.name)
+            disk_roles = inventory.roles_by_disk.setdefault(location, set())
+            storagerouter_roles = inventory.roles_by_storagerouter.setdefault(disk.storagerouter_guid, set())
+            partition_roles = inventory.partition_roles_by_disk.setdefault(location, [])
+            for partition in disk.partitions:
+                partition_roles.append(list(partition.roles))
+                for role in partition.roles:
+                    disk_roles.add(role)
+                    storagerouter_roles.add(role)
+                    inventory.locations_by_role.setdefault(role, set()).add(location)
+        return inventory
+
+    def get_roles(self, storagerouter_guid=None):
+        """
+        Fetch all available roles, optionally of a single storagerouter
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :return: available roles
+        :rtype: set
+        """
+        if storagerouter_guid is None:
+            return set(self.locations_by_role)
+        return set(self.roles_by_storagerouter.get(storagerouter_guid, ()))
+
+    def get_missing_roles(self, roles, storagerouter_guid=None):
+        """
+        Fetch the roles which are not available, optionally on a single storagerouter
+        :param roles: required roles
+        :type roles: list
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :return: missing roles, in order of the given roles
+        :rtype: list
+        """
+        available_roles = self.get_roles(storagerouter_guid)
+        return [role for role in roles if role not in available_roles]
+
 
 class DiskHelper(object):
     """
     DiskHelper class
     """
+    cache_timeout = 60
 
     @staticmethod
     def get_diskpartitions_by_guid(diskguid):
@@ -34,7 +98,20 @@ class DiskHelper(object):
         :rtype: list (ovs.dal.hybrids.diskpartition.diskpartition)
         """
 
-        return [dp for dp in DiskPartitionList.get_partitions() if dp.disk_guid == diskguid]
+        return list(Disk(diskguid).partitions)
+
+    @staticmethod
+    def get_role_inventory(refresh=False):
+        """
+        Fetch the index of the roles of all disks in the cluster
+        The inventory is kept for cache_timeout seconds. Setting up or removing roles invalidates it
+        :param refresh: force a rebuild of the inventory
+        :type refresh: bool
+        :return: role inventory
+        :rtype: RoleInventory
+        """
+        return IndexCache.get(IndexCache.ROLE_INVENTORY, lambda: RoleInventory.build(DiskList.get_disks()),
+                              ttl=DiskHelper.cache_timeout, refresh=refresh)
 
     @staticmethod
     def get_roles_from_disks(storagerouter_guid=None):
@@ -45,11 +122,9 @@ class DiskHelper(object):
         :return: list of lists with roles
         :rtype: list > list
         """
-        if not storagerouter_guid:
-            return [partition.roles for disk in DiskList.get_disks() for partition in disk.partitions]
-        else:
-            return [partition.roles for disk in DiskList.get_disks()
-                    if disk.storagerouter_guid == storagerouter_guid for partition in disk.partitions]
+        inventory = DiskHelper.get_role_inventory()
+        return [roles for location, partition_roles in inventory.partition_roles_by_disk.iteritems()
+                if not storagerouter_guid or location[0] == storagerouter_guid for roles in partition_roles]
 
     @staticmethod
     def get_disk_by_diskname(storagerouter_guid, disk_name):
@@ -78,12 +153,35 @@ class DiskHelper(object):
         :return: list of roles of all partitions on a certain disk
         :rtype: list
         """
+        partition_roles = DiskHelper.get_role_inventory().partition_roles_by_disk.get((storagerouter_guid, disk_name))
+        if partition_roles is not None:
+            return [role for roles in partition_roles for role in roles]
+        # Unknown to the inventory: the disk might have been added since, so look on the storagerouter itself
         disk = DiskHelper.get_disk_by_diskname(storagerouter_guid, disk_name)
         roles_on_disk = []
         if disk:
+            IndexCache.invalidate(IndexCache.ROLE_INVENTORY)
             for diskpartition in disk.partitions:
                 for role in diskpartition.roles:
                     roles_on_disk.append(role)
             return roles_on_disk
         else:
             raise RuntimeError("Disk with name `{0}` not found on storagerouter `{1}`".format(disk_name, storagerouter_guid))
+
+    @staticmethod
+    def check_roles_on_disk(roles, storagerouter_guid, disk_name):
+        """
+        Check whether all given roles are available on a certain disk
+        :param roles: roles to look for
+        :type roles: list
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :param disk_name: name of a disk (e.g. sda)
+        :type disk_name: str
+        :return: True when all roles are available on the disk
+        :rtype: bool
+        """
+        disk_roles = DiskHelper.get_role_inventory().roles_by_disk.get((storagerouter_guid, disk_name))
+        if disk_roles is None:
+            disk_roles = DiskHelper.get_roles_from_disk(storagerouter_guid, disk_name)
+        return set(roles).issubset(disk_roles)
@@ -13,9 +13,13 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
-from ovs.dal.hybrids.domain import Domain
-from ovs.dal.lists.domainlist import DomainList
-from ovs.dal.lists.storagedriverlist import StorageDriverList
+from ..helpers.cache import IndexCache
+from ..helpers.lazy import LazyImport
+
+Domain = LazyImport('ovs.dal.hybrids.domain', 'Domain')
+StorageDriver = LazyImport('ovs.dal.hybrids.storagedriver', 'StorageDriver')
+DomainList = LazyImport('ovs.dal.lists.domainlist', 'DomainList')
+StorageDriverList = LazyImport('ovs.dal.lists.storagedriverlist', 'StorageDriverList')
 
 
 class DomainHelper(object):
@@ -49,9 +53,13 @@ class DomainHelper(object):
         :return: domain object
         :rtype: ovs.dal.hybrids.domain.Domain
         """
-        for domain in DomainList.get_domains():
-            if domain.name == domain_name:
-                return domain
+        domain_guid = IndexCache.lookup(IndexCache.DOMAIN_BY_NAME, DomainHelper._build_domain_index, domain_name)
+        if domain_guid is not None:
+            return Domain(domain_guid)
+
+    @staticmethod
+    def _build_domain_index():
+        return dict((domain.name, domain.guid) for domain in DomainList.get_domains())
 
     @staticmethod
     def get_domain_by_guid(domain_guid):
@@ -108,5 +116,14 @@ class DomainHelper(object):
         :return: list of storagerouter guids
         :rtype: list
         """
-        return [storagedriver for storagedriver in StorageDriverList.get_storagedrivers() if domain_guid in storagedriver.storagerouter.regular_domains]
+        index = IndexCache.get(IndexCache.STORAGEDRIVERS_BY_DOMAIN, DomainHelper._build_storagedriver_domain_index)
+        return [StorageDriver(storagedriver_guid) for storagedriver_guid in index.get(domain_guid, [])]
+
+    @staticmethod
+    def _build_storagedriver_domain_index():
+        index = {}
+        for storagedriver in StorageDriverList.get_storagedrivers():
+            for domain_guid in storagedriver.storagerouter.regular_domains:
+                index.setdefault(domain_guid, []).append(storagedriver.guid)
+        return index
 
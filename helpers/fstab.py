@@ -14,8 +14,9 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 import inspect
-from ovs.extensions.generic.sshclient import SSHClient
+from pipes import quote
 from ovs.extensions.generic.system import System
+from ..helpers.sshclient import SSHClientPool
 
 
 class FstabHelper(object):
@@ -87,7 +88,7 @@ class FstabHelper(object):
         else:
             self._path = self.DEFAULT_PATH
         if client is None:
-            client = SSHClient(System.get_my_storagerouter(), username='root')
+            client = SSHClientPool.get_client(System.get_my_storagerouter(), username='root')
         self.client = client
 
 
@@ -142,6 +143,19 @@ class FstabHelper(object):
         if entry:
             self.remove_entry(entry)
 
+    def build_remove_by_mountpoint_command(self, mountpoint):
+        """
+        Builds a shell command that removes the entry of a mountpoint, so it can be executed in a CommandBatch
+        Comment lines are preserved
+        :param mountpoint: mountpoint
+        :type mountpoint: str
+        :return: shell command
+        :rtype: str
+        """
+        path = quote(self._path)
+        tmp_path = quote('{0}.ci'.format(self._path))
+        return "awk -v mp={0} '$1 ~ /^#/ || $2 != mp' {1} > {2} && cat {2} > {1} && rm -f {2}".format(quote(mountpoint), path, tmp_path)
+
     def add(self, device, mountpoint, filesystem, options=None, dump=None, pass_=None):
         """
         Adds a entry based on supplied params
@@ -21,7 +21,7 @@ import os
 import re
 import glob
 import uuid
-import libvirt
+from pipes import quote
 from ovs.extensions.generic.logger import Logger
 from ovs.extensions.generic.sshclient import SSHClient
 from ovs.extensions.generic.system import System
@@ -30,6 +30,10 @@ from xml.etree import ElementTree
 from xml.etree.ElementTree import Element
 # Relative
 from option_mapping import SdkOptionMapping
+from ....lazy import LazyModule
+from ....sshclient import CommandBatch
+
+libvirt = LazyModule('libvirt')
 
 logger = Logger('helpers-kvm_sdk')
 ROOT_PATH = '/etc/libvirt/qemu/'  # Get static info from here, or use dom.XMLDesc(0)
@@ -700,12 +704,12 @@ class Sdk(object):
         template_directory = '/var/lib/libvirt/images'
         vmdk_file = "{0}/{1}.vmdk".format(template_directory, cloud_init_name)
         qcow_file = "{0}/{1}.qcow2".format(template_directory, cloud_init_name)
-        # Check if cloud_init already exists if not download vmdk
-        if not self.ssh_client.file_exists(vmdk_file):
-            self.ssh_client.run(["wget", "-O", vmdk_file, cloud_init_url])
-
-        if not self.ssh_client.file_exists(qcow_file):
-            self.ssh_client.run(["qemu-img", "convert", "-O", "qcow2", vmdk_file, qcow_file])
+        # Check if cloud_init already exists if not download vmdk and convert it, in one round trip
+        CommandBatch.run(self.ssh_client,
+                         ['[ -f {0} ] || wget -O {0} {1}'.format(quote(vmdk_file), quote(cloud_init_url)),
+                          '[ -f {0} ] || qemu-img convert -O qcow2 {1} {0}'.format(quote(qcow_file), quote(vmdk_file))],
+                         stop_on_error=True,
+                         raise_on_error=True)
 
         vm_directory = "{0}/{1}".format(template_directory, name)
         user_data = "{0}/user-data".format(vm_directory)
@@ -767,20 +771,15 @@ class Sdk(object):
 
             self.ssh_client.dir_delete(vm_directory)
 
-        self.ssh_client.dir_create(vm_directory)
-        # Copy template image
-        self.ssh_client.run(["cp", qcow_file, boot_disk])
-
-        # Resize image
-        self.ssh_client.run(["qemu-img", "resize", boot_disk, boot_disk_size])
-
-        # Create metadata and user data file
-        self.ssh_client.file_write(meta_data, '\n'.join(meta_data_lines))
-
-        self.ssh_client.file_write(user_data, '\n'.join(user_data_lines))
-
-        # Generate iso for cloud-init
-        self.ssh_client.run(["genisoimage", "-output", ci_iso, "-volid", "cidata", "-joliet", "-r", user_data, meta_data])
+        # Copy and resize the template image, create metadata and user data file and generate the iso for cloud-init
+        batch = CommandBatch(self.ssh_client)
+        batch.add(["mkdir", "-p", vm_directory])
+        batch.add(["cp", qcow_file, boot_disk])
+        batch.add(["qemu-img", "resize", boot_disk, boot_disk_size])
+        batch.add("printf '%s' {0} > {1}".format(quote('\n'.join(meta_data_lines)), quote(meta_data)))
+        batch.add("printf '%s' {0} > {1}".format(quote('\n'.join(user_data_lines)), quote(user_data)))
+        batch.add(["genisoimage", "-output", ci_iso, "-volid", "cidata", "-joliet", "-r", user_data, meta_data])
+        batch.execute(stop_on_error=True, raise_on_error=True)
 
         # Create extra disks
         all_disks = [{'mountpoint': boot_disk, "format": "qcow2", "bus": "virtio"}]
@@ -789,17 +788,18 @@ class Sdk(object):
             if not self.ssh_client.dir_exists(mountpoint):
                 raise Exception("Directory {0} doesn't exists.".format(mountpoint))
 
+            batch = CommandBatch(self.ssh_client)
             for i in xrange(1, amount_disks+1):
                 disk_path = "{0}/{1}_{2:02d}.qcow2".format(mountpoint, name, i,)
                 exists, used_disk, vm_name = self._check_disks_in_use([disk_path])
                 disk_exists_filesystem = self.ssh_client.file_exists(disk_path)
                 if disk_exists_filesystem and exists:
                     raise Exception("Virtual Disk {0} in used by {1}".format(used_disk, vm_name))
-                elif disk_exists_filesystem:
-                    self.ssh_client.file_delete(disk_path)
 
-                self.ssh_client.run(['qemu-img', 'create', '-f', 'qcow2', disk_path, size])
+                # qemu-img create overwrites a disk which is not in use
+                batch.add(['qemu-img', 'create', '-f', 'qcow2', disk_path, size])
                 all_disks.append({'mountpoint': disk_path, "format": "qcow2", "bus": "virtio"})
+            batch.execute(stop_on_error=True, raise_on_error=True)
 
         self.create_vm(name=name, vcpus=vcpus, ram=ram, disks=all_disks, cdrom_iso=ci_iso,
                        networks=[{"bridge": bridge, "model": "virtio"}], start=True)
@@ -926,13 +926,15 @@ class Sdk(object):
             raise RuntimeError("Could not migrate the VM to {0}. Got '{1}'".format(d_ip, str(ex)))
 
     @authenticated
-    def get_guest_ip_addresses(self, vmid, source=libvirt.VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_LEASE):
+    def get_guest_ip_addresses(self, vmid, source=None):
         """
         Returns the IP given by the network lease
         :param vmid: identifier of the vm to migrate (name or id)
-        :param source: source to base off from
+        :param source: source to base off from (defaults to the network lease)
         :return: a list with all ip addresses
         """
+        if source is None:
+            source = libvirt.VIR_DOMAIN_INTERFACE_ADDRESSES_SRC_LEASE
         if not isinstance(vmid, libvirt.virDomain):
             vmid = self.get_vm_object(vmid)
         results = []
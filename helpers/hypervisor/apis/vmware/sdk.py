@@ -20,11 +20,13 @@ from time import sleep
 import re
 import os
 import shutil
-from suds.client import Client, WebFault
-from suds.cache import ObjectCache
-from suds.sudsobject import Property
-from suds.plugin import MessagePlugin
 from ovs.extensions.generic.logger import Logger
+from ....lazy import LazyModule
+
+suds_cache = LazyModule('suds.cache')
+suds_client = LazyModule('suds.client')
+suds_plugin = LazyModule('suds.plugin')
+suds_sudsobject = LazyModule('suds.sudsobject')
 
 logger = Logger('helpers-vmware_sdk')
 
@@ -45,7 +47,7 @@ def authenticated(force=False):
                 if force:
                     self._login()
                 return func(self, *args, **kwargs)
-            except WebFault as fault:
+            except suds_client.WebFault as fault:
                 if 'The session is not authenticated' in str(fault):
                     logger.debug('Received WebFault authentication failure, logging in...')
                     self._login()
@@ -59,24 +61,30 @@ def authenticated(force=False):
     return wrapper
 
 
-class ValueExtender(MessagePlugin):
+def _build_value_extender():
     """
-    Plugin for SUDS for compatibility with VMware SDK
+    Create the ValueExtender plugin. Its base class comes from suds, so the class is only created once suds is used
     """
-
-    @staticmethod
-    def add_attribute_for_value(node):
+    class ValueExtender(suds_plugin.MessagePlugin):
         """
-        Adds an attribute to a given node
+        Plugin for SUDS for compatibility with VMware SDK
         """
-        if node.name == 'value':
-            node.set('xsi:type', 'xsd:string')
 
-    def marshalled(self, context):
-        """
-        Hook up the plugin
-        """
-        context.envelope.walk(self.add_attribute_for_value)
+        @staticmethod
+        def add_attribute_for_value(node):
+            """
+            Adds an attribute to a given node
+            """
+            if node.name == 'value':
+                node.set('xsi:type', 'xsd:string')
+
+        def marshalled(self, context):
+            """
+            Hook up the plugin
+            """
+            context.envelope.walk(self.add_attribute_for_value)
+
+    return ValueExtender()
 
 
 class Sdk(object):
@@ -94,14 +102,14 @@ class Sdk(object):
         self._sessionID = None
         self._check_session = True
 
-        self._cache = ObjectCache()
+        self._cache = suds_cache.ObjectCache()
         self._cache.setduration(weeks=1)
 
-        self._client = Client('https://{0}/sdk/vimService?wsdl'.format(host),
+        self._client = suds_client.Client('https://{0}/sdk/vimService?wsdl'.format(host),
                               cache=self._cache,
                               cachingpolicy=1)
         self._client.set_options(location='https://{0}/sdk'.format(host),
-                                 plugins=[ValueExtender()])
+                                 plugins=[_build_value_extender()])
 
         service_reference = self._build_property('ServiceInstance')
         self._serviceContent = self._client.service.RetrieveServiceContent(
@@ -1078,7 +1086,7 @@ class Sdk(object):
         """
         Create a property object with given name and value
         """
-        new_property = Property(property_name)
+        new_property = suds_sudsobject.Property(property_name)
         new_property._type = property_name
         if value is not None:
             new_property.value = value
@@ -18,8 +18,10 @@ Using the module requires libvirt api to be available on the MACHINE THAT EXECUT
 """
 from ovs_extensions.generic.filemutex import file_mutex
 from ovs_extensions.generic.toolbox import ExtensionsToolbox
-from ovs.lib.helpers.toolbox import Toolbox
 from ...helpers.ci_constants import CIConstants
+from ...helpers.lazy import LazyImport
+
+Toolbox = LazyImport('ovs.lib.helpers.toolbox', 'Toolbox')
 
 
 class HypervisorFactory(CIConstants):
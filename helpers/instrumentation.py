@@ -0,0 +1,391 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import json
+import inspect
+import pkgutil
+import functools
+import importlib
+import threading
+from contextlib import contextmanager
+from threading import Lock
+from ovs.extensions.generic.logger import Logger
+
+
+class Span(object):
+    """
+    Timing of a single operation. Counters include those of the nested spans
+    """
+
+    def __init__(self, name, parent=None):
+        """
+        :param name: name of the operation
+        :type name: str
+        :param parent: span of the operation this operation is part of
+        :type parent: Span
+        """
+        self.name = name
+        self.parent = parent
+        self.children = []
+        self.counters = dict((counter, 0) for counter in Instrumentation.COUNTERS)
+        self.error = None
+        self.start = time.time()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+
+    def to_dict(self):
+        """
+        :return: the span and its nested spans
+        :rtype: dict
+        """
+        return {'name': self.name,
+                'start': self.start,
+                'duration': self.duration,
+                'counters': dict(self.counters),
+                'error': self.error,
+                'children': [child.to_dict() for child in list(self.children)]}
+
+
+class Instrumentation(object):
+    """
+    Opt-in timing of operations, recorded as nested spans
+    Every span records its wall time, the amount of API calls, the time spent waiting for tasks and the amount of SSH commands
+    Usage:
+        Instrumentation.enable()  # Instruments the setup, remove, validate and helpers packages
+        SetupOrchestrator.deploy()
+        print Instrumentation.export_prometheus()
+    Spans started in a thread started through the ThreadHelper are nested under the span which started the thread
+    """
+    LOGGER = Logger('helpers-ci_instrumentation')
+    API_CALLS = 'api_calls'
+    TASK_WAIT = 'task_wait'
+    SSH_COMMANDS = 'ssh_commands'
+    COUNTERS = [API_CALLS, TASK_WAIT, SSH_COMMANDS]
+    PACKAGES = ['setup', 'remove', 'validate', 'helpers']
+    SKIPPED_MODULES = ['tests', 'instrumentation', 'lazy', 'thread', 'api', 'ci_constants']  # Infrastructure and per-call noise
+
+    _enabled = False
+    _lock = Lock()
+    _local = threading.local()
+    _spans = []  # Finished spans without parent
+    _patched = []  # (owner, attribute name, original attribute) of everything instrumented by install
+
+    @classmethod
+    def enable(cls, install=True):
+        """
+        Start recording spans
+        :param install: instrument all public methods of the classes in the PACKAGES and the SSH client
+        :type install: bool
+        :return: None
+        """
+        cls._enabled = True
+        if install is True:
+            cls.install()
+
+    @classmethod
+    def disable(cls):
+        """
+        Stop recording spans and remove the instrumentation added by install
+        :return: None
+        """
+        cls._enabled = False
+        cls.uninstall()
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._enabled
+
+    @classmethod
+    def _get_stack(cls):
+        stack = getattr(cls._local, 'stack', None)
+        if stack is None:
+            stack = []
+            cls._local.stack = stack
+        return stack
+
+    @classmethod
+    def get_current_span(cls):
+        """
+        :return: the innermost span of the current thread, or the span the thread was started from
+        :rtype: Span
+        """
+        stack = cls._get_stack()
+        if len(stack) > 0:
+            return stack[-1]
+        return getattr(cls._local, 'inherited', None)
+
+    @classmethod
+    @contextmanager
+    def span(cls, name):
+        """
+        Record a span for the enclosed code. Does nothing when the instrumentation is disabled
+        :param name: name of the operation
+        :type name: str
+        """
+        if cls._enabled is False:
+            yield None
+            return
+        parent = cls.get_current_span()
+        span = Span(name, parent)
+        stack = cls._get_stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as ex:
+            span.error = '{0}: {1}'.format(ex.__class__.__name__, ex)
+            raise
+        finally:
+            span.end = time.time()
+            stack.pop()
+            with cls._lock:
+                if parent is None:
+                    cls._spans.append(span)
+                else:
+                    parent.children.append(span)
+
+    @classmethod
+    def count(cls, counter, amount=1):
+        """
+        Increase a counter of the current span and all spans it is part of
+        :param counter: one of the COUNTERS
+        :type counter: str
+        :param amount: amount to add
+        :type amount: int / float
+        :return: None
+        """
+        if cls._enabled is False:
+            return
+        span = cls.get_current_span()
+        with cls._lock:
+            while span is not None:
+                span.counters[counter] += amount
+                span = span.parent
+
+    @classmethod
+    def instrument(cls, name=None, timer=None):
+        """
+        Decorator recording a span for every call of the function
+        :param name: name of the operation. Defaults to the name of the function
+        :type name: str
+        :param timer: counter to which the duration of the call is added as well (eg TASK_WAIT)
+        :type timer: str
+        """
+        def wrapper(function):
+            span_name = name or function.__name__
+
+            @functools.wraps(function)
+            def new_function(*args, **kwargs):
+                if cls._enabled is False:
+                    return function(*args, **kwargs)
+                with cls.span(span_name) as span:
+                    try:
+                        return function(*args, **kwargs)
+                    finally:
+                        if timer is not None and span is not None:
+                            cls.count(timer, time.time() - span.start)
+            new_function.__instrumented__ = True
+            return new_function
+        return wrapper
+
+    @classmethod
+    def inherit(cls, target):
+        """
+        Wrap the target of a new thread, so its spans are nested under the current span
+        :param target: function the thread will execute
+        :type target: callable
+        :return: wrapped target
+        :rtype: callable
+        """
+        parent = cls.get_current_span() if cls._enabled is True else None
+        if parent is None:
+            return target
+
+        def new_target(*args, **kwargs):
+            cls._local.inherited = parent
+            try:
+                return target(*args, **kwargs)
+            finally:
+                cls._local.inherited = None
+        return new_target
+
+    @classmethod
+    def _patch(cls, owner, attribute_name, new_attribute):
+        cls._patched.append((owner, attribute_name, owner.__dict__[attribute_name]))
+        setattr(owner, attribute_name, new_attribute)
+
+    @classmethod
+    def _instrument_class(cls, klass):
+        amount = 0
+        for attribute_name, attribute in klass.__dict__.items():
+            if attribute_name.startswith('_'):
+                continue
+            if isinstance(attribute, (staticmethod, classmethod)):
+                function = attribute.__func__
+            elif inspect.isfunction(attribute):
+                function = attribute
+            else:
+                continue  # Properties, constants and nested classes
+            if getattr(function, '__instrumented__', False) is True:
+                continue
+            wrapped = cls.instrument('{0}.{1}'.format(klass.__name__, attribute_name))(function)
+            if isinstance(attribute, staticmethod):
+                wrapped = staticmethod(wrapped)
+            elif isinstance(attribute, classmethod):
+                wrapped = classmethod(wrapped)
+            cls._patch(klass, attribute_name, wrapped)
+            amount += 1
+        return amount
+
+    @classmethod
+    def install(cls, packages=None):
+        """
+        Instrument all public methods of the classes defined in the given packages, and count the commands of the SSH clients
+        :param packages: names of the packages, relative to the root of this library. Defaults to PACKAGES
+        :type packages: list
+        :return: amount of instrumented methods
+        :rtype: int
+        """
+        root = __name__.rsplit('.', 2)[0]
+        amount = 0
+        with cls._lock:
+            for package_name in packages or cls.PACKAGES:
+                package = importlib.import_module('{0}.{1}'.format(root, package_name))
+                for _, module_name, _ in pkgutil.walk_packages(package.__path__, prefix='{0}.'.format(package.__name__)):
+                    if any(part in cls.SKIPPED_MODULES for part in module_name.split('.')):
+                        continue
+                    try:
+                        module = importlib.import_module(module_name)
+                    except ImportError as ex:
+                        cls.LOGGER.warning('Not instrumenting {0}: {1}'.format(module_name, ex))
+                        continue
+                    for klass in module.__dict__.values():
+                        if inspect.isclass(klass) and klass.__module__ == module.__name__:
+                            amount += cls._instrument_class(klass)
+            try:
+                from ovs.extensions.generic.sshclient import SSHClient
+            except ImportError:
+                SSHClient = None
+            if SSHClient is not None and getattr(SSHClient.__dict__.get('run'), '__instrumented__', False) is False:
+                run = SSHClient.__dict__['run']
+
+                @functools.wraps(run)
+                def _counted_run(*args, **kwargs):
+                    cls.count(cls.SSH_COMMANDS)
+                    return run(*args, **kwargs)
+                _counted_run.__instrumented__ = True
+                cls._patch(SSHClient, 'run', _counted_run)
+        cls.LOGGER.info('Instrumented {0} methods'.format(amount))
+        return amount
+
+    @classmethod
+    def uninstall(cls):
+        """
+        Restore everything instrumented by install
+        :return: None
+        """
+        with cls._lock:
+            while len(cls._patched) > 0:
+                owner, attribute_name, original = cls._patched.pop()
+                setattr(owner, attribute_name, original)
+
+    @classmethod
+    def get_spans(cls):
+        """
+        :return: the finished spans which are not part of another span
+        :rtype: list
+        """
+        with cls._lock:
+            return list(cls._spans)
+
+    @classmethod
+    def reset(cls):
+        """
+        Forget all recorded spans
+        :return: None
+        """
+        with cls._lock:
+            cls._spans = []
+
+    @classmethod
+    def get_totals(cls):
+        """
+        Aggregate all recorded spans per operation
+        :return: calls, errors, duration and counters, mapped by operation name
+        :rtype: dict
+        """
+        totals = {}
+
+        def _add(span):
+            if span.name not in totals:
+                totals[span.name] = dict([('calls', 0), ('errors', 0), ('duration', 0)] + [(counter, 0) for counter in cls.COUNTERS])
+            entry = totals[span.name]
+            entry['calls'] += 1
+            entry['errors'] += 0 if span.error is None else 1
+            entry['duration'] += span.duration
+            for counter in cls.COUNTERS:
+                entry[counter] += span.counters[counter]
+            for child in list(span.children):
+                _add(child)
+
+        for root_span in cls.get_spans():
+            _add(root_span)
+        return totals
+
+    @classmethod
+    def export_json(cls, path=None):
+        """
+        Export all recorded spans, nested
+        :param path: file to write the spans to
+        :type path: str
+        :return: the spans as JSON
+        :rtype: str
+        """
+        output = json.dumps([span.to_dict() for span in cls.get_spans()], indent=4)
+        if path is not None:
+            with open(path, 'w') as export_file:
+                export_file.write(output)
+        return output
+
+    @classmethod
+    def export_prometheus(cls, path=None):
+        """
+        Export the totals per operation in the Prometheus text format
+        :param path: file to write the metrics to (eg for the textfile collector of the node exporter)
+        :type path: str
+        :return: the metrics
+        :rtype: str
+        """
+        metrics = [('calls', 'ci_operation_calls_total', 'Amount of calls of an operation'),
+                   ('errors', 'ci_operation_errors_total', 'Amount of calls of an operation which raised'),
+                   ('duration', 'ci_operation_duration_seconds_total', 'Wall time spent in an operation'),
+                   (cls.API_CALLS, 'ci_operation_api_calls_total', 'Amount of API calls made by an operation'),
+                   (cls.TASK_WAIT, 'ci_operation_task_wait_seconds_total', 'Time an operation spent waiting for tasks'),
+                   (cls.SSH_COMMANDS, 'ci_operation_ssh_commands_total', 'Amount of SSH commands executed by an operation')]
+        totals = cls.get_totals()
+        lines = []
+        for key, metric, description in metrics:
+            lines.append('# HELP {0} {1}'.format(metric, description))
+            lines.append('# TYPE {0} counter'.format(metric))
+            for operation in sorted(totals):
+                lines.append('{0}{{operation="{1}"}} {2}'.format(metric, operation.replace('\\', '\\\\').replace('"', '\\"'), totals[operation][key]))
+        output = '\n'.join(lines) + '\n'
+        if path is not None:
+            with open(path, 'w') as export_file:
+                export_file.write(output)
+        return output
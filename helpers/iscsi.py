@@ -13,8 +13,10 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
-from ovs.dal.lists.iscsinodelist import IscsiNodeList
-from ovs.lib.iscsinode import IscsiNodeController
+from ..helpers.lazy import LazyImport
+
+IscsiNodeList = LazyImport('ovs.dal.lists.iscsinodelist', 'IscsiNodeList')
+IscsiNodeController = LazyImport('ovs.lib.iscsinode', 'IscsiNodeController')
 
 
 class ISCSIHelper(object):
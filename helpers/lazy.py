@@ -0,0 +1,106 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import weakref
+import importlib
+
+
+class LazyModule(object):
+    """
+    Stand-in for a module which is only imported when one of its attributes is used
+    Heavy dependencies (libvirt, suds, the ovs DAL and controllers) are only loaded by the code paths using them:
+        libvirt = LazyModule('libvirt')
+    """
+    _instances = weakref.WeakSet()
+
+    def __init__(self, module_name):
+        """
+        :param module_name: full name of the module
+        :type module_name: str
+        """
+        self.__dict__['_module_name'] = module_name
+        self.__dict__['_module'] = None
+        LazyModule._instances.add(self)
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_module_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__['_module'] is not None
+
+    @classmethod
+    def unload(cls, prefix):
+        """
+        Forget the loaded modules of which the name starts with the prefix, so they are imported again on next use
+        Used when the modules in sys.modules were replaced (eg by the fake DAL of the tests)
+        :param prefix: prefix of the module names (eg ovs.dal)
+        :type prefix: str
+        :return: amount of unloaded stand-ins
+        :rtype: int
+        """
+        amount = 0
+        for instance in list(LazyModule._instances):
+            module_name = instance.__dict__['_module_name']
+            if instance.loaded is True and (module_name == prefix or module_name.startswith('{0}.'.format(prefix))):
+                instance.__dict__['_module'] = None
+                amount += 1
+        return amount
+
+    def __getattr__(self, item):
+        return getattr(self._load(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._load(), key, value)
+
+    def __repr__(self):
+        return '<{0} {1}{2}>'.format(self.__class__.__name__, self.__dict__['_module_name'], '' if self.loaded else ' (not loaded)')
+
+
+class LazyImport(LazyModule):
+    """
+    Stand-in for an object of a module, replacing 'from module import name':
+        VPoolList = LazyImport('ovs.dal.lists.vpoollist', 'VPoolList')
+    Attribute access and calls are forwarded. Use the real object where its identity matters (isinstance, except, subclassing).
+    """
+
+    def __init__(self, module_name, name):
+        """
+        :param module_name: full name of the module
+        :type module_name: str
+        :param name: name of the object within the module
+        :type name: str
+        """
+        super(LazyImport, self).__init__(module_name)
+        self.__dict__['_name'] = name
+
+    def _load_object(self):
+        return getattr(self._load(), self.__dict__['_name'])
+
+    def __getattr__(self, item):
+        return getattr(self._load_object(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._load_object(), key, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load_object()(*args, **kwargs)
+
+    def __repr__(self):
+        return '<{0} {1}.{2}{3}>'.format(self.__class__.__name__, self.__dict__['_module_name'], self.__dict__['_name'], '' if self.loaded else ' (not loaded)')
@@ -14,9 +14,12 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 import re
+import errno
 import socket
+from threading import Lock
 from ovs.extensions.generic.logger import Logger
 from ovs_extensions.generic.remote import remote
+from ..helpers.thread import ThreadHelper
 
 
 class NetworkHelper(object):
@@ -24,6 +27,11 @@ class NetworkHelper(object):
     NetworkHelper class
     """
     LOGGER = Logger("helpers-ci_network_helper")
+    REACHABILITY_PORT = 22
+    REACHABILITY_TIMEOUT = 2
+
+    _reachable = set()  # (ip, port) of the hosts which responded. Failed checks are not cached, as a host may be coming up
+    _reachability_lock = Lock()
 
     def __init__(self):
         pass
@@ -57,3 +65,74 @@ class NetworkHelper(object):
                 raise
             finally:
                 listening_socket.close()
+
+    @staticmethod
+    def is_reachable(ip, port=REACHABILITY_PORT, timeout=REACHABILITY_TIMEOUT, use_cache=True):
+        """
+        Check whether a host responds by connecting to a TCP port. A refused connection counts as a response
+        Unlike ping, this requires no privileges or external binaries. Hosts which responded are cached per ip and port
+        :param ip: ip of the host
+        :type ip: str
+        :param port: port to connect to
+        :type port: int
+        :param timeout: seconds to wait for a response
+        :type timeout: float
+        :param use_cache: skip the check when the host responded to an earlier check
+        :type use_cache: bool
+        :return: True if the host responded
+        :rtype: bool
+        """
+        key = (ip, port)
+        if use_cache is True:
+            with NetworkHelper._reachability_lock:
+                if key in NetworkHelper._reachable:
+                    return True
+        connection = None
+        try:
+            connection = socket.create_connection((ip, port), timeout=timeout)
+            reachable = True
+        except socket.timeout:
+            reachable = False
+        except socket.error as ex:
+            reachable = ex.errno == errno.ECONNREFUSED
+        finally:
+            if connection is not None:
+                connection.close()
+        with NetworkHelper._reachability_lock:
+            if reachable is True:
+                NetworkHelper._reachable.add(key)
+            else:
+                NetworkHelper._reachable.discard(key)
+        return reachable
+
+    @staticmethod
+    def check_reachability(ips, port=REACHABILITY_PORT, timeout=REACHABILITY_TIMEOUT, use_cache=True, max_workers=20):
+        """
+        Check whether the given hosts respond, checking them concurrently. See is_reachable
+        :param ips: ips of the hosts
+        :type ips: iterable
+        :param port: port to connect to
+        :type port: int
+        :param timeout: seconds to wait for a response of a single host
+        :type timeout: float
+        :param use_cache: skip the check of hosts which responded to an earlier check
+        :type use_cache: bool
+        :param max_workers: maximum amount of hosts to check simultaneously
+        :type max_workers: int
+        :return: whether the host responded, mapped by ip
+        :rtype: dict
+        """
+        results, errors = ThreadHelper.run_in_parallel(lambda ip: NetworkHelper.is_reachable(ip, port=port, timeout=timeout, use_cache=use_cache),
+                                                       set(ips), max_workers=max_workers, name='ci_reachability')
+        for ip in errors:
+            results[ip] = False
+        return results
+
+    @staticmethod
+    def clear_reachability_cache():
+        """
+        Forget the results of all earlier reachability checks
+        :return: None
+        """
+        with NetworkHelper._reachability_lock:
+            NetworkHelper._reachable.clear()
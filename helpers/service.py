@@ -0,0 +1,106 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import threading
+from ovs.extensions.generic.logger import Logger
+from ovs.extensions.services.servicefactory import ServiceFactory
+from ..helpers.sshclient import SSHClientPool
+from ..helpers.system import SystemHelper
+from ..helpers.thread import ThreadHelper
+
+
+class ServiceHelper(object):
+    """
+    ServiceHelper class
+    """
+    LOGGER = Logger("helpers-ci_service")
+
+    ACTIVE_STATES = ['active', 'reloading']
+    FAILED_STATES = ['failed', 'error']
+
+    def __init__(self):
+        pass
+
+    @classmethod
+    def wait_for_service(cls, client, service_name, timeout=60):
+        """
+        Wait until a service is active, backing off between the polls
+        :param client: client connected to the node of the service
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        :param service_name: name of the service
+        :type service_name: str
+        :param timeout: seconds to wait before giving up
+        :type timeout: int
+        :return: the last known state of the service
+        :rtype: str
+        """
+        start_time = time.time()
+        delays = SystemHelper.get_backoff_delays(initial=0.5, maximum=5)
+        while True:
+            state = SystemHelper.get_service_states(client, services=[service_name])[service_name]
+            if state in cls.ACTIVE_STATES or state in cls.FAILED_STATES:
+                return state
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
+                return state
+            time.sleep(min(next(delays), remaining))
+
+    @classmethod
+    def rolling_restart(cls, targets, max_parallel=1, health_timeout=60, abort_on_failure=False):
+        """
+        Restart services, restarting at most max_parallel services at a time
+        Every restart is only considered successful once the service reports to be active again
+        :param targets: services to restart, given as tuples of (ip, service name)
+        :type targets: list[tuple]
+        :param max_parallel: maximum amount of services restarted simultaneously
+        :type max_parallel: int
+        :param health_timeout: seconds to wait for a service to become active after its restart
+        :type health_timeout: int
+        :param abort_on_failure: skip the services that were not restarted yet after the first failure
+        :type abort_on_failure: bool
+        :return: dict with keys success, state, error and duration, mapped by target
+        :rtype: dict
+        """
+        if max_parallel < 1:
+            raise ValueError('max_parallel should be at least 1')
+        service_manager = ServiceFactory.get_manager()
+        abort_event = threading.Event()
+
+        def _restart(target):
+            ip, service_name = target
+            if abort_event.is_set():
+                return {'success': False, 'state': None, 'error': 'Skipped after an earlier failure', 'duration': 0}
+            start_time = time.time()
+            state = None
+            error = None
+            try:
+                with SSHClientPool.checkout(ip, username='root') as client:
+                    service_manager.restart_service(service_name, client)
+                    state = cls.wait_for_service(client, service_name, timeout=health_timeout)
+                if state not in cls.ACTIVE_STATES:
+                    error = 'Service is {0} after restarting'.format(state)
+            except Exception as ex:
+                error = str(ex)
+            if error is None:
+                cls.LOGGER.info('Restarted {0} on {1}'.format(service_name, ip))
+            else:
+                cls.LOGGER.error('Restarting {0} on {1} failed: {2}'.format(service_name, ip, error))
+                if abort_on_failure is True:
+                    abort_event.set()
+            return {'success': error is None, 'state': state, 'error': error, 'duration': time.time() - start_time}
+
+        results, _ = ThreadHelper.run_in_parallel(_restart, targets, max_workers=max_parallel, name='ci_rolling_restart')
+        return results
@@ -13,30 +13,39 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
-import os
 import json
 from ci.autotests import AutoTests
-from ovs.dal.hybrids.albabackend import AlbaBackend
-from ovs.dal.hybrids.diskpartition import DiskPartition
 from ovs_extensions.generic.toolbox import ExtensionsToolbox
-from ovs.extensions.storageserver.storagedriver import StorageDriverClient
-from ovs.lib.helpers.toolbox import Toolbox
+from ..helpers.lazy import LazyImport
+from ..helpers.network import NetworkHelper
+from ..validate.schema import SetupSchema
+
+AlbaBackend = LazyImport('ovs.dal.hybrids.albabackend', 'AlbaBackend')
+DiskPartition = LazyImport('ovs.dal.hybrids.diskpartition', 'DiskPartition')
+StorageDriverClient = LazyImport('ovs.extensions.storageserver.storagedriver', 'StorageDriverClient')
+Toolbox = LazyImport('ovs.lib.helpers.toolbox', 'Toolbox')
 
 
 class SetupJsonGenerator(object):
     """
     This provides class provides code to automate construction of a setup.json file.
     Addition and removal of several components of the setup.json is provided
+    Indexes on the known domains, backends and presets are maintained alongside the model, so lookups do not scan the model
+    Ips are only validated syntactically while modelling. Whether they respond is checked for all of them at once by validate_reachability
     """
     HYPERV_KVM = 'KVM'
     VPOOL_COUNTER = 1
 
-    def __init__(self):
+    def __init__(self, offline=False):
+        """
+        :param offline: do not check whether the ips in the model respond
+        :type offline: bool
+        """
+        self.offline = offline
         self._json_dict = {}
-        self._presets = []
-        self._domains = []
-        self._backends = []
-        self._ips = []
+        self._presets = {}  # preset name -> names of the backends holding a preset with that name
+        self._domains = set()
+        self._backends = {}  # backend name -> backend dict within the model
 
     @property
     def config(self):
@@ -50,9 +59,15 @@ class SetupJsonGenerator(object):
     def dump_json_to_file(self, path):
         """
         Write current setup dict to a json file in the provided path.
+        The complete model is validated against the setup.json schema. Unless the generator is offline, all ips in the model should respond
         :param path: path to dump json file to
         :type path: str
         """
+        try:
+            SetupSchema.validate(self.config)
+        except RuntimeError as ex:
+            raise ValueError(str(ex))
+        self.validate_reachability()
         with open(path, 'w') as fp:
             json.dump(self.config, indent=4, sort_keys=True, fp=fp)
 
@@ -107,9 +122,6 @@ class SetupJsonGenerator(object):
 
         ExtensionsToolbox.verify_required_params(required_params=params_layout, actual_params=all_params, verify_keys=True)
 
-        if os.system('ping -c 1 {}'.format(all_params['grid_ip'])) != 0:
-            raise ValueError('No response from ip {0}'.format(all_params['grid_ip']))
-
         ci = {'setup': all_params['setup'],
               'cleanup': all_params['cleanup'],
               'send_to_testrail': all_params['send_to_testrail'],
@@ -162,7 +174,6 @@ class SetupJsonGenerator(object):
                            'ip': hypervisor_ip,
                            'vms': virtual_machines}
 
-        self._ips.extend(virtual_machines.keys())
         if 'hypervisor' not in self.config['ci']:
             self.config['ci']['hypervisor'] = {}
         self.config['ci']['hypervisor'] = hypervisor_dict
@@ -184,7 +195,7 @@ class SetupJsonGenerator(object):
         """
         if not isinstance(domain, str):
             raise ValueError('domain is no string')
-        self._domains.append(domain)
+        self._domains.add(domain)
         if 'setup' not in self.config.keys():
             self.config['setup'] = {}
         if 'domains' not in self.config['setup'].keys():
@@ -201,8 +212,9 @@ class SetupJsonGenerator(object):
             self.config['setup']['domains'].remove(domain)
             if self.config['setup']['domains'] == []:
                 self.config['setup'].pop('domains')
-        except KeyError:
+        except (KeyError, ValueError):
             pass
+        self._domains.discard(domain)
 
     def add_storagerouter(self, storagerouter_ip, hostname):
         """
@@ -326,7 +338,7 @@ class SetupJsonGenerator(object):
                     raise ValueError('Invalid domain passed: {0}'.format(domain_name))
 
         ExtensionsToolbox.verify_required_params(required_params={'backend_name': (str, Toolbox.regex_backend, True),
-                                                        'domains': (list, self._domains, True),
+                                                        'domains': (list, None, True),
                                                         'scaling': (str, AlbaBackend.SCALINGS, True)},
                                        actual_params={'backend_name': backend_name,
                                                       'domains': domains,
@@ -334,9 +346,11 @@ class SetupJsonGenerator(object):
         be_dict = {'name': backend_name,
                    'domains': {'domain_guids': domains},
                    'scaling': scaling}
+        if backend_name in self._backends:
+            raise ValueError('Backend {0} already defined'.format(backend_name))
         if 'setup' not in self.config.keys():
             self.config['setup'] = {}
-        self._backends.append(be_dict['name'])
+        self._backends[backend_name] = be_dict
         if 'backends' not in self.config['setup']:
             self.config['setup']['backends'] = []
         self.config['setup']['backends'].append(be_dict)
@@ -347,9 +361,12 @@ class SetupJsonGenerator(object):
         :param backend_name: name of the backend to remove
         :type backend_name: str
         """
-        for index, backend in enumerate(self.config['setup']['backends']):
-            if backend['name'] == backend_name:
-                self.config['setup']['backends'].pop(index)
+        backend = self._backends.pop(backend_name, None)
+        if backend is None:
+            return
+        self.config['setup']['backends'] = [entry for entry in self.config['setup']['backends'] if entry is not backend]
+        for preset in backend.get('presets', []):
+            self._forget_preset(backend_name, preset['name'])
 
     def add_preset_to_backend(self, backend_name, preset_name, policies, compression='snappy', encryption='none', fragment_size=2097152):
         """
@@ -402,12 +419,8 @@ class SetupJsonGenerator(object):
             'policies': policies,
             'fragment_size': fragment_size,
         }
-        self._presets.append(preset_dict['name'])
-        for index, backend in enumerate(self.config['setup']['backends']):
-            if backend['name'] == backend_name:
-                if 'presets' not in backend:
-                    self.config['setup']['backends'][index]['presets'] = []
-                self.config['setup']['backends'][index]['presets'].append(preset_dict)
+        self._presets.setdefault(preset_name, set()).add(backend_name)
+        self._backends[backend_name].setdefault('presets', []).append(preset_dict)
 
     def remove_preset_from_backend(self, backend_name, preset_name):
         """
@@ -417,15 +430,17 @@ class SetupJsonGenerator(object):
         :param preset_name: preset name to remove
         :type preset_name: str
         """
-        try:
-            for index, backend in enumerate(self.config['setup']['backends']):
-                if backend['name'] == backend_name:
-                    if 'presets' in backend:
-                        for jndex, preset in enumerate(self.config['backends'][index]['presets']):
-                            if preset['name'] == preset_name:
-                                self.config['setup']['backends'][index]['presets'].pop(jndex)
-        except Exception:
-            pass
+        backend = self._backends.get(backend_name)
+        if backend is None or 'presets' not in backend:
+            return
+        backend['presets'] = [preset for preset in backend['presets'] if preset['name'] != preset_name]
+        self._forget_preset(backend_name, preset_name)
+
+    def _forget_preset(self, backend_name, preset_name):
+        backend_names = self._presets.get(preset_name, set())
+        backend_names.discard(backend_name)
+        if len(backend_names) == 0:
+            self._presets.pop(preset_name, None)
 
     def add_osd_to_backend(self, backend_name, osds_on_disks=None, linked_backend=None, linked_preset=None):
         """
@@ -454,26 +469,19 @@ class SetupJsonGenerator(object):
                          'linked_preset': linked_preset}
         ExtensionsToolbox.verify_required_params(required_params=required_params, actual_params=actual_params, verify_keys=True)
 
-        osd_dict = {}
-        for index, backend in enumerate(self.config['setup']['backends']):
-            if backend['name'] == backend_name:
-                scaling = backend['scaling']
-                if scaling == 'LOCAL':
-                    if osds_on_disks is None:
-                        raise ValueError('Osd dictionary required')
-                    osd_dict = osds_on_disks
-                elif scaling == 'GLOBAL':
-                    if linked_backend not in self._backends:
-                        raise ValueError('Provided backend {0} not in known backends'.format(linked_backend))
-                    if linked_preset not in self._presets:
-                        raise ValueError('Provided preset {0} not in known presets'.format(linked_preset))
-                    osd_dict = {linked_backend: linked_preset}
-
-                else:
-                    raise ValueError('invalid scaling ({0}) passed'.format(scaling))
-            if 'osds' not in backend:
-                self.config['setup']['backends'][index]['osds'] = {}
-            self.config['setup']['backends'][index]['osds'].update(osd_dict)
+        backend = self._backends[backend_name]
+        scaling = backend['scaling']
+        if scaling == 'LOCAL':
+            osd_dict = osds_on_disks
+        elif scaling == 'GLOBAL':
+            if linked_backend not in self._backends:
+                raise ValueError('Provided backend {0} not in known backends'.format(linked_backend))
+            if linked_preset not in self._presets:
+                raise ValueError('Provided preset {0} not in known presets'.format(linked_preset))
+            osd_dict = {linked_backend: linked_preset}
+        else:
+            raise ValueError('invalid scaling ({0}) passed'.format(scaling))
+        backend.setdefault('osds', {}).update(osd_dict)
 
     def remove_osd_from_backend(self, osd_identifier, backend_name):
         """
@@ -484,10 +492,8 @@ class SetupJsonGenerator(object):
         :type osd_identifier: str
         """
         try:
-            for index, backend in enumerate(self.config['setup']['backends']):
-                if backend['name'] == backend_name:
-                    self.config['setup']['backends'][index]['osds'].pop(osd_identifier)
-        except Exception:
+            self._backends[backend_name]['osds'].pop(osd_identifier)
+        except KeyError:
             pass
 
     def add_vpool(self, storagerouter_ip, backend_name, preset_name, storage_ip, vpool_name=None):
@@ -659,33 +665,51 @@ class SetupJsonGenerator(object):
             ExtensionsToolbox.verify_required_params(required_params=required_params, actual_params={'storagerouter_ip': ip}, verify_keys=True)
         except RuntimeError as e:
             raise ValueError(e)
-        if os.system('ping -c 1 {0}'.format(ip)) != 0:
-            raise ValueError('No response from ip {0}'.format(ip))
+
+    def get_ips(self):
+        """
+        Fetch all ips in the model
+        :return: the grid ip, hypervisor and virtual machine ips, storagerouter ips, storage ips and osd hosts
+        :rtype: set
+        """
+        ips = set()
+        ci = self.config.get('ci', {})
+        if 'grid_ip' in ci:
+            ips.add(ci['grid_ip'])
+        if 'hypervisor' in ci:
+            ips.add(ci['hypervisor']['ip'])
+            ips.update(ci['hypervisor']['vms'].keys())
+        setup = self.config.get('setup', {})
+        for storagerouter_ip, storagerouter in setup.get('storagerouters', {}).iteritems():
+            ips.add(storagerouter_ip)
+            ips.update(vpool['storage_ip'] for vpool in storagerouter.get('vpools', {}).itervalues())
+        for backend in setup.get('backends', []):
+            if backend['scaling'] == 'LOCAL':
+                ips.update(backend.get('osds', {}).keys())
+        return ips
+
+    def validate_reachability(self, port=NetworkHelper.REACHABILITY_PORT, timeout=NetworkHelper.REACHABILITY_TIMEOUT, use_cache=True):
+        """
+        Check whether all ips in the model respond, checking them concurrently. Does nothing for an offline generator
+        :param port: tcp port to connect to
+        :type port: int
+        :param timeout: seconds to wait for a response of a single ip
+        :type timeout: float
+        :param use_cache: reuse the results of earlier checks
+        :type use_cache: bool
+        :raises ValueError: when an ip does not respond
+        :return: whether the ip responded, mapped by ip
+        :rtype: dict
+        """
+        if self.offline is True:
+            return {}
+        results = NetworkHelper.check_reachability(self.get_ips(), port=port, timeout=timeout, use_cache=use_cache)
+        unreachable = sorted(ip for ip, reachable in results.iteritems() if reachable is False)
+        if len(unreachable) > 0:
+            raise ValueError('No response from ip(s) {0}'.format(', '.join(unreachable)))
+        return results
 
     def _check_policies(self, policies):
-        class _Policy(object):
-            def __init__(self, policy):
-                if not isinstance(policy, list) or len(policy) != 4:
-                    raise ValueError('Policy {0} must be of type list with length = 4'.format(policy))
-                self.k, self.c, self.m, self.x = policy
-                if all(isinstance(entry, int) for entry in policy) is False:
-                    raise ValueError('All policy entries should be integers')
-
-            def get_policy_as_dict(self):
-                return {'k': self.k, 'c': self.c, 'm': self.m, 'x': self.x}
-
-            def get_policy_as_list(self):
-                return [self.k, self.c, self.x, self.m]
-
-            def check_policy(self):
-                if self.k > self.c:
-                    raise ValueError('Invalid policy: k({0}) < c({1}) is required'.format(self.k, self.c))
-                if self.c > self.k + self.m:
-                    raise ValueError('Invalid policy: c({0}) < k + m ({1} + {2}) is required'.format(self.c, self.k, self.m))
-                clone = self.get_policy_as_dict()
-                clone.pop('m')
-                if 0 in clone.values():
-                    raise ValueError('Policy: {0}: {1} cannot be equal to zero'.format(self.get_policy_as_list(), ''.join([i[0] for i in clone.items() if i[1] == 0])))
-
-        for p in policies:
-            _Policy(p).check_policy()
+        errors = [error for policy in policies for error in SetupSchema.get_policy_errors(policy)]
+        if len(errors) > 0:
+            raise ValueError('\n'.join(errors))
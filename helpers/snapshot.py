@@ -0,0 +1,208 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+from ovs.extensions.generic.logger import Logger
+from ..helpers.backend import BackendHelper
+from ..helpers.ci_constants import CIConstants
+from ..helpers.exceptions import AlbaBackendNotFoundError, PresetNotFoundError
+
+
+class ClusterSnapshot(CIConstants):
+    """
+    Read-only view on the model of the cluster, fetched with one bulk API call per object type
+    Objects are plain dicts as returned by the API, indexed in memory for the lookups of a validation pass
+    """
+    LOGGER = Logger("helpers-ci_cluster_snapshot")
+
+    # API endpoint and contents to fetch per object type
+    SOURCES = {'storagerouters': ('/storagerouters/', 'name,ip,regular_domains,recovery_domains,_relations'),
+               'disks': ('/disks/', 'name,_relations'),
+               'partitions': ('/diskpartitions/', 'roles,mountpoint,aliases,_relations'),
+               'vpools': ('/vpools/', 'name,metadata,_relations'),
+               'storagedrivers': ('/storagedrivers/', 'name,storage_ip,_relations'),
+               'backends': ('/backends/', 'name,regular_domains,_relations'),
+               'albabackends': ('/alba/backends/', 'name,scaling,presets,linked_backend_guids,_relations'),
+               'domains': ('/domains/', 'name,_relations'),
+               'vdisks': ('/vdisks/', 'devicename,is_vtemplate,_relations')}
+
+    def __init__(self, objects, claimed_osds=None):
+        """
+        :param objects: lists of API objects, mapped by object type (see SOURCES)
+        :type objects: dict
+        :param claimed_osds: claimed ASDs of the local alba backends (see BackendHelper.get_claimed_osds_per_backend). None when not loaded
+        :type claimed_osds: dict
+        """
+        for object_type in self.SOURCES:
+            setattr(self, object_type, objects.get(object_type, []))
+        self.claimed_osds = claimed_osds
+        self._build_indexes()
+
+    @classmethod
+    def load(cls, api=None, include_osds=False):
+        """
+        Fetch a snapshot of the cluster
+        :param api: api client to use. Defaults to the CI api client
+        :type api: ci.api_lib.helpers.api.OVSClient
+        :param include_osds: also fetch the ASDs claimed by the local alba backends, which queries every alba node
+        :type include_osds: bool
+        :return: the snapshot
+        :rtype: ClusterSnapshot
+        """
+        if api is None:
+            api = cls.api
+        objects = {}
+        for object_type, (endpoint, contents) in cls.SOURCES.iteritems():
+            objects[object_type] = api.get(endpoint, params={'contents': contents})['data']
+        claimed_osds = None
+        if include_osds is True:
+            claimed_osds = BackendHelper.get_claimed_osds_per_backend([albabackend['name'] for albabackend in objects['albabackends']
+                                                                       if albabackend['scaling'] == 'LOCAL'])
+        cls.LOGGER.debug('Loaded cluster snapshot: {0}'.format(dict((key, len(value)) for key, value in objects.iteritems())))
+        return cls(objects, claimed_osds=claimed_osds)
+
+    def _build_indexes(self):
+        self.storagerouter_by_guid = dict((sr['guid'], sr) for sr in self.storagerouters)
+        self.storagerouter_by_ip = dict((sr['ip'], sr) for sr in self.storagerouters)
+        self.disk_by_guid = dict((disk['guid'], disk) for disk in self.disks)
+        self.disk_by_name = dict(((disk['storagerouter_guid'], disk['name']), disk) for disk in self.disks)
+        self.partitions_by_disk = {}
+        for partition in self.partitions:
+            self.partitions_by_disk.setdefault(partition['disk_guid'], []).append(partition)
+        self.vpool_by_name = dict((vpool['name'], vpool) for vpool in self.vpools)
+        self.vpool_by_guid = dict((vpool['guid'], vpool) for vpool in self.vpools)
+        self.vdisks_by_vpool = {}
+        for vdisk in self.vdisks:
+            self.vdisks_by_vpool.setdefault(vdisk['vpool_guid'], []).append(vdisk)
+        self.storagedrivers_by_storagerouter = {}
+        for storagedriver in self.storagedrivers:
+            self.storagedrivers_by_storagerouter.setdefault(storagedriver['storagerouter_guid'], []).append(storagedriver)
+        self.backend_by_name = dict((backend['name'], backend) for backend in self.backends)
+        self.albabackend_by_guid = dict((albabackend['guid'], albabackend) for albabackend in self.albabackends)
+        self.albabackend_by_name = dict((albabackend['name'], albabackend) for albabackend in self.albabackends)
+        self.domain_by_name = dict((domain['name'], domain) for domain in self.domains)
+        self.domain_by_guid = dict((domain['guid'], domain) for domain in self.domains)
+
+    def get_storagerouter_by_ip(self, storagerouter_ip):
+        """
+        :param storagerouter_ip: ip of a storagerouter
+        :type storagerouter_ip: str
+        :return: storagerouter or None
+        :rtype: dict
+        """
+        return self.storagerouter_by_ip.get(storagerouter_ip)
+
+    def get_disk_by_diskname(self, storagerouter_guid, disk_name):
+        """
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :param disk_name: name of a disk (e.g. sda)
+        :type disk_name: str
+        :return: disk or None
+        :rtype: dict
+        """
+        return self.disk_by_name.get((storagerouter_guid, disk_name))
+
+    def get_roles_from_disks(self, storagerouter_guid=None):
+        """
+        Fetch the roles of all partitions, optionally of a single storagerouter
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :return: list of lists with roles
+        :rtype: list > list
+        """
+        return [partition['roles'] for disk in self.disks
+                if storagerouter_guid is None or disk['storagerouter_guid'] == storagerouter_guid
+                for partition in self.partitions_by_disk.get(disk['guid'], [])]
+
+    def get_roles_from_disk(self, storagerouter_guid, disk_name):
+        """
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :param disk_name: name of a disk (e.g. sda)
+        :type disk_name: str
+        :return: list of roles of all partitions on the disk
+        :rtype: list
+        """
+        disk = self.get_disk_by_diskname(storagerouter_guid, disk_name)
+        if disk is None:
+            raise RuntimeError("Disk with name `{0}` not found on storagerouter `{1}`".format(disk_name, storagerouter_guid))
+        return [role for partition in self.partitions_by_disk.get(disk['guid'], []) for role in partition['roles']]
+
+    def get_storagedrivers_by_storagerouter(self, storagerouter_guid):
+        """
+        :param storagerouter_guid: guid of a storagerouter
+        :type storagerouter_guid: str
+        :return: storagedrivers of the storagerouter
+        :rtype: list
+        """
+        return self.storagedrivers_by_storagerouter.get(storagerouter_guid, [])
+
+    def get_domain_names(self, domain_guids):
+        """
+        :param domain_guids: guids of domains
+        :type domain_guids: list
+        :return: names of the domains
+        :rtype: set
+        """
+        return set(self.domain_by_guid[domain_guid]['name'] for domain_guid in domain_guids if domain_guid in self.domain_by_guid)
+
+    def get_vdisks_by_vpool(self, vpool_name):
+        """
+        :param vpool_name: name of a vpool
+        :type vpool_name: str
+        :return: vdisks of the vpool
+        :rtype: list
+        """
+        vpool = self.vpool_by_name.get(vpool_name)
+        if vpool is None:
+            return []
+        return self.vdisks_by_vpool.get(vpool['guid'], [])
+
+    def get_albabackend_by_name(self, albabackend_name):
+        """
+        :param albabackend_name: name of an alba backend
+        :type albabackend_name: str
+        :return: alba backend
+        :rtype: dict
+        """
+        if albabackend_name not in self.albabackend_by_name:
+            raise AlbaBackendNotFoundError("Albabackend with name `{0}` does not exist".format(albabackend_name))
+        return self.albabackend_by_name[albabackend_name]
+
+    def get_claimed_osds(self, albabackend_name):
+        """
+        :param albabackend_name: name of a local alba backend
+        :type albabackend_name: str
+        :raises RuntimeError: when the snapshot was loaded without the claimed ASDs
+        :return: amount of ASDs per disk name, mapped by ip of the ASD manager
+        :rtype: dict
+        """
+        if self.claimed_osds is None:
+            raise RuntimeError('The claimed ASDs are not part of this snapshot, load it with include_osds=True')
+        return self.claimed_osds.get(albabackend_name, {})
+
+    def get_preset_by_albabackend(self, preset_name, albabackend_name):
+        """
+        :param preset_name: name of a preset
+        :type preset_name: str
+        :param albabackend_name: name of an alba backend
+        :type albabackend_name: str
+        :return: preset
+        :rtype: dict
+        """
+        for preset in self.get_albabackend_by_name(albabackend_name)['presets']:
+            if preset['name'] == preset_name:
+                return preset
+        raise PresetNotFoundError("Preset `{0}` on alba backend `{1}` was not found".format(preset_name, albabackend_name))
@@ -0,0 +1,372 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import uuid
+from contextlib import contextmanager
+from pipes import quote
+from threading import Lock
+from ovs.extensions.generic.logger import Logger
+from ovs.extensions.generic.sshclient import SSHClient
+
+
+class SSHClientPool(object):
+    """
+    Process-wide pool of SSHClient instances, keyed by (ip, username)
+    Every pooled client saves an SSH handshake for each subsequent request towards the same node
+    A client is checked out by a single user at a time, so concurrent users of a node (eg parallel steps) each get their own client.
+    Use checkout() for a client which goes back to the pool afterwards, or get_client() and release() when the client is kept longer.
+    """
+    LOGGER = Logger('helpers-ci_sshclient_pool')
+    MAX_IDLE = 300  # Seconds a client may stay unused before it gets evicted
+
+    _clients = {}  # Pool key -> list of (client, last used) of the idle clients
+    _generations = {}  # Pool key -> amount of evictions. Clients checked out before an eviction are not pooled again
+    _checked_out = {}  # id of a checked out client -> (client, pool key, generation)
+    _key_locks = {}
+    _lock = Lock()
+    _statistics = {'handshakes': 0, 'reused': 0, 'evicted': 0, 'dead': 0}
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def _get_key(endpoint, username):
+        """
+        Build the pool key of an endpoint
+        :param endpoint: ip or storagerouter to connect to
+        :type endpoint: str / ovs.dal.hybrids.storagerouter.StorageRouter
+        :param username: user to log in with
+        :type username: str
+        :return: pool key
+        :rtype: tuple
+        """
+        return getattr(endpoint, 'ip', endpoint), username
+
+    @staticmethod
+    def _is_alive(client):
+        """
+        Checks whether a pooled client can still be used
+        :param client: pooled client
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        :return: True when the client is still connected
+        :rtype: bool
+        """
+        if getattr(client, 'is_local', False) is True:
+            return True
+        is_connected = getattr(client, 'is_connected', None)
+        if is_connected is None:
+            return True
+        try:
+            return is_connected() is True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(client):
+        """
+        Closes the underlying connection of a client, ignoring all errors
+        :param client: client to close
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        """
+        try:
+            raw_client = getattr(client, '_client', None)
+            if raw_client is not None:
+                raw_client.close()
+        except Exception:
+            pass
+
+    @classmethod
+    def _get_key_lock(cls, key):
+        with cls._lock:
+            if key not in cls._key_locks:
+                cls._key_locks[key] = Lock()
+            return cls._key_locks[key]
+
+    @classmethod
+    def _count(cls, name):
+        with cls._lock:
+            cls._statistics[name] += 1
+
+    @classmethod
+    def _register(cls, client, key, generation):
+        with cls._lock:
+            cls._checked_out[id(client)] = (client, key, generation)
+        return client
+
+    @classmethod
+    def get_client(cls, endpoint, username='root', password=None):
+        """
+        Check out a connected client, taking an idle one from the pool or creating one when none is available
+        The client is only used by the caller until it is handed back through release()
+        :param endpoint: ip or storagerouter to connect to
+        :type endpoint: str / ovs.dal.hybrids.storagerouter.StorageRouter
+        :param username: user to log in with
+        :type username: str
+        :param password: password of the user (only used when a new connection has to be made)
+        :type password: str
+        :return: a connected client
+        :rtype: ovs.extensions.generic.sshclient.SSHClient
+        """
+        key = cls._get_key(endpoint, username)
+        key_lock = cls._get_key_lock(key)
+        while True:
+            with key_lock:
+                idle_clients = cls._clients.get(key)
+                if not idle_clients:
+                    generation = cls._generations.get(key, 0)
+                    break
+                client, last_used = idle_clients.pop()
+                generation = cls._generations.get(key, 0)
+            # Checking the connection happens outside of the lock, as it might take a round trip
+            if time.time() - last_used > cls.MAX_IDLE:
+                cls.LOGGER.debug('Evicting idle SSH client for {0}@{1}'.format(username, key[0]))
+                cls._count('evicted')
+                cls._close(client)
+            elif cls._is_alive(client) is False:
+                cls.LOGGER.debug('Dropping disconnected SSH client for {0}@{1}'.format(username, key[0]))
+                cls._count('dead')
+                cls._close(client)
+            else:
+                cls._count('reused')
+                return cls._register(client, key, generation)
+        client = SSHClient(endpoint, username=username, password=password)
+        cls._count('handshakes')
+        return cls._register(client, key, generation)
+
+    @classmethod
+    def release(cls, client):
+        """
+        Hand a client which was checked out through get_client back to the pool
+        Clients of a node which was evicted in the meantime are closed instead
+        :param client: client to release
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        :return: None
+        """
+        with cls._lock:
+            entry = cls._checked_out.pop(id(client), None)
+        if entry is None:
+            cls.LOGGER.warning('Released an SSH client which was not checked out')
+            return
+        _, key, generation = entry
+        with cls._get_key_lock(key):
+            if cls._generations.get(key, 0) == generation:
+                cls._clients.setdefault(key, []).append((client, time.time()))
+                return
+        cls._count('evicted')
+        cls._close(client)
+
+    @classmethod
+    @contextmanager
+    def checkout(cls, endpoint, username='root', password=None):
+        """
+        Use a client of the pool for the duration of a with block
+        :param endpoint: ip or storagerouter to connect to
+        :type endpoint: str / ovs.dal.hybrids.storagerouter.StorageRouter
+        :param username: user to log in with
+        :type username: str
+        :param password: password of the user (only used when a new connection has to be made)
+        :type password: str
+        :return: a connected client, only used by the caller until the with block ends
+        :rtype: ovs.extensions.generic.sshclient.SSHClient
+        """
+        client = cls.get_client(endpoint, username=username, password=password)
+        try:
+            yield client
+        finally:
+            cls.release(client)
+
+    @classmethod
+    def evict(cls, endpoint=None, username='root'):
+        """
+        Remove clients from the pool. Useful after a node has been rebooted
+        Clients which are checked out at this moment are closed when they are released
+        :param endpoint: ip or storagerouter to evict. All clients are evicted when None
+        :type endpoint: str / ovs.dal.hybrids.storagerouter.StorageRouter
+        :param username: user of the client to evict
+        :type username: str
+        :return: None
+        """
+        if endpoint is None:
+            with cls._lock:
+                keys = set(cls._clients.keys() + [entry[1] for entry in cls._checked_out.itervalues()])
+        else:
+            keys = [cls._get_key(endpoint, username)]
+        for key in keys:
+            with cls._get_key_lock(key):
+                cls._generations[key] = cls._generations.get(key, 0) + 1
+                idle_clients = cls._clients.pop(key, [])
+            for client, _ in idle_clients:
+                cls._count('evicted')
+                cls._close(client)
+
+    @classmethod
+    def get_statistics(cls):
+        """
+        Fetch the pool statistics of this run
+        :return: dict with the amount of handshakes made, handshakes saved, evicted and dead clients, idle and checked out clients
+        :rtype: dict
+        """
+        with cls._lock:
+            statistics = dict(cls._statistics)
+            statistics['handshakes_saved'] = statistics['reused']
+            statistics['pooled'] = sum(len(idle_clients) for idle_clients in cls._clients.values())
+            statistics['checked_out'] = len(cls._checked_out)
+        return statistics
+
+    @classmethod
+    def reset_statistics(cls):
+        """
+        Reset all counters of the pool
+        :return: None
+        """
+        with cls._lock:
+            for key in cls._statistics:
+                cls._statistics[key] = 0
+
+
+class CommandBatch(object):
+    """
+    Executes multiple shell commands on a node in a single SSH round trip
+    The commands are shipped as one remote script. Exit codes and outputs are demultiplexed afterwards
+    """
+    LOGGER = Logger('helpers-ci_command_batch')
+
+    def __init__(self, client):
+        """
+        :param client: client connected to the node to execute on
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        """
+        self.client = client
+        self._commands = []
+
+    def __len__(self):
+        return len(self._commands)
+
+    def add(self, command):
+        """
+        Queue a command. Commands are executed in order of addition
+        :param command: command to execute. A list is shell-quoted per element, a string is passed on as is
+        :type command: list / str
+        :return: index of the command in the batch results
+        :rtype: int
+        """
+        if isinstance(command, (list, tuple)):
+            command = ' '.join(quote(str(part)) for part in command)
+        self._commands.append(command)
+        return len(self._commands) - 1
+
+    @staticmethod
+    def build_script(commands, marker, stop_on_error=False):
+        """
+        Build the remote script of a batch
+        :param commands: commands to execute
+        :type commands: list[str]
+        :param marker: unique marker separating the outputs of the commands
+        :type marker: str
+        :param stop_on_error: stop executing the remaining commands after the first failing one
+        :type stop_on_error: bool
+        :return: the script
+        :rtype: str
+        """
+        lines = []
+        for index, command in enumerate(commands):
+            lines.append("echo '{0}:start:{1}'".format(marker, index))
+            lines.append('( {0} ) 2>&1'.format(command))
+            lines.append('rc=$?')
+            lines.append('echo')
+            lines.append('echo "{0}:end:{1}:$rc"'.format(marker, index))
+            if stop_on_error is True:
+                lines.append('[ $rc -eq 0 ] || exit 0')
+        lines.append('exit 0')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def parse_output(output, commands, marker):
+        """
+        Demultiplex the output of a batch script into the results of every command
+        :param output: output of the script
+        :type output: str
+        :param commands: commands that were executed
+        :type commands: list[str]
+        :param marker: marker that was used to build the script
+        :type marker: str
+        :return: list of dicts with command, exit_code and output. Exit code is None when the command did not run
+        :rtype: list[dict]
+        """
+        results = [{'command': command, 'exit_code': None, 'output': ''} for command in commands]
+        current = None
+        buffered = []
+        for line in output.splitlines():
+            if line.startswith('{0}:start:'.format(marker)):
+                current = int(line.rsplit(':', 1)[-1])
+                buffered = []
+            elif line.startswith('{0}:end:'.format(marker)):
+                index, exit_code = line[len(marker) + 5:].split(':')
+                # The script adds a newline in front of the end marker
+                if len(buffered) > 0 and buffered[-1] == '':
+                    buffered.pop()
+                results[int(index)]['exit_code'] = int(exit_code)
+                results[int(index)]['output'] = '\n'.join(buffered)
+                current = None
+            elif current is not None:
+                buffered.append(line)
+        return results
+
+    def execute(self, stop_on_error=False, raise_on_error=False):
+        """
+        Execute all queued commands in one round trip
+        :param stop_on_error: stop executing the remaining commands after the first failing one
+        :type stop_on_error: bool
+        :param raise_on_error: raise when a command failed
+        :type raise_on_error: bool
+        :raises RuntimeError: when raise_on_error is set and a command failed
+        :return: list of dicts with command, exit_code and output, in order of addition
+        :rtype: list[dict]
+        """
+        if len(self._commands) == 0:
+            return []
+        marker = 'ovs-ci-batch-{0}'.format(uuid.uuid4().hex)
+        script = self.build_script(self._commands, marker, stop_on_error=stop_on_error)
+        output = self.client.run(script, allow_insecure=True)
+        results = self.parse_output(output, self._commands, marker)
+        self._commands = []
+        if raise_on_error is True:
+            failed = [result for result in results if result['exit_code'] != 0]
+            if len(failed) > 0:
+                error_msg = 'Command `{0}` failed with exit code {1}: {2}'.format(failed[0]['command'], failed[0]['exit_code'], failed[0]['output'])
+                CommandBatch.LOGGER.error(error_msg)
+                raise RuntimeError(error_msg)
+        return results
+
+    @staticmethod
+    def run(client, commands, stop_on_error=False, raise_on_error=False):
+        """
+        Execute a list of commands in one round trip
+        :param client: client connected to the node to execute on
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        :param commands: commands to execute (see CommandBatch.add)
+        :type commands: list
+        :param stop_on_error: stop executing the remaining commands after the first failing one
+        :type stop_on_error: bool
+        :param raise_on_error: raise when a command failed
+        :type raise_on_error: bool
+        :return: list of dicts with command, exit_code and output, in order of the given commands
+        :rtype: list[dict]
+        """
+        batch = CommandBatch(client)
+        for command in commands:
+            batch.add(command)
+        return batch.execute(stop_on_error=stop_on_error, raise_on_error=raise_on_error)
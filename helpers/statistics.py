@@ -14,7 +14,7 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
+from ..helpers.sshclient import SSHClientPool
 
 
 class StatisticsHelper(object):
@@ -36,9 +36,9 @@ class StatisticsHelper(object):
         :return: (current usage, max. total usage)
         :rtype: tuple
         """
-        client = SSHClient(storagerouter_ip, username='root')
-        result = client.run("MEM=$(free -m | tr -s ' ' | grep Mem); "
-                            "echo $MEM | cut -d ' ' -f 3; echo $MEM | cut -d ' ' -f 2", allow_insecure=True).split()
+        with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+            result = client.run("MEM=$(free -m | tr -s ' ' | grep Mem); "
+                                "echo $MEM | cut -d ' ' -f 3; echo $MEM | cut -d ' ' -f 2", allow_insecure=True).split()
         return int(result[0]), int(result[1])
 
     @staticmethod
@@ -67,5 +67,5 @@ class StatisticsHelper(object):
         :return: current usage
         :rtype: str
         """
-        client = SSHClient(storagerouter_ip, username='root')
-        return client.run("grep Vm /proc/{0}/status | tr -s ' '".format(pid), allow_insecure=True)
+        with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+            return client.run("grep Vm /proc/{0}/status | tr -s ' '".format(pid), allow_insecure=True)
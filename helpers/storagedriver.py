@@ -13,13 +13,15 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
+import copy
 import json
-from ovs.dal.hybrids.storagedriver import StorageDriver
-from ovs.dal.lists.storagedriverlist import StorageDriverList
 from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
-from ovs.extensions.services.servicefactory import ServiceFactory
+from ..helpers.lazy import LazyImport
+from ..helpers.service import ServiceHelper
+
+StorageDriver = LazyImport('ovs.dal.hybrids.storagedriver', 'StorageDriver')
+StorageDriverList = LazyImport('ovs.dal.lists.storagedriverlist', 'StorageDriverList')
 
 
 class StoragedriverHelper(object):
@@ -79,27 +81,24 @@ class StoragedriverHelper(object):
         return StorageDriverList.get_storagedrivers()
 
     @staticmethod
-    def change_config(storagedriver, config):
+    def apply_config_delta(current_config, config):
         """
-        Change the config of the volumedriver and reload the config.
-        Restart will be triggered if no vDisk are running on the volumedriver.
-        :param storagedriver: StorageDriver object
-        :type storagedriver: StorageDriver
-        :param config: Volumedriver config
+        Apply a config delta to a volumedriver config
+        :param current_config: current volumedriver config. Is left untouched
+        :type current_config: dict
+        :param config: delta to apply (volume_manager and/or backend_connection_manager items)
         :type config: dict
-        :return:
+        :return: the new volumedriver config
+        :rtype: dict
         """
-        service_manager = ServiceFactory.get_manager()
-        config_key = '/ovs/vpools/{0}/hosts/{1}/config'.format(storagedriver.vpool.guid, storagedriver.name)
-        current_config = Configuration.get(config_key)
-
+        new_config = copy.deepcopy(current_config)
         if 'volume_manager' in config:
-            volume_manager = current_config['volume_manager']
+            volume_manager = new_config['volume_manager']
             for key, value in config['volume_manager'].iteritems():
                 volume_manager[key] = value
 
         if 'backend_connection_manager' in config:
-            backend_connection_manager = current_config['backend_connection_manager']
+            backend_connection_manager = new_config['backend_connection_manager']
             for key, value in config['backend_connection_manager'].iteritems():
                 if key == 'proxy':
                     for current_config_key, current_config_value in backend_connection_manager.iteritems():
@@ -109,13 +108,97 @@ class StoragedriverHelper(object):
 
                 else:
                     backend_connection_manager[key] = value
-        StoragedriverHelper.LOGGER.info("New config: {0}".format(json.dumps(current_config, indent=4)))
-        Configuration.set(config_key, json.dumps(current_config, indent=4), raw=True)
-        client = SSHClient(storagedriver.storagerouter, 'root')
-        service_name = 'ovs-volumedriver_{0}'.format(storagedriver.vpool.name)
-
-        if len(storagedriver.vdisks_guids) == 0:
-            StoragedriverHelper.LOGGER.info("Restarting service: {0}".format(service_name))
-            service_manager.restart_service(service_name, client)
-        else:
-            StoragedriverHelper.LOGGER.info("Not restarting service: {0}, amount of vdisks: {1}".format(service_name, len(storagedriver.vdisks_guids)))
+        return new_config
+
+    @staticmethod
+    def get_config_diff(old_config, new_config, path=''):
+        """
+        Compute the differences between two configs
+        :param old_config: config before the change
+        :type old_config: dict
+        :param new_config: config after the change
+        :type new_config: dict
+        :param path: path of the given configs within the full config, used to prefix the keys
+        :type path: str
+        :return: dict with the old and new value of every changed item, mapped by its path (eg volume_manager.foc_throttle_usecs)
+        :rtype: dict
+        """
+        diff = {}
+        for key in set(old_config.keys()) | set(new_config.keys()):
+            key_path = key if path == '' else '{0}.{1}'.format(path, key)
+            old_value = old_config.get(key)
+            new_value = new_config.get(key)
+            if isinstance(old_value, dict) and isinstance(new_value, dict):
+                diff.update(StoragedriverHelper.get_config_diff(old_value, new_value, key_path))
+            elif old_value != new_value:
+                diff[key_path] = {'old': old_value, 'new': new_value}
+        return diff
+
+    @staticmethod
+    def change_configs(storagedrivers, config, max_parallel=5):
+        """
+        Change the config of multiple volumedrivers
+        Only changed configs are written, in a single configuration transaction when the configuration backend supports it.
+        Restarts will be triggered for the changed volumedrivers without vDisks, in parallel.
+        :param storagedrivers: StorageDriver objects
+        :type storagedrivers: list[StorageDriver]
+        :param config: Volumedriver config delta
+        :type config: dict
+        :param max_parallel: amount of volumedrivers to restart simultaneously
+        :type max_parallel: int
+        :raises RuntimeError: when a restarted volumedriver did not come back
+        :return: dict with the diff and whether the volumedriver was restarted, mapped by storagedriver guid
+        :rtype: dict
+        """
+        results = {}
+        changed_configs = {}
+        restart_targets = {}
+        for storagedriver in storagedrivers:
+            config_key = '/ovs/vpools/{0}/hosts/{1}/config'.format(storagedriver.vpool.guid, storagedriver.name)
+            current_config = Configuration.get(config_key)
+            new_config = StoragedriverHelper.apply_config_delta(current_config, config)
+            diff = StoragedriverHelper.get_config_diff(current_config, new_config)
+            results[storagedriver.guid] = {'diff': diff, 'restarted': False}
+            if len(diff) == 0:
+                StoragedriverHelper.LOGGER.info("Config of {0} is unchanged, skipping".format(storagedriver.name))
+                continue
+            StoragedriverHelper.LOGGER.info("Changed items of {0}: {1}".format(storagedriver.name, json.dumps(diff, indent=4)))
+            changed_configs[config_key] = new_config
+            service_name = 'ovs-volumedriver_{0}'.format(storagedriver.vpool.name)
+            if len(storagedriver.vdisks_guids) == 0:
+                restart_targets[(storagedriver.storagerouter.ip, service_name)] = storagedriver.guid
+            else:
+                StoragedriverHelper.LOGGER.info("Not restarting service: {0}, amount of vdisks: {1}".format(service_name, len(storagedriver.vdisks_guids)))
+
+        if len(changed_configs) > 0:
+            transaction = Configuration.begin_transaction() if hasattr(Configuration, 'begin_transaction') else None
+            for config_key, new_config in changed_configs.iteritems():
+                if transaction is None:
+                    Configuration.set(config_key, json.dumps(new_config, indent=4), raw=True)
+                else:
+                    Configuration.set(config_key, json.dumps(new_config, indent=4), raw=True, transaction=transaction)
+            if transaction is not None:
+                Configuration.apply_transaction(transaction)
+
+        if len(restart_targets) > 0:
+            StoragedriverHelper.LOGGER.info("Restarting services: {0}".format(', '.join('{1} on {0}'.format(*target) for target in restart_targets)))
+            restart_results = ServiceHelper.rolling_restart(restart_targets.keys(), max_parallel=max_parallel)
+            for target, restart_result in restart_results.iteritems():
+                results[restart_targets[target]]['restarted'] = restart_result['success']
+            failed = ['{1} on {0}'.format(*target) for target, restart_result in restart_results.iteritems() if restart_result['success'] is False]
+            if len(failed) > 0:
+                raise RuntimeError('The following volumedrivers did not come back after their restart: {0}'.format(', '.join(sorted(failed))))
+        return results
+
+    @staticmethod
+    def change_config(storagedriver, config):
+        """
+        Change the config of the volumedriver and reload the config.
+        Restart will be triggered if the config changed and no vDisk are running on the volumedriver.
+        :param storagedriver: StorageDriver object
+        :type storagedriver: StorageDriver
+        :param config: Volumedriver config
+        :type config: dict
+        :return:
+        """
+        StoragedriverHelper.change_configs([storagedriver], config)
@@ -13,10 +13,15 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
-from ovs.dal.hybrids.storagerouter import StorageRouter
-from ovs.dal.lists.storagerouterlist import StorageRouterList
 from ovs.extensions.generic.logger import Logger
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
+from ..helpers.lazy import LazyImport
+
+Disk = LazyImport('ovs.dal.hybrids.disk', 'Disk')
+StorageRouter = LazyImport('ovs.dal.hybrids.storagerouter', 'StorageRouter')
+DiskList = LazyImport('ovs.dal.lists.disklist', 'DiskList')
+StorageRouterList = LazyImport('ovs.dal.lists.storagerouterlist', 'StorageRouterList')
 
 
 class StoragerouterHelper(CIConstants):
@@ -27,7 +32,10 @@ class StoragerouterHelper(CIConstants):
     LOGGER = Logger("helpers-ci_storagerouter_helper")
 
     cache_timeout = 60
-    disk_map_cache = {}
+    # Names of the IndexCache indexes, kept for cache_timeout seconds
+    STORAGEROUTER_MAP_CACHE = 'storagerouter_by_ip'
+    DISK_MAP_CACHE = 'disk_by_storagerouter_and_name'
+    ROLE_MAP_CACHE = 'storagerouters_by_role'
 
     def __init__(self):
         pass
@@ -50,7 +58,41 @@ class StoragerouterHelper(CIConstants):
         :return: storagerouter
         :rtype: ovs.dal.hybrids.storagerouter.StorageRouter
         """
-        return StorageRouterList.get_by_ip(storagerouter_ip)
+        storagerouter_guid = IndexCache.lookup(StoragerouterHelper.STORAGEROUTER_MAP_CACHE, StoragerouterHelper._build_storagerouter_map,
+                                               storagerouter_ip, ttl=StoragerouterHelper.cache_timeout,
+                                               fallback=StoragerouterHelper._find_storagerouter_guid)
+        if storagerouter_guid is not None:
+            return StorageRouter(storagerouter_guid)
+
+    @staticmethod
+    def get_storagerouter_guid_by_ip(storagerouter_ip, snapshot=None):
+        """
+        :param storagerouter_ip: ip of a storagerouter
+        :type storagerouter_ip: str
+        :param snapshot: snapshot of the cluster to look in instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
+        :raises RuntimeError: when no storagerouter has the given ip
+        :return: guid of the storagerouter
+        :rtype: str
+        """
+        if snapshot is not None:
+            storagerouter = snapshot.get_storagerouter_by_ip(storagerouter_ip)
+            storagerouter_guid = None if storagerouter is None else storagerouter['guid']
+        else:
+            storagerouter = StoragerouterHelper.get_storagerouter_by_ip(storagerouter_ip)
+            storagerouter_guid = None if storagerouter is None else storagerouter.guid
+        if storagerouter_guid is None:
+            raise RuntimeError("Storagerouter with ip `{0}` not found".format(storagerouter_ip))
+        return storagerouter_guid
+
+    @staticmethod
+    def _build_storagerouter_map():
+        return dict((storagerouter.ip, storagerouter.guid) for storagerouter in StorageRouterList.get_storagerouters())
+
+    @staticmethod
+    def _find_storagerouter_guid(storagerouter_ip):
+        storagerouter = StorageRouterList.get_by_ip(storagerouter_ip)
+        return None if storagerouter is None else storagerouter.guid
 
     @staticmethod
     def get_storagerouter_ip(storagerouter_guid):
@@ -73,10 +115,35 @@ class StoragerouterHelper(CIConstants):
         :return: Disk Object
         :rtype: ovs.dal.hybrids.disk.disk
         """
-        disks = StoragerouterHelper.get_storagerouter_by_guid(guid).disks
-        for d in disks:
-            if d.name == diskname:
-                return d
+        disk_guid = IndexCache.lookup(StoragerouterHelper.DISK_MAP_CACHE, StoragerouterHelper._build_disk_map,
+                                      (guid, diskname), ttl=StoragerouterHelper.cache_timeout,
+                                      fallback=StoragerouterHelper._find_disk_guid)
+        if disk_guid is not None:
+            return Disk(disk_guid)
+
+    @staticmethod
+    def _build_disk_map():
+        return dict(((disk.storagerouter_guid, disk.name), disk.guid) for disk in DiskList.get_disks())
+
+    @staticmethod
+    def _find_disk_guid(key):
+        # Only scans the disks of the storagerouter itself
+        storagerouter_guid, diskname = key
+        for disk in StorageRouter(storagerouter_guid).disks:
+            if disk.name == diskname:
+                return disk.guid
+
+    @staticmethod
+    def get_cache_statistics():
+        """
+        Fetch the hits, misses, invalidations and fallbacks of the storagerouter, disk and role caches
+        :return: statistics mapped by cache name
+        :rtype: dict
+        """
+        statistics = IndexCache.get_statistics()
+        return dict((name, statistics.get(name, {'hits': 0, 'misses': 0, 'invalidations': 0, 'fallbacks': 0}))
+                    for name in [StoragerouterHelper.STORAGEROUTER_MAP_CACHE, StoragerouterHelper.DISK_MAP_CACHE,
+                                 StoragerouterHelper.ROLE_MAP_CACHE])
 
     @staticmethod
     def get_storagerouter_ips():
@@ -117,7 +184,9 @@ class StoragerouterHelper(CIConstants):
         else:
             raise ValueError('No guid or ip passed.')
         task_id = cls.api.post(api='/storagerouters/{0}/rescan_disks/'.format(storagerouter_guid), data=None)
-        return cls.api.wait_for_task(task_id=task_id, timeout=timeout)
+        result = cls.api.wait_for_task(task_id=task_id, timeout=timeout)
+        IndexCache.invalidate(StoragerouterHelper.DISK_MAP_CACHE)
+        return result
 
     @classmethod
     def get_storagerouters_by_role(cls):
@@ -125,25 +194,36 @@ class StoragerouterHelper(CIConstants):
         Gets storagerouters based on roles
         :return:
         """
-        voldr_str_1 = None  # Will act as volumedriver node
-        voldr_str_2 = None  # Will act as volumedriver node
-        compute_str = None  # Will act as compute node
-        if isinstance(cls.HYPERVISOR_INFO, dict):  # Hypervisor section is filled in -> VM environment
+        role_map = IndexCache.get(StoragerouterHelper.ROLE_MAP_CACHE, cls._build_role_map, ttl=StoragerouterHelper.cache_timeout)
+        if role_map['config'] is not cls.SETUP_CFG:  # The setup.json config was reloaded since
+            role_map = IndexCache.get(StoragerouterHelper.ROLE_MAP_CACHE, cls._build_role_map, ttl=StoragerouterHelper.cache_timeout, refresh=True)
+        voldr_guids = role_map['roles'].get('VOLDRV', [])
+        compute_guids = role_map['roles'].get('COMPUTE', [])
+        assert len(voldr_guids) >= 2 and len(compute_guids) >= 1,\
+            'Could not fetch 2 storagedriver nodes and 1 compute node based on the setup.json config.'
+        return StorageRouter(voldr_guids[0]), StorageRouter(voldr_guids[1]), StorageRouter(compute_guids[0])
+
+    @classmethod
+    def _build_role_map(cls):
+        """
+        Map the roles of the nodes in the setup.json config to the guids of their storagerouters, in one pass
+        :return: the config the map was built from and the lists of storagerouter guids mapped by role
+        :rtype: dict
+        """
+        config = cls.SETUP_CFG
+        hypervisor_info = config['ci'].get('hypervisor')
+        if isinstance(hypervisor_info, dict):  # Hypervisor section is filled in -> VM environment
             nodes_info = {}
-            for hv_ip, hv_info in cls.HYPERVISOR_INFO['vms'].iteritems():
+            for hv_ip, hv_info in hypervisor_info['vms'].iteritems():
                 nodes_info[hv_ip] = hv_info
-        elif cls.SETUP_CFG['ci'].get('nodes') is not None:  # Physical node section -> Physical environment
-            nodes_info = cls.SETUP_CFG['ci']['nodes']
+        elif config['ci'].get('nodes') is not None:  # Physical node section -> Physical environment
+            nodes_info = config['ci']['nodes']
         else:
             raise RuntimeError('Unable to fetch node information. Either hypervisor section or node section is missing!')
+        storagerouter_map = IndexCache.get(StoragerouterHelper.STORAGEROUTER_MAP_CACHE, StoragerouterHelper._build_storagerouter_map,
+                                           ttl=StoragerouterHelper.cache_timeout)
+        role_map = {}
         for node_ip, node_details in nodes_info.iteritems():
-            if node_details['role'] == "VOLDRV":
-                if voldr_str_1 is None:
-                    voldr_str_1 = StoragerouterHelper.get_storagerouter_by_ip(node_ip)
-                elif voldr_str_2 is None:
-                    voldr_str_2 = StoragerouterHelper.get_storagerouter_by_ip(node_ip)
-            elif node_details['role'] == "COMPUTE" and compute_str is None:
-                compute_str = StoragerouterHelper.get_storagerouter_by_ip(node_ip)
-        assert voldr_str_1 is not None and voldr_str_2 is not None and compute_str is not None,\
-            'Could not fetch 2 storagedriver nodes and 1 compute node based on the setup.json config.'
-        return voldr_str_1, voldr_str_2, compute_str
\ No newline at end of file
+            if node_ip in storagerouter_map:
+                role_map.setdefault(node_details['role'], []).append(storagerouter_map[node_ip])
+        return {'config': config, 'roles': role_map}
\ No newline at end of file
@@ -15,9 +15,10 @@
 # but WITHOUT ANY WARRANTY of any kind.
 import time
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
 from ovs.extensions.generic.system import System
 from ovs.extensions.services.servicefactory import ServiceFactory
+from ..helpers.sshclient import SSHClientPool
+from ..helpers.thread import ThreadHelper
 
 
 class SystemHelper(object):
@@ -30,21 +31,96 @@ class SystemHelper(object):
         pass
 
     @staticmethod
-    def get_non_running_ovs_services(client):
+    def _parse_systemctl_show(output):
+        """
+        Parses the output of `systemctl show -p Id -p ActiveState <units>`
+        :param output: output of the command
+        :type output: str
+        :return: dict with the state of every unit, mapped by unit id
+        :rtype: dict
+        """
+        states = {}
+        unit_id = None
+        state = None
+        for line in output.splitlines() + ['']:
+            line = line.strip()
+            if line == '':
+                if unit_id is not None and state is not None:
+                    states[unit_id] = state
+                unit_id = None
+                state = None
+            elif line.startswith('Id='):
+                unit_id = line[3:]
+            elif line.startswith('ActiveState='):
+                state = line[12:]
+        return states
+
+    @classmethod
+    def get_service_states(cls, client, services=None, prefix='ovs-'):
+        """
+        Fetches the state of multiple services in a single remote call
+        Falls back to querying every service separately when the node does not run systemd
+        :param client: sshclient instance
+        :type client: ovs.extensions.generic.sshclient.SSHClient
+        :param services: services to fetch the state of. Defaults to all services starting with the prefix
+        :type services: list
+        :param prefix: prefix of the services to fetch when no services are given
+        :type prefix: str
+        :return: dict with the state (eg active, failed, activating) of every service, mapped by service name
+        :rtype: dict
+        """
+        service_manager = ServiceFactory.get_manager()
+        if services is None:
+            services = [service for service in service_manager.list_services(client) if service.startswith(prefix)]
+        services = list(services)
+        if len(services) == 0:
+            return {}
+        try:
+            output = client.run(['systemctl', 'show', '-p', 'Id', '-p', 'ActiveState', '--'] + services)
+            unit_states = cls._parse_systemctl_show(output)
+        except Exception:
+            cls.LOGGER.debug('Unable to fetch the service states in a single call on {0}'.format(client.ip))
+            unit_states = {}
+        service_states = {}
+        for service in services:
+            unit_id = service if service.endswith('.service') else '{0}.service'.format(service)
+            if unit_id in unit_states:
+                service_states[service] = unit_states[unit_id]
+            else:
+                service_states[service] = service_manager.get_service_status(service, client)
+        return service_states
+
+    @classmethod
+    def get_service_states_of_nodes(cls, ips, username='root', password=None, prefix='ovs-', max_workers=10):
+        """
+        Fetches the state of all services of multiple nodes in parallel
+        :param ips: ips of the nodes
+        :type ips: list
+        :param username: username to login with
+        :type username: str
+        :param password: password to login with
+        :type password: str
+        :param prefix: prefix of the services to fetch
+        :type prefix: str
+        :param max_workers: amount of nodes to query simultaneously
+        :type max_workers: int
+        :return: a tuple with the service states mapped by ip and the exceptions of the unreachable nodes mapped by ip
+        :rtype: tuple(dict, dict)
+        """
+        def _get_states(ip):
+            with SSHClientPool.checkout(ip, username=username, password=password) as client:
+                return cls.get_service_states(client, prefix=prefix)
+        return ThreadHelper.run_in_parallel(_get_states, ips, max_workers=max_workers, name='ci_service_states')
+
+    @classmethod
+    def get_non_running_ovs_services(cls, client):
         """
         get all non-running ovs services
         :param client: sshclient instance
         :return: list of non running ovs services
         :rtype: list
         """
-        non_running_ovs_services = []
-        service_manager = ServiceFactory.get_manager()
-        for service in service_manager.list_services(client):
-            if not service.startswith('ovs-'):
-                continue
-            if service_manager.get_service_status(service, client) != 'active':
-                non_running_ovs_services.append(service)
-        return non_running_ovs_services
+        return [service for service, state in cls.get_service_states(client, prefix='ovs-').iteritems() if state != 'active']
 
     @staticmethod
     def get_local_storagerouter():
@@ -70,6 +146,46 @@ class SystemHelper(object):
         else:
             return 'ee'
 
+    @staticmethod
+    def get_backoff_delays(initial=1, maximum=10, factor=2):
+        """
+        Yields exponentially increasing delays, capped at the maximum
+        :param initial: first delay (seconds)
+        :param maximum: maximum delay (seconds)
+        :param factor: multiplier applied after every delay
+        :return: generator of delays
+        """
+        delay = initial
+        while True:
+            yield delay
+            delay = min(delay * factor, maximum)
+
+    @staticmethod
+    def _connect_with_backoff(ip, username, password=None, connection_timeout=300, logger=LOGGER):
+        """
+        Connect to a node which is (re)booting, backing off between the attempts
+        :param ip: ip of the node
+        :param username: username to login with
+        :param password: password to login with
+        :param connection_timeout: raise when not online after these seconds
+        :param logger: logging instance
+        :raise RuntimeError: when the timeout has been reached
+        :return: a connected client
+        :rtype: ovs.extensions.generic.sshclient.SSHClient
+        """
+        # A pooled client might still point to the connection before the reboot
+        SSHClientPool.evict(ip, username=username)
+        start_time = time.time()
+        for delay in SystemHelper.get_backoff_delays():
+            try:
+                return SSHClientPool.get_client(ip, username=username, password=password)
+            except Exception:
+                delta = time.time() - start_time
+                logger.debug('Could not establish a connection yet to {0} after {1}s'.format(ip, delta))
+                if delta + delay > connection_timeout:
+                    raise RuntimeError('Idling has timed out after {0}s'.format(delta))
+            time.sleep(delay)
+
     @staticmethod
     def idle_till_ovs_is_up(ip, username, password=None, connection_timeout=300, service_timeout=60, logger=LOGGER):
         """
@@ -87,45 +203,64 @@ class SystemHelper(object):
         failed_states = ['failed', 'error']
         active_states = ['active', 'reloading']
         activating_state = 'activating'
-        start_time = time.time()
-        client = None
-        while client is None:
-            delta = time.time() - start_time
-            if delta > connection_timeout:
-                raise RuntimeError('Idling has timed out after {0}s'.format(delta))
-            try:
-                client = SSHClient(ip, username=username, password=password)
-            except:
-                logger.debug('Could not establish a connection yet to {0} after {1}s'.format(ip, delta))
-            time.sleep(1)
-        service_manager = ServiceFactory.get_manager()
-        ovs_services = [service for service in service_manager.list_services(client) if service.startswith('ovs-')]
+        client = SystemHelper._connect_with_backoff(ip, username, password=password, connection_timeout=connection_timeout, logger=logger)
         active_services = []
         failed_service = []
         activating_services = []
-        # Initially class these services
-        for service in ovs_services:
-            logger.debug('Initially classifying {0}'.format(service))
-            service_state = service_manager.get_service_status(service, client)
-            logger.debug('Service {0} - State {1}'.format(service, service_state))
-            if service_state in failed_states:
-                failed_service.append(service)
-            elif service_state in active_states:
-                active_services.append(service)
-            elif service_state == activating_state:
-                activating_services.append(service)
-            else:
-                logger.error('Unable to process service state {0}'.format(service_state))
+        # Every poll takes one snapshot of the services which are still activating
+        service_states = SystemHelper.get_service_states(client, prefix='ovs-')
+        previous_states = {}
         start_time = time.time()
-        while len(activating_services) > 0:
-            if time.time() - start_time > service_timeout:
+        delays = SystemHelper.get_backoff_delays()
+        while True:
+            activating_services = []
+            for service, service_state in service_states.iteritems():
+                if previous_states.get(service) != service_state:
+                    logger.debug('Node {0} - Service {1} - State {2}'.format(ip, service, service_state))
+                if service_state in failed_states:
+                    failed_service.append(service)
+                elif service_state in active_states:
+                    active_services.append(service)
+                elif service_state == activating_state:
+                    activating_services.append(service)
+                else:
+                    logger.error('Unable to process service state {0}'.format(service_state))
+            previous_states.update(service_states)
+            if len(activating_services) == 0 or time.time() - start_time > service_timeout:
                 break
-            service = activating_services.pop()
-            service_state = service_manager.get_service_status(service, client)
-            if service_state in failed_states:
-                failed_service.append(service)
-            elif service_state in active_states:
-                active_services.append(service)
-            elif service_state == activating_state:
-                activating_services.append(service)
+            time.sleep(min(next(delays), max(0, service_timeout - (time.time() - start_time))))
+            service_states = SystemHelper.get_service_states(client, services=activating_services)
         return {'active': active_services, 'failed': failed_service, 'activating': activating_services}
+
+    @staticmethod
+    def idle_till_nodes_are_up(ips, username, password=None, connection_timeout=300, service_timeout=60, logger=LOGGER,
+                               max_workers=10, callback=None):
+        """
+        wait until multiple nodes are back up and all ovs related services are running (or potentially stuck)
+        All nodes are waited for concurrently
+        :param ips: ips of the nodes
+        :type ips: list
+        :param username: username to login with
+        :param password: password to login with
+        :param connection_timeout: raise when a node is not online after these seconds
+        :param service_timeout: poll for x seconds when checking services
+        :param logger: logging instance
+        :param max_workers: amount of nodes to wait for simultaneously
+        :param callback: called with the ip and the classification of a node as soon as that node has settled
+        :type callback: callable
+        :raise RuntimeError: when the timeout has been reached for any of the nodes
+        :return: dict with the services mapped by their state, mapped by ip
+        :rtype: dict
+        """
+        def _idle(ip):
+            classification = SystemHelper.idle_till_ovs_is_up(ip, username, password=password, connection_timeout=connection_timeout,
+                                                              service_timeout=service_timeout, logger=logger)
+            logger.info('Node {0} has settled'.format(ip))
+            if callback is not None:
+                callback(ip, classification)
+            return classification
+
+        results, errors = ThreadHelper.run_in_parallel(_idle, ips, max_workers=max_workers, name='ci_idle_till_ovs_is_up')
+        if len(errors) > 0:
+            raise RuntimeError('Nodes {0} did not come up: {1}'.format(', '.join(sorted(errors)), ', '.join(str(error) for error in errors.itervalues())))
+        return results
@@ -0,0 +1,355 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Local stand-in for the OVS API, to load test the helpers and the OVSClient without a grid
+Usage:
+    with StandInApiServer(task_duration=0.5, error_rate=0.1, rate_limit=100) as server:
+        storagerouter_guid = server.add('storagerouters', name='str01', ip='10.100.1.1')
+        client = OVSClient(server.ip, server.username, server.password, port=server.port)
+        client.wait_for_task(client.post('/storagerouters/{0}/configure_disk/'.format(storagerouter_guid), data={}))
+"""
+import os
+import ssl
+import json
+import time
+import uuid
+import random
+import shutil
+import urlparse
+import tempfile
+import threading
+import subprocess
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from threading import Lock
+
+
+class _ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    Passes every request to the StandInApiServer
+    """
+
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length > 0 else None
+        status, content, headers = self.server.api.handle(method=self.command,
+                                                          path=self.path,
+                                                          headers=dict((key.lower(), value) for key, value in self.headers.items()),
+                                                          body=body)
+        output = json.dumps(content)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(output)))
+        for key, value in headers.iteritems():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(output)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInApiServer(object):
+    """
+    Serves the subset of the OVS API used by this library from memory:
+    * /api/oauth2/token/: password grant for the configured credentials. All other calls require the token
+    * /api/<resource>/: list (guids, or the objects when passing 'contents') and create
+    * /api/<resource>/<guid>/: get, update and delete
+    * /api/<resource>/<guid>/<action>/: every action (eg configure_disk, add_vpool, shrink_vpool) starts a task
+    * /api/tasks/<id>/: a task is PENDING for its duration, then succeeds or fails according to the error rate
+    Creating a vDisk and deleting an object start a task as well, as the real API does.
+    Failures of tasks are drawn from a seeded random generator, so a run can be repeated.
+    """
+    RESOURCES = ['vdisks', 'vpools', 'alba/backends', 'alba/nodes', 'storagerouters']
+    ASYNC_CREATE = ['vdisks']  # Resources of which the creation returns a task id
+
+    def __init__(self, username='admin', password='admin', task_duration=0, task_durations=None, error_rate=0,
+                 rate_limit=None, latency=0, seed=0, secure=True, certfile=None, keyfile=None):
+        """
+        :param username: username to request a token with
+        :type username: str
+        :param password: password to request a token with
+        :type password: str
+        :param task_duration: seconds a task stays PENDING
+        :type task_duration: float
+        :param task_durations: seconds a task stays PENDING, mapped by action (eg {'configure_disk': 2}). Overrules task_duration
+        :type task_durations: dict
+        :param error_rate: fraction of the tasks which fail (0 - 1)
+        :type error_rate: float
+        :param rate_limit: maximum amount of requests per second. Requests above the limit get a 429 response
+        :type rate_limit: int
+        :param latency: seconds to wait before answering a request
+        :type latency: float
+        :param seed: seed of the random generator deciding which tasks fail
+        :type seed: int
+        :param secure: serve HTTPS, as the OVSClient expects. Without a certfile, a self-signed certificate is generated
+        :type secure: bool
+        :param certfile: certificate to serve HTTPS with
+        :type certfile: str
+        :param keyfile: private key of the certificate
+        :type keyfile: str
+        """
+        if not 0 <= error_rate <= 1:
+            raise ValueError('The error rate should be between 0 and 1')
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError('The rate limit should be positive')
+        self.ip = '127.0.0.1'
+        self.port = None
+        self.username = username
+        self.password = password
+        self.task_duration = task_duration
+        self.task_durations = task_durations or {}
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.secure = secure
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.statistics = {'requests': 0, 'throttled': 0, 'unauthorized': 0, 'tasks': 0, 'failed_tasks': 0}
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._token = uuid.uuid4().hex
+        self._objects = dict((resource, {}) for resource in self.RESOURCES)
+        self._tasks = {}
+        self._window = (None, 0)  # Second of the rate limit window and the amount of requests in it
+        self._server = None
+        self._thread = None
+        self._directory = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """
+        Start serving on a free port of the loopback interface
+        :return: the port
+        :rtype: int
+        """
+        if self._server is not None:
+            raise RuntimeError('The server is already running')
+        server = _ThreadedHTTPServer((self.ip, 0), _RequestHandler)
+        server.api = self
+        if self.secure is True:
+            certfile, keyfile = self.certfile, self.keyfile
+            if certfile is None:
+                self._directory = tempfile.mkdtemp(prefix='standin-api-')
+                certfile, keyfile = self._generate_certificate(self._directory)
+            server.socket = ssl.wrap_socket(server.socket, certfile=certfile, keyfile=keyfile, server_side=True)
+        self._server = server
+        self.port = server.server_address[1]
+        self._thread = threading.Thread(target=server.serve_forever, name='standin-api-{0}'.format(self.port))
+        self._thread.setDaemon(True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """
+        Stop serving
+        :return: None
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory)
+            self._directory = None
+
+    @staticmethod
+    def _generate_certificate(directory):
+        certfile = os.path.join(directory, 'server.crt')
+        keyfile = os.path.join(directory, 'server.key')
+        with open(os.devnull, 'w') as devnull:
+            subprocess.check_call(['openssl', 'req', '-x509', '-nodes', '-newkey', 'rsa:2048', '-days', '1',
+                                   '-subj', '/CN=127.0.0.1', '-keyout', keyfile, '-out', certfile],
+                                  stdout=devnull, stderr=devnull)
+        return certfile, keyfile
+
+    def add(self, resource, **fields):
+        """
+        Add an object to the model
+        :param resource: one of the RESOURCES
+        :type resource: str
+        :return: guid of the object
+        :rtype: str
+        """
+        if resource not in self._objects:
+            raise ValueError('Unsupported resource {0}'.format(resource))
+        with self._lock:
+            return self._add(resource, fields)
+
+    def get(self, resource, guid=None):
+        """
+        :param resource: one of the RESOURCES
+        :type resource: str
+        :param guid: guid of the object. None to get all objects
+        :type guid: str
+        :return: a copy of the object, or of all objects mapped by guid
+        :rtype: dict
+        """
+        with self._lock:
+            if guid is None:
+                return dict((object_guid, dict(item)) for object_guid, item in self._objects[resource].iteritems())
+            return dict(self._objects[resource][guid])
+
+    def _add(self, resource, fields):
+        guid = str(uuid.uuid4())
+        item = dict(fields)
+        item['guid'] = guid
+        self._objects[resource][guid] = item
+        return guid
+
+    def _start_task(self, action, result):
+        task_id = str(uuid.uuid4())
+        failed = self._random.random() < self.error_rate
+        self.statistics['tasks'] += 1
+        if failed is True:
+            self.statistics['failed_tasks'] += 1
+            result = 'Simulated failure of {0}'.format(action)
+        self._tasks[task_id] = {'action': action,
+                                'end': time.time() + self.task_durations.get(action, self.task_duration),
+                                'successful': not failed,
+                                'result': result}
+        return task_id
+
+    def _is_throttled(self):
+        if self.rate_limit is None:
+            return False
+        second = int(time.time())
+        window_second, amount = self._window
+        if window_second != second:
+            amount = 0
+        self._window = (second, amount + 1)
+        return amount >= self.rate_limit
+
+    def handle(self, method, path, headers, body):
+        """
+        Answer a request
+        :param method: HTTP method
+        :type method: str
+        :param path: path and query of the request
+        :type path: str
+        :param headers: headers of the request, with lowercase names
+        :type headers: dict
+        :param body: body of the request
+        :type body: str
+        :return: status code, content and extra headers of the response
+        :rtype: tuple
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+        parsed_path = urlparse.urlsplit(path)
+        query = dict((key, values[-1]) for key, values in urlparse.parse_qs(parsed_path.query).iteritems())
+        parts = [part for part in parsed_path.path.split('/') if part != '']
+        with self._lock:
+            self.statistics['requests'] += 1
+            if self._is_throttled() is True:
+                self.statistics['throttled'] += 1
+                return 429, {'error': 'rate_limit', 'error_description': 'Rate limit was hit'}, {'Retry-After': '1'}
+            if len(parts) == 0 or parts[0] != 'api':
+                return 404, {'error': 'not_found'}, {}
+            parts = parts[1:]
+            if parts == ['oauth2', 'token']:
+                return self._handle_token(method, body)
+            if headers.get('authorization') != 'Bearer {0}'.format(self._token):
+                self.statistics['unauthorized'] += 1
+                return 401, {'error': 'not_authenticated'}, {}
+            if len(parts) == 2 and parts[0] == 'tasks':
+                return self._handle_task(method, parts[1])
+            resource = parts[0]
+            if resource == 'alba' and len(parts) > 1:
+                resource = '/'.join(parts[:2])
+                parts = [resource] + parts[2:]
+            if resource not in self._objects:
+                return 404, {'error': 'not_found'}, {}
+            data = json.loads(body) if body else {}
+            if len(parts) == 1:
+                return self._handle_collection(method, resource, query, data)
+            guid = parts[1]
+            if guid not in self._objects[resource]:
+                return 404, {'error': 'not_found', 'error_description': 'Object {0} not found'.format(guid)}, {}
+            if len(parts) == 2:
+                return self._handle_object(method, resource, guid, data)
+            if len(parts) == 3:
+                return 200, self._start_task(parts[2], True), {}
+            return 404, {'error': 'not_found'}, {}
+
+    def _handle_token(self, method, body):
+        if method != 'POST':
+            return 405, {'error': 'method_not_allowed'}, {}
+        form = dict((key, values[-1]) for key, values in urlparse.parse_qs(body or '').iteritems())
+        if form.get('grant_type') != 'password':
+            return 400, {'error': 'unsupported_grant_type'}, {}
+        if form.get('username') != self.username or form.get('password') != self.password:
+            return 400, {'error': 'invalid_client'}, {}
+        return 200, {'access_token': self._token, 'token_type': 'Bearer', 'expires_in': 86400}, {}
+
+    def _handle_task(self, method, task_id):
+        if method != 'GET':
+            return 405, {'error': 'method_not_allowed'}, {}
+        task = self._tasks.get(task_id)
+        if task is None:
+            return 404, {'error': 'not_found'}, {}
+        if time.time() < task['end']:
+            return 200, {'id': task_id, 'status': 'PENDING', 'successful': False, 'result': None}, {}
+        return 200, {'id': task_id,
+                     'status': 'SUCCESS' if task['successful'] is True else 'FAILURE',
+                     'successful': task['successful'],
+                     'result': task['result']}, {}
+
+    def _handle_collection(self, method, resource, query, data):
+        if method == 'GET':
+            items = self._objects[resource].values()
+            if 'sort' in query:
+                items.sort(key=lambda item: item.get(query['sort']))
+            if 'contents' in query:
+                return 200, {'data': [dict(item) for item in items]}, {}
+            return 200, {'data': [item['guid'] for item in items]}, {}
+        if method == 'POST':
+            guid = self._add(resource, data)
+            if resource in self.ASYNC_CREATE:
+                return 200, self._start_task('create', guid), {}
+            return 200, dict(self._objects[resource][guid]), {}
+        return 405, {'error': 'method_not_allowed'}, {}
+
+    def _handle_object(self, method, resource, guid, data):
+        if method == 'GET':
+            return 200, dict(self._objects[resource][guid]), {}
+        if method in ['PUT', 'PATCH']:
+            item = self._objects[resource][guid]
+            if method == 'PUT':
+                item.clear()
+            item.update(data)
+            item['guid'] = guid
+            return 200, dict(item), {}
+        if method == 'DELETE':
+            self._objects[resource].pop(guid)
+            return 200, self._start_task('delete', True), {}
+        return 405, {'error': 'method_not_allowed'}, {}
@@ -0,0 +1,87 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import unittest
+from ci.api_lib.helpers.api import HttpException, NotFoundException, OVSClient
+from ci.api_lib.helpers.tests.apiserver import StandInApiServer
+from ci.api_lib.helpers.thread import ThreadHelper
+
+
+class ApiServerTestcase(unittest.TestCase):
+
+    def _get_client(self, server, password=None):
+        return OVSClient(server.ip, server.username, password or server.password, port=server.port)
+
+    def test_objects(self):
+        with StandInApiServer() as server:
+            storagerouter_guid = server.add('storagerouters', name='str01', ip='10.100.1.1')
+            client = self._get_client(server)
+            self.assertEquals(client.get('/storagerouters/'), {'data': [storagerouter_guid]})
+            self.assertEquals(client.get('/storagerouters/', params={'contents': 'name'})['data'][0]['name'], 'str01')
+            self.assertEquals(client.get('/storagerouters/{0}'.format(storagerouter_guid))['ip'], '10.100.1.1')
+            backend = client.post('alba/backends', data={'name': 'backend01'})
+            self.assertEquals(server.get('alba/backends', backend['guid'])['name'], 'backend01')
+            success, vdisk_guid = client.wait_for_task(client.post('/vdisks/', data={'name': 'vdisk01'}))
+            self.assertTrue(success)
+            self.assertEquals(server.get('vdisks', vdisk_guid)['name'], 'vdisk01')
+            self.assertEquals(client.wait_for_task(client.post('/storagerouters/{0}/configure_disk/'.format(storagerouter_guid), data={})), (True, True))
+            with self.assertRaises(NotFoundException):
+                client.post('/storagerouters/unknown/configure_disk/', data={})
+            with self.assertRaises(HttpException):
+                self._get_client(server, password='wrong').get('/vpools/')
+
+    def test_tasks(self):
+        with StandInApiServer(task_duration=0.5, task_durations={'shrink_vpool': 0}, error_rate=0.5, seed=1) as server:
+            vpool_guid = server.add('vpools', name='vpool01')
+            client = self._get_client(server)
+            start = time.time()
+            first_result = client.wait_for_task(client.post('/vpools/{0}/update/'.format(vpool_guid), data={}))[0]
+            self.assertGreaterEqual(time.time() - start, 0.5)
+            results = [client.wait_for_task(client.post('/vpools/{0}/shrink_vpool/'.format(vpool_guid), data={}))[0] for _ in xrange(20)]
+            self.assertEquals(server.statistics['failed_tasks'], ([first_result] + results).count(False))
+            self.assertTrue(0 < results.count(False) < 20)
+        with StandInApiServer(error_rate=0.5, seed=1) as server:
+            vpool_guid = server.add('vpools', name='vpool01')
+            client = self._get_client(server)
+            client.wait_for_task(client.post('/vpools/{0}/update/'.format(vpool_guid), data={}))
+            # The same seed fails the same tasks
+            self.assertEquals([client.wait_for_task(client.post('/vpools/{0}/shrink_vpool/'.format(vpool_guid), data={}))[0] for _ in xrange(20)], results)
+
+    def test_throttling(self):
+        with StandInApiServer(rate_limit=5) as server:
+            client = self._get_client(server)
+            with self.assertRaises(HttpException) as context:
+                for _ in xrange(20):
+                    client.get('/vdisks/')
+            self.assertEquals(context.exception.status_code, 429)
+            self.assertGreater(server.statistics['throttled'], 0)
+
+    def test_concurrency(self):
+        with StandInApiServer(task_duration=0.1, latency=0.01) as server:
+            client = self._get_client(server)
+            client.get('/vdisks/')  # Request the token once
+
+            def _create(name):
+                return client.wait_for_task(client.post('/vdisks/', data={'name': name}))
+
+            results, exceptions = ThreadHelper.run_in_parallel(_create, ['vdisk{0:02d}'.format(i) for i in xrange(25)])
+            self.assertEquals(exceptions, {})
+            self.assertEquals(len(server.get('vdisks')), 25)
+            self.assertTrue(all(result[0] is True for result in results.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,475 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Benchmarks of the hot paths of this library, run against stand-ins so no grid, hypervisor or framework is required
+Usage:
+    python -m ci.api_lib.helpers.tests.benchmark --output results.json  # Run and compare with the baseline
+    python -m ci.api_lib.helpers.tests.benchmark --save-baseline        # Store the results as the new baseline
+    python -m ci.api_lib.helpers.tests.benchmark --filter kvm --repeat 10
+The exit code is 1 when a benchmark regressed compared to the baseline
+"""
+import gc
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+from contextlib import contextmanager
+from ovs.extensions.generic.logger import Logger
+
+
+class Benchmark(object):
+    """
+    A single benchmark: prepare is a context manager which sets up the stand-ins and yields the function to time
+    """
+
+    def __init__(self, name, prepare, number, description):
+        """
+        :param name: name of the benchmark, prefixed with the area it covers (eg api.call)
+        :type name: str
+        :param prepare: context manager yielding the function to time
+        :type prepare: callable
+        :param number: amount of calls per round
+        :type number: int
+        :param description: what is measured
+        :type description: str
+        """
+        self.name = name
+        self.prepare = prepare
+        self.number = number
+        self.description = description
+
+
+class BenchmarkSuite(object):
+    """
+    Runs the registered benchmarks and compares their results with a stored baseline
+    Every benchmark is timed in a number of rounds. The median time per call of the rounds is compared with the baseline
+    """
+    LOGGER = Logger('helpers-ci_benchmark')
+    BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+    TOLERANCE = 0.3  # Relative slowdown of the median before a benchmark is flagged as a regression
+    REGRESSION = 'regression'
+    IMPROVEMENT = 'improvement'
+    UNCHANGED = 'unchanged'
+    NEW = 'new'
+    SKIPPED = 'skipped'
+
+    BENCHMARKS = []
+
+    @classmethod
+    def register(cls, name, number, description):
+        """
+        Decorator registering the context manager preparing a benchmark
+        """
+        def wrapper(prepare):
+            if any(benchmark.name == name for benchmark in cls.BENCHMARKS):
+                raise ValueError('A benchmark named {0} is already registered'.format(name))
+            cls.BENCHMARKS.append(Benchmark(name, contextmanager(prepare), number, description))
+            return prepare
+        return wrapper
+
+    @staticmethod
+    def measure(function, number, repeat):
+        """
+        Time a function, with the garbage collector disabled as timeit does
+        :param function: function to time
+        :type function: callable
+        :param number: amount of calls per round
+        :type number: int
+        :param repeat: amount of rounds
+        :type repeat: int
+        :return: best, median and mean time per call in seconds, the amount of calls per round and the amount of rounds
+        :rtype: dict
+        """
+        timings = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in xrange(repeat):
+                start = timeit.default_timer()
+                for _ in xrange(number):
+                    function()
+                timings.append((timeit.default_timer() - start) / number)
+        finally:
+            if gc_enabled is True:
+                gc.enable()
+        timings.sort()
+        middle = len(timings) / 2
+        median = timings[middle] if len(timings) % 2 == 1 else (timings[middle - 1] + timings[middle]) / 2.0
+        return {'best': timings[0],
+                'median': median,
+                'mean': sum(timings) / len(timings),
+                'number': number,
+                'repeat': repeat}
+
+    @classmethod
+    def run(cls, names=None, repeat=5, scale=1.0):
+        """
+        Run the benchmarks
+        :param names: only run the benchmarks of which the name contains one of these strings
+        :type names: list
+        :param repeat: amount of rounds per benchmark
+        :type repeat: int
+        :param scale: factor applied to the amount of calls per round (eg 0.01 for a quick check)
+        :type scale: float
+        :return: the results mapped by benchmark name, with information about the platform
+        :rtype: dict
+        """
+        results = {}
+        for benchmark in cls.BENCHMARKS:
+            if names and not any(name in benchmark.name for name in names):
+                continue
+            number = max(1, int(benchmark.number * scale))
+            try:
+                with benchmark.prepare() as function:
+                    function()  # Warm up caches and lazy imports
+                    result = cls.measure(function, number, repeat)
+            except ImportError as ex:
+                cls.LOGGER.warning('Skipping benchmark {0}: {1}'.format(benchmark.name, ex))
+                result = {'skipped': str(ex)}
+            result['description'] = benchmark.description
+            results[benchmark.name] = result
+        return {'timestamp': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results}
+
+    @staticmethod
+    def save(results, path=BASELINE_PATH):
+        """
+        Store results, eg as the baseline
+        :param results: results as returned by run
+        :type results: dict
+        :param path: file to write to
+        :type path: str
+        :return: None
+        """
+        with open(path, 'w') as results_file:
+            json.dump(results, results_file, indent=4, sort_keys=True)
+
+    @staticmethod
+    def load(path=BASELINE_PATH):
+        """
+        Load stored results
+        :param path: file to read
+        :type path: str
+        :return: the results or None when the file does not exist
+        :rtype: dict
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path) as results_file:
+            return json.load(results_file)
+
+    @classmethod
+    def compare(cls, results, baseline, tolerance=TOLERANCE):
+        """
+        Compare the median time per call of every benchmark with the baseline
+        :param results: results as returned by run
+        :type results: dict
+        :param baseline: stored results. None when there is no baseline
+        :type baseline: dict
+        :param tolerance: relative slowdown or speedup before a change is reported
+        :type tolerance: float
+        :return: status, current and baseline median and their ratio, mapped by benchmark name
+        :rtype: dict
+        """
+        baseline_results = {} if baseline is None else baseline['results']
+        comparison = {}
+        for name, result in results['results'].iteritems():
+            reference = baseline_results.get(name)
+            entry = {'median': result.get('median'), 'baseline': None, 'ratio': None}
+            if 'skipped' in result:
+                entry['status'] = cls.SKIPPED
+            elif reference is None or 'skipped' in reference:
+                entry['status'] = cls.NEW
+            else:
+                entry['baseline'] = reference['median']
+                entry['ratio'] = result['median'] / reference['median'] if reference['median'] > 0 else None
+                if entry['ratio'] is None:
+                    entry['status'] = cls.UNCHANGED
+                elif entry['ratio'] > 1 + tolerance:
+                    entry['status'] = cls.REGRESSION
+                elif entry['ratio'] < 1 / (1 + tolerance):
+                    entry['status'] = cls.IMPROVEMENT
+                else:
+                    entry['status'] = cls.UNCHANGED
+            comparison[name] = entry
+        return comparison
+
+    @staticmethod
+    def format_comparison(comparison):
+        """
+        :param comparison: comparison as returned by compare
+        :type comparison: dict
+        :return: human readable table
+        :rtype: str
+        """
+        def _format_time(seconds):
+            if seconds is None:
+                return '-'
+            for unit, factor in [('s', 1), ('ms', 1e3), ('us', 1e6)]:
+                if seconds * factor >= 1:
+                    return '{0:.2f}{1}'.format(seconds * factor, unit)
+            return '{0:.0f}ns'.format(seconds * 1e9)
+
+        width = max([len(name) for name in comparison] + [9])
+        lines = ['{0:<{1}}  {2:>10}  {3:>10}  {4:>6}  {5}'.format('benchmark', width, 'median', 'baseline', 'ratio', 'status')]
+        for name in sorted(comparison):
+            entry = comparison[name]
+            lines.append('{0:<{1}}  {2:>10}  {3:>10}  {4:>6}  {5}'.format(name, width, _format_time(entry['median']), _format_time(entry['baseline']),
+                                                                          '-' if entry['ratio'] is None else '{0:.2f}'.format(entry['ratio']),
+                                                                          entry['status']))
+        return '\n'.join(lines)
+
+
+class _InstantTransport(object):
+    """
+    Stand-in transport for the OVSClient answering from memory. Tasks succeed after POLLS polls and waiting takes no time
+    """
+    POLLS = 3
+
+    def __init__(self, storagerouter_amount=100):
+        self._polls = {}
+        self._token = json.dumps({'access_token': 'token'})
+        self._storagerouters = json.dumps({'data': ['guid-{0}'.format(index) for index in xrange(storagerouter_amount)]})
+
+    def request(self, method, url, headers=None, data=None, verify=False):
+        from ci.api_lib.helpers.transport import RecordedResponse
+        if url.endswith('/oauth2/token/'):
+            return RecordedResponse(200, self._token)
+        if '/tasks/' in url:
+            task_id = url.rstrip('/').rsplit('/', 1)[1]
+            polls = self._polls.get(task_id, 0) + 1
+            self._polls[task_id] = polls
+            finished = polls % self.POLLS == 0
+            return RecordedResponse(200, json.dumps({'id': task_id, 'status': 'SUCCESS' if finished else 'PENDING', 'successful': finished, 'result': None}))
+        return RecordedResponse(200, self._storagerouters)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+
+@BenchmarkSuite.register('api.call', number=2000, description='OVSClient.get of a list, served by a stand-in transport')
+def _api_call():
+    from ci.api_lib.helpers.api import OVSClient
+    client = OVSClient('10.100.1.1', 'admin', 'admin', transport=_InstantTransport())
+    yield lambda: client.get('/storagerouters/', params={'contents': 'name'})
+
+
+@BenchmarkSuite.register('api.wait_for_task', number=500,
+                         description='OVSClient.wait_for_task of a task finishing after {0} polls, without waiting'.format(_InstantTransport.POLLS))
+def _api_wait_for_task():
+    from ci.api_lib.helpers.api import OVSClient
+    client = OVSClient('10.100.1.1', 'admin', 'admin', transport=_InstantTransport())
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')  # wait_for_task prints every poll
+    try:
+        yield lambda: client.wait_for_task('task-1')
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+@contextmanager
+def _generated_dal():
+    from ci.api_lib.helpers.cache import IndexCache
+    from ci.api_lib.helpers.tests.fakedal import FakeDal
+    FakeDal.reset()
+    FakeDal.install()
+    IndexCache.invalidate()
+    try:
+        FakeDal.generate(storagerouter_amount=50, disks_per_storagerouter=10, vpool_amount=2, vdisk_amount=10000)
+        yield
+    finally:
+        FakeDal.uninstall()
+        FakeDal.reset()
+        IndexCache.invalidate()
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+@BenchmarkSuite.register('decorators.required_roles', number=50, description='required_roles (LOCAL) on a fake DAL with 500 disks')
+def _decorators_required_roles():
+    from ci.api_lib.validate.decorators import required_roles
+    function = required_roles(['DB', 'DTL', 'WRITE'], 'LOCAL')(_noop)
+    with _generated_dal():
+        yield lambda: function(storagerouter_ip='10.0.7.1')
+
+
+@BenchmarkSuite.register('decorators.check_vpool', number=500, description='check_vpool on a fake DAL with 50 storagerouters and 2 vPools')
+def _decorators_check_vpool():
+    from ci.api_lib.validate.decorators import check_vpool
+    function = check_vpool(_noop)
+    with _generated_dal():
+        yield lambda: function(storagerouter_ip='10.0.7.1', vpool_name='vpool1')
+
+
+@BenchmarkSuite.register('decorators.required_vdisk', number=50, description='required_vdisk on a fake DAL with 10,000 vDisks')
+def _decorators_required_vdisk():
+    from ci.api_lib.validate.decorators import required_vdisk
+    function = required_vdisk(_noop)
+    with _generated_dal():
+        yield lambda: function(vdisk_name='vdisk9999', vpool_name='vpool1')
+
+
+@BenchmarkSuite.register('setupjsongenerator.topology', number=1, description='SetupJsonGenerator building a setup of 250 nodes')
+def _setupjsongenerator_topology():
+    from ci.api_lib.helpers.tests.jsongeneratorbenchmarktestcase import generate_topology
+    yield lambda: generate_topology(250)
+
+
+class _VirDomain(object):
+    """
+    Stand-in for a libvirt domain
+    """
+
+    def __init__(self, disk_amount):
+        disks = ''.join("<disk type='file' device='disk'><driver name='qemu' type='raw'/>"
+                        "<source file='/mnt/vpool/vm/disk{0}.raw'/><target dev='vd{1}' bus='virtio'/></disk>".format(index, chr(ord('a') + index))
+                        for index in xrange(disk_amount))
+        self.xml = ("<domain type='kvm'><name>vm</name><memory unit='KiB'>2097152</memory><devices>{0}"
+                    "<interface type='bridge'><mac address='52:54:00:00:00:01'/><source bridge='br0'/><model type='virtio'/></interface>"
+                    "</devices></domain>").format(disks)
+
+    def XMLDesc(self, flags):
+        return self.xml
+
+
+@BenchmarkSuite.register('kvm.extract_command', number=20000, description='KVM Sdk._extract_command of the disk options')
+def _kvm_extract_command():
+    from ci.api_lib.helpers.hypervisor.apis.kvm.option_mapping import SdkOptionMapping
+    from ci.api_lib.helpers.hypervisor.apis.kvm.sdk import Sdk
+    options = {'mountpoint': '/mnt/vpool/vm/disk0.raw', 'bus': 'virtio', 'boot_order': 1}
+    yield lambda: Sdk._extract_command(options, SdkOptionMapping.disk_options_mapping)
+
+
+@BenchmarkSuite.register('kvm.xml', number=1000, description='KVM Sdk._get_disks and _update_xml_for_ovs of a domain with 16 disks')
+def _kvm_xml():
+    from ci.api_lib.helpers.hypervisor.apis.kvm.sdk import Sdk
+    domain = _VirDomain(16)
+    edge_configuration = {'hostname': '10.100.1.1', 'port': 26203}
+
+    def _parse():
+        Sdk._get_disks(domain)
+        Sdk._update_xml_for_ovs(domain.xml, edge_configuration)
+    yield _parse
+
+
+class _FileClient(object):
+    """
+    Stand-in for an SSHClient of which only the file operations are used
+    """
+
+    def __init__(self, contents):
+        self.contents = contents
+
+    def file_read(self, path):
+        return self.contents
+
+    def file_write(self, path, contents):
+        self.contents = contents
+
+
+@BenchmarkSuite.register('fstab.get_entry_by_attr', number=200, description='FstabHelper lookup of the last entry of an fstab with 500 entries')
+def _fstab_get_entry_by_attr():
+    from ci.api_lib.helpers.fstab import FstabHelper
+    lines = ['# /etc/fstab: static file system information.']
+    lines.extend('/dev/sd{0} /mnt/disk{1} ext4 defaults,nofail 0 2'.format(chr(ord('a') + index % 26), index) for index in xrange(500))
+    fstab = FstabHelper(path='/etc/fstab', client=_FileClient('\n'.join(lines)))
+    yield lambda: fstab.get_entry_by_attr('mountpoint', '/mnt/disk499')
+
+
+class _SudsObject(object):
+    """
+    Stand-in for the objects created by the suds factory and returned by the VMware SDK
+    """
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _SudsClient(object):
+    """
+    Stand-in for the suds client of the VMware SDK, answering RetrieveProperties with a list of virtual machines
+    """
+
+    def __init__(self, vm_amount):
+        self.factory = self
+        self.service = self
+        self.vm_amount = vm_amount
+
+    @staticmethod
+    def create(name):
+        return _SudsObject()
+
+    def RetrieveProperties(self, collector, specs):
+        return [_SudsObject(obj=_SudsObject(_type='VirtualMachine', value='vm-{0}'.format(index)),
+                            propSet=[_SudsObject(name='name', val='vm{0}'.format(index)),
+                                     _SudsObject(name='config.hardware.memoryMB', val=2048),
+                                     _SudsObject(name='config.hardware.numCPU', val=2),
+                                     _SudsObject(name='runtime.powerState', val='poweredOn'),
+                                     _SudsObject(name='summary.guest.ipAddress', val='10.100.1.{0}'.format(index % 256))])
+                for index in xrange(self.vm_amount)]
+
+
+@BenchmarkSuite.register('vmware.get_object', number=10,
+                         description='VMware Sdk._get_object hydrating 200 virtual machines with nested properties, including building the response')
+def _vmware_get_object():
+    from ci.api_lib.helpers.hypervisor.apis.vmware.sdk import Sdk
+    sdk = Sdk.__new__(Sdk)  # Skips connecting to a vCenter
+    sdk._client = _SudsClient(200)
+    sdk._serviceContent = _SudsObject(propertyCollector=None)
+    folder = _SudsObject(_type='Folder', value='group-v1')
+    yield lambda: sdk._get_object(folder, prop_type='VirtualMachine', properties=['name', 'config.hardware.memoryMB', 'config.hardware.numCPU',
+                                                                                   'runtime.powerState', 'summary.guest.ipAddress'], as_list=True)
+
+
+def main(arguments=None):
+    """
+    Run the benchmarks, compare them with the baseline and optionally write the results
+    :return: exit code: 1 when a benchmark regressed
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks of the automation library')
+    parser.add_argument('--filter', action='append', help='only run benchmarks of which the name contains this string')
+    parser.add_argument('--repeat', type=int, default=5, help='amount of rounds per benchmark')
+    parser.add_argument('--scale', type=float, default=1.0, help='factor applied to the amount of calls per round')
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    parser.add_argument('--baseline', default=BenchmarkSuite.BASELINE_PATH, help='results to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=BenchmarkSuite.TOLERANCE, help='relative change of the median which is reported')
+    arguments = parser.parse_args(arguments)
+
+    results = BenchmarkSuite.run(names=arguments.filter, repeat=arguments.repeat, scale=arguments.scale)
+    comparison = BenchmarkSuite.compare(results, BenchmarkSuite.load(arguments.baseline), tolerance=arguments.tolerance)
+    results['comparison'] = comparison
+    print BenchmarkSuite.format_comparison(comparison)
+    if arguments.output is not None:
+        BenchmarkSuite.save(results, arguments.output)
+    if arguments.save_baseline is True:
+        BenchmarkSuite.save(results, arguments.baseline)
+    return 1 if any(entry['status'] == BenchmarkSuite.REGRESSION for entry in comparison.itervalues()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from ci.api_lib.helpers.tests.benchmark import BenchmarkSuite, main
+
+
+class BenchmarkTestcase(unittest.TestCase):
+
+    def test_run(self):
+        results = BenchmarkSuite.run(names=['api.', 'fstab.', 'decorators.check_vpool'], repeat=1, scale=0.01)
+        self.assertItemsEqual(results['results'].keys(), ['api.call', 'api.wait_for_task', 'fstab.get_entry_by_attr', 'decorators.check_vpool'])
+        for result in results['results'].itervalues():
+            self.assertGreater(result['median'], 0)
+            self.assertEquals(result['repeat'], 1)
+
+    def test_hypervisor_without_sdk(self):
+        # The hypervisor benchmarks use stand-ins, so they also run where libvirt and suds are not installed
+        results = BenchmarkSuite.run(names=['kvm.', 'vmware.'], repeat=1, scale=0.01)
+        self.assertItemsEqual(results['results'].keys(), ['kvm.extract_command', 'kvm.xml', 'vmware.get_object'])
+        for name, result in results['results'].iteritems():
+            self.assertNotIn('skipped', result, '{0} was skipped: {1}'.format(name, result.get('skipped')))
+            self.assertGreater(result['median'], 0)
+
+    def test_compare(self):
+        def _results(**medians):
+            return {'results': dict((name.replace('_', '.'), {'median': median} if median is not None else {'skipped': 'No module named libvirt'})
+                                    for name, median in medians.iteritems())}
+
+        comparison = BenchmarkSuite.compare(_results(api_call=2.0, api_wait=1.0, kvm_xml=None, fstab_parse=1.0, vmware_get=0.5),
+                                            _results(api_call=1.0, api_wait=1.1, kvm_xml=1.0, vmware_get=1.0),
+                                            tolerance=0.3)
+        self.assertEquals(dict((name, entry['status']) for name, entry in comparison.iteritems()),
+                          {'api.call': BenchmarkSuite.REGRESSION,
+                           'api.wait': BenchmarkSuite.UNCHANGED,
+                           'kvm.xml': BenchmarkSuite.SKIPPED,
+                           'fstab.parse': BenchmarkSuite.NEW,
+                           'vmware.get': BenchmarkSuite.IMPROVEMENT})
+        self.assertEquals(comparison['api.call']['ratio'], 2.0)
+        self.assertIn('regression', BenchmarkSuite.format_comparison(comparison))
+
+    def test_baseline(self):
+        directory = tempfile.mkdtemp()
+        try:
+            baseline = os.path.join(directory, 'baseline.json')
+            output = os.path.join(directory, 'results.json')
+            arguments = ['--filter', 'fstab.', '--repeat', '1', '--scale', '0.01', '--baseline', baseline]
+            self.assertEquals(main(arguments + ['--save-baseline']), 0)
+            # A single short round is noisy, so only a large slowdown counts as a regression here
+            self.assertEquals(main(arguments + ['--output', output, '--tolerance', '10']), 0)
+            with open(output) as results_file:
+                results = json.load(results_file)
+            self.assertIn(results['comparison']['fstab.get_entry_by_attr']['status'], [BenchmarkSuite.UNCHANGED, BenchmarkSuite.IMPROVEMENT])
+            self.assertIsNotNone(results['comparison']['fstab.get_entry_by_attr']['baseline'])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
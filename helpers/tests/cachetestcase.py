@@ -0,0 +1,77 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import unittest
+from threading import Event, Thread
+from ci.api_lib.helpers.cache import IndexCache
+
+
+class IndexCacheTestcase(unittest.TestCase):
+
+    def setUp(self):
+        IndexCache.invalidate()
+        IndexCache.reset_statistics()
+        self.builds = []
+        self.started = Event()
+        self.release = Event()
+        self.finished = Event()
+
+    def tearDown(self):
+        self.release.set()
+        IndexCache.invalidate()
+        IndexCache.reset_statistics()
+
+    def _slow_builder(self):
+        self.builds.append('slow')
+        self.started.set()
+        self.release.wait(5)
+        self.finished.set()
+        return {'key': 'slow'}
+
+    def _build_in_thread(self, results):
+        thread = Thread(target=lambda: results.append(IndexCache.get('slow', self._slow_builder)))
+        thread.start()
+        self.started.wait(5)
+        return thread
+
+    def test_build_does_not_block_other_indexes(self):
+        results = []
+        thread = self._build_in_thread(results)
+        # Other indexes are built, looked up and invalidated while the slow index is being built
+        self.assertEquals(IndexCache.lookup('fast', lambda: {'key': 'fast'}, 'key'), 'fast')
+        IndexCache.invalidate('fast')
+        self.assertFalse(self.finished.is_set())
+        waiting = Thread(target=lambda: results.append(IndexCache.get('slow', self._slow_builder)))
+        waiting.start()
+        self.release.set()
+        thread.join(5)
+        waiting.join(5)
+        self.assertEquals(results, [{'key': 'slow'}] * 2)
+        self.assertEquals(self.builds, ['slow'])  # The waiting thread used the index built by the other one
+        self.assertEquals(IndexCache.get_statistics()['slow'], {'hits': 1, 'misses': 1, 'invalidations': 0, 'fallbacks': 0})
+
+    def test_invalidate_during_build(self):
+        results = []
+        thread = self._build_in_thread(results)
+        IndexCache.invalidate()  # Eg an object was created while the index was built from the model
+        self.release.set()
+        thread.join(5)
+        self.assertEquals(results, [{'key': 'slow'}])
+        IndexCache.get('slow', self._slow_builder)
+        self.assertEquals(self.builds, ['slow', 'slow'])  # The outdated index was not kept
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from ci.api_lib.helpers.cache import IndexCache
+from ci.api_lib.helpers.dag import DAGExecutor, DAGNode
+from ci.api_lib.helpers.tests.fakedal import FakeDal
+
+
+class CheckpointTestcase(unittest.TestCase):
+
+    SETUP_CONFIG = {'domains': ['domain01'],
+                    'storagerouters': {'10.100.1.1': {'vpools': {'vpool01': {'backend_name': 'backend01', 'preset': 'preset01'}}}}}
+
+    def setUp(self):
+        FakeDal.reset()
+        FakeDal.install()
+        IndexCache.invalidate()
+        # The setup modules import from the DAL directly
+        from ci.api_lib.setup.checkpoint import SetupCheckpoint
+        from ci.api_lib.setup.orchestrator import SetupOrchestrator
+        self.checkpoint_class = SetupCheckpoint
+        self.orchestrator_class = SetupOrchestrator
+        self._build_graph = SetupOrchestrator.__dict__['build_graph']
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'journal.jsonl')
+
+    def tearDown(self):
+        self.orchestrator_class.build_graph = self._build_graph
+        shutil.rmtree(self.directory)
+        FakeDal.uninstall()
+        FakeDal.reset()
+        IndexCache.invalidate()
+
+    def _record(self, checkpoint, name, status=DAGNode.SUCCESS, result=True, **kwargs):
+        node = DAGNode(name, None, kwargs=kwargs)
+        node.status = status
+        node.result = result
+        checkpoint.record(node)
+
+    def test_header(self):
+        checkpoint = self.checkpoint_class(self.SETUP_CONFIG, path=self.path)
+        self._record(checkpoint, 'role:10.100.1.1:sda')
+        self.assertEquals(self.checkpoint_class(self.SETUP_CONFIG, path=self.path).get_completed(), {'role:10.100.1.1:sda': True})
+        # A journal of another setup config is discarded
+        other_config = dict(self.SETUP_CONFIG, domains=['domain02'])
+        self.assertEquals(self.checkpoint_class(other_config, path=self.path).get_completed(), {})
+        self.assertEquals(self.checkpoint_class(self.SETUP_CONFIG, path=self.path).get_completed(), {})
+        with open(self.path, 'w') as journal:
+            journal.write('not a header\n')
+        self.assertEquals(self.checkpoint_class(self.SETUP_CONFIG, path=self.path).get_completed(), {})
+
+    def test_corrupt_tail(self):
+        checkpoint = self.checkpoint_class(self.SETUP_CONFIG, path=self.path)
+        self._record(checkpoint, 'role:10.100.1.1:sda', result={'roles': ['DB']})
+        self._record(checkpoint, 'role:10.100.1.1:sdb', status=DAGNode.FAILED, result=None)
+        with open(self.path, 'a') as journal:
+            journal.write('{"step": "role:10.100.1.1:sdb", "sta')  # Killed while writing
+        checkpoint = self.checkpoint_class(self.SETUP_CONFIG, path=self.path)
+        self.assertEquals(checkpoint.get_completed(), {'role:10.100.1.1:sda': {'roles': ['DB']}})
+        self._record(checkpoint, 'role:10.100.1.1:sdc', result=object())  # Results which are not serializable are stored as repr
+        self.assertIn('object at', checkpoint.get_completed()['role:10.100.1.1:sdc'])
+
+    def test_invalidate(self):
+        checkpoint = self.checkpoint_class(self.SETUP_CONFIG, path=self.path)
+        self._record(checkpoint, 'role:10.100.1.1:sda')
+        self._record(checkpoint, 'role:10.100.1.1:sdb')
+        checkpoint.invalidate('role:10.100.1.1:sda')
+        self.assertEquals(checkpoint.get_completed().keys(), ['role:10.100.1.1:sdb'])
+        self.assertEquals(self.checkpoint_class(self.SETUP_CONFIG, path=self.path).get_completed().keys(), ['role:10.100.1.1:sdb'])
+        checkpoint.reset()
+        self.assertEquals(self.checkpoint_class(self.SETUP_CONFIG, path=self.path).get_completed(), {})
+
+    def test_guids(self):
+        from ovs.dal.hybrids.domain import Domain
+        from ovs.dal.hybrids.vpool import VPool
+        domain = FakeDal.add(Domain, name='domain01')
+        vpool = FakeDal.add(VPool, name='vpool01')
+        checkpoint = self.checkpoint_class(self.SETUP_CONFIG, path=self.path)
+        self._record(checkpoint, 'domain:domain01', domain_name='domain01')
+        self._record(checkpoint, 'vpool:10.100.1.1:vpool01', vpool_name='vpool01', vpool_details={}, storagerouter_ip='10.100.1.1')
+        self._record(checkpoint, 'role:10.100.1.1:sda', storagerouter_ip='10.100.1.1', diskname='sda', roles=['DB'])
+        self._record(checkpoint, 'vdisk:vpool01:vdisk01', vdisk_name='vdisk01', vpool_name='vpool01')  # Cannot be resolved
+        expected = {'domain:domain01': domain.guid, 'vpool:10.100.1.1:vpool01': vpool.guid, 'role:10.100.1.1:sda': None, 'vdisk:vpool01:vdisk01': None}
+        self.assertEquals(checkpoint.get_guids(), expected)
+        self.assertEquals(self.checkpoint_class(self.SETUP_CONFIG, path=self.path).get_guids(), expected)
+        with open(self.path) as journal:
+            self.assertEquals(json.loads(journal.readlines()[1])['guid'], domain.guid)
+
+    def test_resume(self):
+        from ovs.dal.hybrids.domain import Domain
+        from ovs.dal.hybrids.vpool import VPool
+        executed = []
+        state = {'fail': True}
+
+        def _add_domain(domain_name):
+            executed.append('domain')
+            FakeDal.add(Domain, name=domain_name)
+
+        def _add_vpool(vpool_name, storagerouter_ip):
+            executed.append('vpool')
+            if state['fail'] is True:
+                raise RuntimeError('Adding the vpool failed')
+            FakeDal.add(VPool, name=vpool_name)
+
+        def _build_graph(setup_config, max_workers=None):
+            executor = DAGExecutor()
+            executor.add('domain:domain01', _add_domain, kwargs={'domain_name': 'domain01'})
+            executor.add('vpool:10.100.1.1:vpool01', _add_vpool, kwargs={'vpool_name': 'vpool01', 'storagerouter_ip': '10.100.1.1'},
+                         dependencies=['domain:domain01'])
+            return executor
+
+        self.orchestrator_class.build_graph = staticmethod(_build_graph)
+        report = self.checkpoint_class.deploy(self.SETUP_CONFIG, path=self.path, verify=False)
+        self.assertFalse(report['successful'])
+        self.assertEquals(report['resumed'], [])
+        self.assertEquals(executed, ['domain', 'vpool'])
+        state['fail'] = False
+        report = self.checkpoint_class.deploy(self.SETUP_CONFIG, path=self.path, verify=False)
+        self.assertTrue(report['successful'])
+        self.assertEquals(report['resumed'], ['domain:domain01'])
+        self.assertEquals(executed, ['domain', 'vpool', 'vpool'])
+        self.assertEquals(sorted(report['guids']), ['domain:domain01', 'vpool:10.100.1.1:vpool01'])
+        self.assertTrue(all(guid is not None for guid in report['guids'].itervalues()))
+        # Nothing left to do
+        report = self.checkpoint_class.deploy(self.SETUP_CONFIG, path=self.path, verify=False)
+        self.assertEquals(report['steps'], {})
+        self.assertEquals(len(executed), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import unittest
+from subprocess import check_output
+from ci.api_lib.helpers.sshclient import CommandBatch
+
+
+class LocalClient(object):
+    """
+    Runs the batch script in a local shell instead of over SSH
+    """
+    def __init__(self):
+        self.scripts = []
+
+    def run(self, command, allow_insecure=False):
+        self.scripts.append(command)
+        return check_output(['bash', '-c', command]).rstrip('\n')
+
+
+class CommandBatchTestcase(unittest.TestCase):
+
+    MARKER = 'ovs-ci-batch-test'
+
+    def test_demultiplex(self):
+        commands = ['echo first', 'printf "two\\nlines"', 'true', 'echo error >&2; exit 3']
+        output = check_output(['bash', '-c', CommandBatch.build_script(commands, self.MARKER)])
+        results = CommandBatch.parse_output(output, commands, self.MARKER)
+        self.assertEquals([(result['exit_code'], result['output']) for result in results],
+                          [(0, 'first'), (0, 'two\nlines'), (0, ''), (3, 'error')])
+        self.assertEquals([result['command'] for result in results], commands)
+
+    def test_trailing_newline(self):
+        commands = ['printf "line\\n"', 'printf "line\\n\\n"', 'printf "line"']
+        output = check_output(['bash', '-c', CommandBatch.build_script(commands, self.MARKER)])
+        results = CommandBatch.parse_output(output, commands, self.MARKER)
+        self.assertEquals([result['output'] for result in results], ['line', 'line\n', 'line'])
+
+    def test_stop_on_error(self):
+        client = LocalClient()
+        batch = CommandBatch(client)
+        batch.add(['echo', 'it works'])
+        batch.add('false')
+        batch.add(['echo', 'not executed'])
+        results = batch.execute(stop_on_error=True)
+        self.assertEquals(len(client.scripts), 1)
+        self.assertEquals([result['exit_code'] for result in results], [0, 1, None])
+        self.assertEquals(results[0]['output'], 'it works')
+        self.assertEquals(results[2]['output'], '')
+        self.assertEquals(len(batch), 0)
+        # Without stop_on_error, all commands run
+        results = CommandBatch.run(client, [['echo', 'a'], 'false', ['echo', "it's quoted"]])
+        self.assertEquals([result['exit_code'] for result in results], [0, 1, 0])
+        self.assertEquals(results[2]['output'], "it's quoted")
+
+    def test_raise_on_error(self):
+        client = LocalClient()
+        self.assertEquals(CommandBatch.run(client, ['true'], raise_on_error=True)[0]['exit_code'], 0)
+        with self.assertRaises(RuntimeError) as context:
+            CommandBatch.run(client, ['true', 'echo broken; exit 2', 'true'], raise_on_error=True)
+        self.assertIn('exit code 2', str(context.exception))
+        self.assertIn('broken', str(context.exception))
+        self.assertEquals(CommandBatch(client).execute(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
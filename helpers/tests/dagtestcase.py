@@ -0,0 +1,162 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import unittest
+from threading import Lock
+from ci.api_lib.helpers.dag import DAGExecutor, DAGNode
+
+
+class DAGExecutorTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.executed = []
+        self.running = {}
+        self.max_running = {}
+        self._lock = Lock()
+
+    def _step(self, name, duration=0, resource='all', fail=False):
+        with self._lock:
+            self.running[resource] = self.running.get(resource, 0) + 1
+            self.max_running[resource] = max(self.max_running.get(resource, 0), self.running[resource])
+        time.sleep(duration)
+        with self._lock:
+            self.running[resource] -= 1
+            self.executed.append(name)
+        if fail is True:
+            raise RuntimeError('{0} failed'.format(name))
+        return name
+
+    def _add(self, executor, name, dependencies=None, resource=None, **kwargs):
+        kwargs.setdefault('resource', resource or 'all')
+        return executor.add(name, self._step, args=(name,), kwargs=kwargs, dependencies=dependencies, resource=resource)
+
+    def test_dependency_order(self):
+        executor = DAGExecutor(max_workers=4)
+        self._add(executor, 'domain', duration=0.02)
+        self._add(executor, 'backend', dependencies=['domain'], duration=0.02)
+        self._add(executor, 'roles', duration=0.01)
+        self._add(executor, 'vpool', dependencies=['backend', 'roles'])
+        self._add(executor, 'vdisk', dependencies=['vpool'])
+        self.assertEquals(executor.get_topological_order(), ['domain', 'backend', 'roles', 'vpool', 'vdisk'])
+        report = executor.execute()
+        self.assertTrue(report['successful'])
+        for dependency, dependent in [('domain', 'backend'), ('backend', 'vpool'), ('roles', 'vpool'), ('vpool', 'vdisk')]:
+            self.assertLess(self.executed.index(dependency), self.executed.index(dependent))
+        self.assertEquals(executor.nodes['vdisk'].result, 'vdisk')
+        self.assertGreater(self.max_running['all'], 1)  # Independent steps ran concurrently
+
+    def test_failure(self):
+        executor = DAGExecutor(max_workers=2)
+        self._add(executor, 'backend', fail=True)
+        self._add(executor, 'preset', dependencies=['backend'])
+        self._add(executor, 'vpool', dependencies=['preset'])
+        self._add(executor, 'domain', duration=0.01)
+        finished = []
+        report = executor.execute(callback=lambda node: finished.append(node.name))
+        self.assertFalse(report['successful'])
+        self.assertEquals(dict((name, step['status']) for name, step in report['steps'].iteritems()),
+                          {'backend': DAGNode.FAILED, 'preset': DAGNode.SKIPPED, 'vpool': DAGNode.SKIPPED, 'domain': DAGNode.SUCCESS})
+        self.assertEquals(report['steps']['backend']['error'], 'backend failed')
+        self.assertEquals(report['steps']['vpool']['error'], 'Dependency backend failed')
+        self.assertItemsEqual(finished, ['backend', 'domain'])
+
+    def test_stop_on_error(self):
+        executor = DAGExecutor(max_workers=1)
+        self._add(executor, 'first', fail=True)
+        self._add(executor, 'second')
+        self._add(executor, 'third')
+        report = executor.execute(stop_on_error=True)
+        self.assertEquals(self.executed, ['first'])
+        self.assertEquals(report['steps']['second']['status'], DAGNode.SKIPPED)
+        self.assertEquals(report['steps']['third']['error'], 'Execution was stopped after a failure')
+
+    def test_interrupted_step(self):
+        def _exit():
+            raise SystemExit(3)
+
+        executor = DAGExecutor(max_workers=2)
+        executor.add('exit', _exit)
+        self._add(executor, 'dependent', dependencies=['exit'])
+        self._add(executor, 'other', dependencies=['slow'])
+        self._add(executor, 'slow', duration=0.05)
+        report = executor.execute()  # Should not block on the worker which stopped
+        self.assertEquals(report['steps']['exit']['status'], DAGNode.FAILED)
+        self.assertEquals(report['steps']['exit']['error'], 'SystemExit: 3')
+        self.assertEquals(report['steps']['dependent']['status'], DAGNode.SKIPPED)
+        self.assertEquals(report['steps']['slow']['status'], DAGNode.SUCCESS)
+        self.assertEquals(report['steps']['other']['status'], DAGNode.SKIPPED)  # No new steps start after an interruption
+
+    def test_resources(self):
+        executor = DAGExecutor(max_workers=6)
+        for index in xrange(3):
+            for ip in ['10.100.1.1', '10.100.1.2']:
+                self._add(executor, '{0}-{1}'.format(ip, index), resource=ip, duration=0.02)
+        self.assertTrue(executor.execute()['successful'])
+        self.assertEquals(self.max_running, {'10.100.1.1': 1, '10.100.1.2': 1})
+        self.assertEquals(len(self.executed), 6)
+
+    def test_validation(self):
+        executor = DAGExecutor()
+        self._add(executor, 'a', dependencies=['c'])
+        self._add(executor, 'b', dependencies=['a'])
+        self._add(executor, 'c', dependencies=['b'])
+        with self.assertRaises(ValueError) as context:
+            executor.execute()
+        self.assertIn('Dependency cycle detected: a -> c -> b -> a', str(context.exception))
+        self.assertEquals(self.executed, [])
+        with self.assertRaises(ValueError):
+            self._add(executor, 'a')
+        executor = DAGExecutor()
+        self._add(executor, 'a', dependencies=['unknown'])
+        with self.assertRaises(ValueError):
+            executor.get_topological_order()
+        with self.assertRaises(ValueError):
+            DAGExecutor(max_workers=0)
+
+    def test_restrict(self):
+        executor = DAGExecutor()
+        self._add(executor, 'domain')
+        self._add(executor, 'backend', dependencies=['domain'])
+        self._add(executor, 'vpool', dependencies=['backend', 'domain'])
+        executor.restrict(['backend', 'vpool'])
+        self.assertEquals(executor.nodes['vpool'].dependencies, ['backend'])
+        self.assertEquals(executor.nodes['backend'].dependencies, [])
+        self.assertTrue(executor.execute()['successful'])
+        self.assertEquals(self.executed, ['backend', 'vpool'])
+        with self.assertRaises(ValueError):
+            executor.restrict(['domain'])
+
+    def test_critical_path(self):
+        executor = DAGExecutor()
+        durations = {'domain': 1, 'backend': 5, 'roles': 2, 'vpool': 3, 'vdisk': 1, 'arakoon': 4}
+        self._add(executor, 'domain')
+        self._add(executor, 'backend', dependencies=['domain'])
+        self._add(executor, 'roles')
+        self._add(executor, 'vpool', dependencies=['backend', 'roles'])
+        self._add(executor, 'vdisk', dependencies=['vpool'])
+        self._add(executor, 'arakoon', dependencies=['roles'])
+        for name, duration in durations.iteritems():
+            executor.nodes[name].start = 100
+            executor.nodes[name].end = 100 + duration
+        self.assertEquals(executor.get_critical_path(), (['domain', 'backend', 'vpool', 'vdisk'], 10))
+        report = executor.get_report()
+        self.assertEquals(report['serial_duration'], 16)
+        self.assertEquals(report['critical_path_duration'], 10)
+        self.assertEquals(DAGExecutor().get_critical_path(), ([], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,593 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+In-memory stand-in for the hybrids and lists of the OVS DAL, to profile the helpers without a running framework
+Usage:
+    with FakeDal() as dal:  # Replaces ovs.dal.* in sys.modules
+        dal.generate(storagerouter_amount=50, vdisk_amount=10000)
+        VDiskHelper.get_vdisk_by_name('vdisk09999', 'vpool0')
+Install the fake before importing modules which import from ovs.dal directly (eg setup.arakoon).
+Modules importing through LazyImport may be imported before.
+"""
+import imp
+import sys
+import copy
+import uuid
+import types
+from collections import OrderedDict
+from ci.api_lib.helpers.lazy import LazyModule
+
+
+class ObjectNotFoundException(Exception):
+    """
+    Raised when loading a hybrid of which the guid is unknown
+    """
+
+
+def enumerator(name, items):
+    """
+    Mimics DataObject.enumerator: a dict mapping every item onto itself, of which the items are also attributes (eg ROLES.DB)
+    :param name: name of the enumerator
+    :type name: str
+    :param items: names of the items
+    :type items: list
+    :return: the enumerator
+    :rtype: dict
+    """
+    enumerator_class = type(name, (dict,), {})
+    enumerator = enumerator_class(zip(items, items))
+    for item in items:
+        setattr(enumerator, item, item)
+    return enumerator
+
+
+class FakeHybrid(object):
+    """
+    Hybrid of which the data lives in the FakeDal
+    As in the DAL, Hybrid(guid) loads an object, Hybrid() creates one which is stored by save()
+    Relations are declared as (name, class name of the related hybrid, name of the reverse relation, one-to-one)
+    and are available as <name>, <name>_guid, <reverse name> and <reverse name>_guids (or <reverse name>_guid when one-to-one)
+    Dynamics are computed by the _<name> method on every access
+    """
+    _properties = {}  # Name -> default value
+    _relations = []
+    _dynamics = []
+    _reverse_relations = {}  # Filled in by FakeDal.register: reverse name -> (class name, relation name, one-to-one)
+
+    def __new__(cls, guid=None, data=None):
+        if guid is not None:
+            return FakeDal.get_object(cls.__name__, guid)
+        hybrid = object.__new__(cls)
+        hybrid.__dict__['guid'] = None
+        hybrid.__dict__['_saved_relations'] = {}
+        for key, default in cls._properties.iteritems():
+            hybrid.__dict__[key] = copy.deepcopy(default)
+        for relation in cls._relations:
+            hybrid.__dict__['{0}_guid'.format(relation[0])] = None
+        for key, value in (data or {}).iteritems():
+            setattr(hybrid, key, value)
+        return hybrid
+
+    def __getattr__(self, item):
+        # Only called for relations, reverse relations and dynamics
+        cls = self.__class__
+        for name, class_name, _, _ in cls._relations:
+            if item == name:
+                guid = self.__dict__['{0}_guid'.format(name)]
+                return None if guid is None else FakeDal.get_object(class_name, guid)
+        reverse_name = item[:-6] if item.endswith('_guids') else item[:-5] if item.endswith('_guid') else item
+        if reverse_name in cls._reverse_relations:
+            class_name, name, onetoone = cls._reverse_relations[reverse_name]
+            guids = FakeDal.get_related_guids(class_name, name, self.guid)
+            if onetoone is True:
+                if item.endswith('_guids'):
+                    raise AttributeError(item)
+                guid = guids[0] if len(guids) > 0 else None
+                if item.endswith('_guid'):
+                    return guid
+                return None if guid is None else FakeDal.get_object(class_name, guid)
+            if item.endswith('_guids'):
+                return guids
+            if item == reverse_name:
+                return [FakeDal.get_object(class_name, related_guid) for related_guid in guids]
+        if item in cls._dynamics:
+            return getattr(self, '_{0}'.format(item))()
+        raise AttributeError("'{0}' object has no attribute '{1}'".format(cls.__name__, item))
+
+    def __setattr__(self, key, value):
+        for name, _, _, _ in self.__class__._relations:
+            if key == name:
+                key, value = '{0}_guid'.format(name), None if value is None else value.guid
+                break
+        self.__dict__[key] = value
+
+    def __eq__(self, other):
+        return isinstance(other, FakeHybrid) and other.__class__ is self.__class__ and other.guid == self.guid
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.__class__.__name__, self.guid))
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(self.__class__.__name__, self.guid)
+
+    def save(self):
+        """
+        Store the object and update the reverse relations
+        :return: None
+        """
+        if self.guid is None:
+            self.__dict__['guid'] = str(uuid.uuid4())
+        FakeDal.store(self)
+
+    def delete(self):
+        """
+        Remove the object from the model
+        :return: None
+        """
+        FakeDal.remove(self)
+
+    def invalidate_dynamics(self, *args):
+        """
+        Dynamics are computed on every access
+        """
+        pass
+
+    def export(self):
+        """
+        :return: the properties and relation guids of the object
+        :rtype: dict
+        """
+        data = dict((key, copy.deepcopy(self.__dict__[key])) for key in self._properties)
+        data.update(('{0}_guid'.format(relation[0]), self.__dict__['{0}_guid'.format(relation[0])]) for relation in self._relations)
+        data['guid'] = self.guid
+        return data
+
+
+class Domain(FakeHybrid):
+    _properties = {'name': None}
+    _dynamics = ['storage_router_layout']
+
+    def _storage_router_layout(self):
+        layout = {'regular': [], 'recovery': []}
+        for junction in self.storagerouters:
+            layout['recovery' if junction.backup is True else 'regular'].append(junction.storagerouter_guid)
+        return layout
+
+
+class StorageRouter(FakeHybrid):
+    _properties = {'name': None, 'ip': None, 'machine_id': None, 'node_type': 'MASTER', 'rdma_capable': False, 'features': {}}
+    _dynamics = ['regular_domains', 'recovery_domains']
+
+    def _regular_domains(self):
+        return [junction.domain_guid for junction in self.domains if junction.backup is False]
+
+    def _recovery_domains(self):
+        return [junction.domain_guid for junction in self.domains if junction.backup is True]
+
+
+class StorageRouterDomain(FakeHybrid):
+    _properties = {'backup': False}
+    _relations = [('domain', 'Domain', 'storagerouters', False),
+                  ('storagerouter', 'StorageRouter', 'domains', False)]
+
+
+class Disk(FakeHybrid):
+    _properties = {'name': None, 'aliases': [], 'size': 0, 'state': 'OK', 'is_ssd': False, 'model': None, 'serial': None}
+    _relations = [('storagerouter', 'StorageRouter', 'disks', False)]
+
+
+class DiskPartition(FakeHybrid):
+    ROLES = enumerator('Role', ['BACKEND', 'DB', 'DTL', 'SCRUB', 'WRITE'])
+    _properties = {'roles': [], 'mountpoint': None, 'offset': 0, 'size': 0, 'aliases': [], 'state': 'OK'}
+    _relations = [('disk', 'Disk', 'partitions', False)]
+
+
+class VPool(FakeHybrid):
+    _properties = {'name': None, 'status': 'RUNNING', 'metadata': {}}
+
+
+class StorageDriver(FakeHybrid):
+    _properties = {'name': None, 'storagedriver_id': None, 'storage_ip': None, 'cluster_ip': None, 'mountpoint': None, 'ports': {}}
+    _relations = [('vpool', 'VPool', 'storagedrivers', False),
+                  ('storagerouter', 'StorageRouter', 'storagedrivers', False)]
+    _dynamics = ['vdisks_guids']
+
+    def _vdisks_guids(self):
+        return [vdisk.guid for vdisk in self.vpool.vdisks if vdisk.storagerouter_guid == self.storagerouter_guid]
+
+
+class VDisk(FakeHybrid):
+    _properties = {'name': None, 'devicename': None, 'size': 0, 'volume_id': None, 'storagerouter_guid': None, 'snapshots': [], 'metadata': {},
+                   'is_vtemplate': False}
+    _relations = [('vpool', 'VPool', 'vdisks', False),
+                  ('parent_vdisk', 'VDisk', 'child_vdisks', False)]
+
+
+class BackendType(FakeHybrid):
+    _properties = {'name': None, 'code': None}
+
+
+class Backend(FakeHybrid):
+    _properties = {'name': None, 'status': 'RUNNING', 'regular_domains': []}
+    _relations = [('backend_type', 'BackendType', 'backends', False)]
+
+
+class AlbaBackend(FakeHybrid):
+    SCALINGS = enumerator('Scaling', ['GLOBAL', 'LOCAL'])
+    _properties = {'alba_id': None, 'scaling': 'LOCAL', 'presets': [], 'linked_backend_guids': []}
+    _relations = [('backend', 'Backend', 'alba_backend', True)]
+    _dynamics = ['name']
+
+    def _name(self):
+        return self.backend.name
+
+
+class AlbaNode(FakeHybrid):
+    _properties = {'node_id': None, 'ip': None, 'port': 8500, 'username': None, 'password': None, 'type': 'ASD', 'stack': {}}
+    _relations = [('storagerouter', 'StorageRouter', 'alba_node', True)]
+
+
+class ServiceType(FakeHybrid):
+    _properties = {'name': None}
+
+    class ARAKOON_CLUSTER_TYPES(object):
+        ABM = 'ABM'
+        CFG = 'CFG'
+        FWK = 'FWK'
+        NSM = 'NSM'
+        SD = 'SD'
+
+
+class Service(FakeHybrid):
+    _properties = {'name': None, 'ports': []}
+    _relations = [('type', 'ServiceType', 'services', False),
+                  ('storagerouter', 'StorageRouter', 'services', False)]
+
+
+class IscsiNode(FakeHybrid):
+    _properties = {'name': None, 'ip': None, 'node_id': None}
+
+
+class FakeDal(object):
+    """
+    Model holding the fake hybrids, and installer of the fake ovs.dal modules
+    The model is process-wide, as the DAL is
+    """
+    HYBRIDS = [Domain, StorageRouter, StorageRouterDomain, Disk, DiskPartition, VPool, StorageDriver, VDisk,
+               BackendType, Backend, AlbaBackend, AlbaNode, ServiceType, Service, IscsiNode]
+    # Module name -> (list class name, hybrid class name, {method name: attribute to match, or None to list all})
+    LISTS = {'domainlist': ('DomainList', 'Domain', {'get_domains': None, 'get_by_name': 'name'}),
+             'storagerouterlist': ('StorageRouterList', 'StorageRouter', {'get_storagerouters': None, 'get_by_ip': 'ip', 'get_by_machine_id': 'machine_id', 'get_by_name': 'name'}),
+             'disklist': ('DiskList', 'Disk', {'get_disks': None}),
+             'diskpartitionlist': ('DiskPartitionList', 'DiskPartition', {'get_partitions': None}),
+             'vpoollist': ('VPoolList', 'VPool', {'get_vpools': None, 'get_vpool_by_name': 'name'}),
+             'storagedriverlist': ('StorageDriverList', 'StorageDriver', {'get_storagedrivers': None, 'get_by_storagedriver_id': 'storagedriver_id'}),
+             'vdisklist': ('VDiskList', 'VDisk', {'get_vdisks': None, 'get_vdisk_by_name': 'name', 'get_vdisk_by_volume_id': 'volume_id'}),
+             'backendtypelist': ('BackendTypeList', 'BackendType', {'get_backend_types': None, 'get_backend_type_by_code': 'code'}),
+             'backendlist': ('BackendList', 'Backend', {'get_backends': None, 'get_by_name': 'name'}),
+             'albabackendlist': ('AlbaBackendList', 'AlbaBackend', {'get_albabackends': None}),
+             'albanodelist': ('AlbaNodeList', 'AlbaNode', {'get_albanodes': None, 'get_albanode_by_ip': 'ip', 'get_albanode_by_node_id': 'node_id'}),
+             'servicetypelist': ('ServiceTypeList', 'ServiceType', {'get_service_types': None, 'get_by_name': 'name'}),
+             'servicelist': ('ServiceList', 'Service', {'get_services': None}),
+             'iscsinodelist': ('IscsiNodeList', 'IscsiNode', {'get_iscsi_nodes': None})}
+
+    _objects = dict((hybrid.__name__, OrderedDict()) for hybrid in HYBRIDS)
+    _related = {}  # (class name, relation name) -> {guid of the related object: OrderedDict of guids}
+    _saved_modules = None
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *args):
+        self.uninstall()
+
+    @classmethod
+    def register(cls):
+        """
+        Resolve the reverse relations of the hybrids
+        :return: None
+        """
+        for hybrid in cls.HYBRIDS:
+            hybrid._reverse_relations = {}
+        for hybrid in cls.HYBRIDS:
+            for name, class_name, reverse_name, onetoone in hybrid._relations:
+                cls._get_class(class_name)._reverse_relations[reverse_name] = (hybrid.__name__, name, onetoone)
+
+    @classmethod
+    def _get_class(cls, class_name):
+        for hybrid in cls.HYBRIDS:
+            if hybrid.__name__ == class_name:
+                return hybrid
+        raise ValueError('Unknown hybrid {0}'.format(class_name))
+
+    @classmethod
+    def install(cls):
+        """
+        Replace the ovs.dal modules by fake ones. The ovs package itself is only faked when it cannot be imported
+        :return: None
+        """
+        if cls._saved_modules is not None:
+            raise RuntimeError('The fake DAL is already installed')
+        modules = {}
+        if 'ovs' not in sys.modules:
+            try:
+                imp.find_module('ovs')
+            except ImportError:
+                modules['ovs'] = cls._create_module('ovs', package=True)
+        modules['ovs.dal'] = cls._create_module('ovs.dal', package=True)
+        modules['ovs.dal.hybrids'] = cls._create_module('ovs.dal.hybrids', package=True)
+        modules['ovs.dal.lists'] = cls._create_module('ovs.dal.lists', package=True)
+        modules['ovs.dal.exceptions'] = cls._create_module('ovs.dal.exceptions', ObjectNotFoundException=ObjectNotFoundException)
+        for hybrid in cls.HYBRIDS:
+            module_name = 'ovs.dal.hybrids.{0}'.format(hybrid.__name__.lower())
+            modules[module_name] = cls._create_module(module_name, **{hybrid.__name__: hybrid})
+        for module_name, (list_name, class_name, methods) in cls.LISTS.iteritems():
+            module_name = 'ovs.dal.lists.{0}'.format(module_name)
+            modules[module_name] = cls._create_module(module_name, **{list_name: cls._create_list(list_name, class_name, methods)})
+        cls._saved_modules = dict((module_name, sys.modules.get(module_name)) for module_name in modules)
+        cls._saved_modules.update((module_name, module) for module_name, module in sys.modules.items()
+                                  if module_name.startswith('ovs.dal.') and module_name not in modules)
+        for module_name in cls._saved_modules:
+            sys.modules.pop(module_name, None)
+        sys.modules.update(modules)
+        LazyModule.unload('ovs.dal')
+
+    @classmethod
+    def uninstall(cls):
+        """
+        Restore the ovs.dal modules replaced by install
+        :return: None
+        """
+        if cls._saved_modules is None:
+            return
+        for module_name, module in cls._saved_modules.iteritems():
+            if module is None:
+                sys.modules.pop(module_name, None)
+            else:
+                sys.modules[module_name] = module
+        cls._saved_modules = None
+        LazyModule.unload('ovs.dal')
+
+    @staticmethod
+    def _create_module(name, package=False, **attributes):
+        module = types.ModuleType(name)
+        if package is True:
+            module.__path__ = []
+        module.__dict__.update(attributes)
+        return module
+
+    @classmethod
+    def _create_list(cls, list_name, class_name, methods):
+        attributes = {'__doc__': 'Fake {0}'.format(list_name)}
+        for method_name, attribute in methods.iteritems():
+            if attribute is None:
+                function = lambda: cls.get_objects(class_name)
+            else:
+                function = cls._create_lookup(class_name, attribute)
+            attributes[method_name] = staticmethod(function)
+        if class_name == 'VDisk':
+            attributes['get_by_devicename_and_vpool'] = staticmethod(cls._get_vdisk_by_devicename_and_vpool)
+        if class_name == 'StorageDriver':
+            attributes['get_storagedrivers_by_storagerouter'] = staticmethod(lambda storagerouter_guid: cls.get_object('StorageRouter', storagerouter_guid).storagedrivers)
+        return type(list_name, (object,), attributes)
+
+    @classmethod
+    def _create_lookup(cls, class_name, attribute):
+        def _lookup(value):
+            for hybrid in cls._objects[class_name].itervalues():
+                if hybrid.__dict__.get(attribute) == value:
+                    return hybrid
+            return None
+        return _lookup
+
+    @classmethod
+    def _get_vdisk_by_devicename_and_vpool(cls, devicename, vpool):
+        for vdisk in vpool.vdisks:
+            if vdisk.devicename == devicename:
+                return vdisk
+        return None
+
+    @classmethod
+    def get_object(cls, class_name, guid):
+        """
+        :param class_name: name of the hybrid
+        :type class_name: str
+        :param guid: guid of the object
+        :type guid: str
+        :return: the object
+        :rtype: FakeHybrid
+        :raises ObjectNotFoundException: when the guid is unknown
+        """
+        try:
+            return cls._objects[class_name][guid]
+        except KeyError:
+            raise ObjectNotFoundException('{0} with guid {1} not found'.format(class_name, guid))
+
+    @classmethod
+    def get_objects(cls, class_name):
+        """
+        :param class_name: name of the hybrid
+        :type class_name: str
+        :return: all objects of the hybrid, in order of creation
+        :rtype: list
+        """
+        return cls._objects[class_name].values()
+
+    @classmethod
+    def get_related_guids(cls, class_name, relation_name, guid):
+        """
+        :return: guids of the objects of which the relation points to the given guid
+        :rtype: list
+        """
+        return cls._related.get((class_name, relation_name), {}).get(guid, {}).keys()
+
+    @classmethod
+    def store(cls, hybrid):
+        """
+        Store an object, and (re)index its relations
+        :param hybrid: the object
+        :type hybrid: FakeHybrid
+        :return: None
+        """
+        class_name = hybrid.__class__.__name__
+        for name, _, _, _ in hybrid._relations:
+            related = cls._related.setdefault((class_name, name), {})
+            previous_guid = hybrid.__dict__['_saved_relations'].get(name)
+            current_guid = hybrid.__dict__['{0}_guid'.format(name)]
+            if previous_guid == current_guid:
+                continue
+            if previous_guid is not None:
+                related[previous_guid].pop(hybrid.guid, None)
+            if current_guid is not None:
+                related.setdefault(current_guid, OrderedDict())[hybrid.guid] = None
+            hybrid.__dict__['_saved_relations'][name] = current_guid
+        cls._objects[class_name][hybrid.guid] = hybrid
+
+    @classmethod
+    def remove(cls, hybrid):
+        """
+        Remove an object from the model
+        :param hybrid: the object
+        :type hybrid: FakeHybrid
+        :return: None
+        """
+        class_name = hybrid.__class__.__name__
+        if cls._objects[class_name].pop(hybrid.guid, None) is None:
+            raise ObjectNotFoundException('{0} with guid {1} not found'.format(class_name, hybrid.guid))
+        for name, guid in hybrid.__dict__['_saved_relations'].iteritems():
+            if guid is not None:
+                cls._related[(class_name, name)][guid].pop(hybrid.guid, None)
+        hybrid.__dict__['_saved_relations'] = {}
+
+    @classmethod
+    def reset(cls):
+        """
+        Remove all objects
+        :return: None
+        """
+        cls._objects = dict((hybrid.__name__, OrderedDict()) for hybrid in cls.HYBRIDS)
+        cls._related = {}
+
+    @classmethod
+    def add(cls, hybrid_class, **data):
+        """
+        Create and save an object
+        :param hybrid_class: class of the object
+        :type hybrid_class: type
+        :return: the object
+        :rtype: FakeHybrid
+        """
+        hybrid = hybrid_class(data=data)
+        hybrid.save()
+        return hybrid
+
+    @classmethod
+    def load_setup(cls, config):
+        """
+        Populate the model as it would be after deploying a setup.json
+        :param config: contents of a setup.json
+        :type config: dict
+        :return: None
+        """
+        setup = config['setup']
+        domains = dict((name, cls.add(Domain, name=name)) for name in setup.get('domains', []))
+        alba_type = cls.add(BackendType, name='ALBA', code='alba')
+        backends = {}
+        alba_nodes = {}
+        for backend_info in setup.get('backends', []):
+            backend = cls.add(Backend, name=backend_info['name'], backend_type=alba_type,
+                              regular_domains=[domains[name].guid for name in backend_info.get('domains', {}).get('domain_guids', [])])
+            backends[backend.name] = cls.add(AlbaBackend, backend=backend, alba_id=str(uuid.uuid4()), scaling=backend_info['scaling'],
+                                             presets=copy.deepcopy(backend_info.get('presets', [])))
+            if backend_info['scaling'] == 'LOCAL':
+                for ip in backend_info.get('osds', {}):
+                    if ip not in alba_nodes:
+                        alba_nodes[ip] = cls.add(AlbaNode, ip=ip, node_id=str(uuid.uuid4()))
+        for backend_info in setup.get('backends', []):
+            if backend_info['scaling'] == 'GLOBAL':
+                backends[backend_info['name']].linked_backend_guids = [backends[name].guid for name in backend_info.get('osds', {})]
+        vpools = {}
+        for index, (ip, storagerouter_info) in enumerate(sorted(setup.get('storagerouters', {}).iteritems())):
+            storagerouter = cls.add(StorageRouter, name=storagerouter_info.get('hostname', ip), ip=ip, machine_id='machine{0}'.format(index))
+            if ip in alba_nodes:
+                alba_nodes[ip].storagerouter = storagerouter
+                alba_nodes[ip].save()
+            for key, backup in [('domain_guids', False), ('recovery_domain_guids', True)]:
+                for domain_name in storagerouter_info.get('domains', {}).get(key, []):
+                    cls.add(StorageRouterDomain, domain=domains[domain_name], storagerouter=storagerouter, backup=backup)
+            for disk_name, disk_info in sorted(storagerouter_info.get('disks', {}).iteritems()):
+                disk = cls.add(Disk, name=disk_name, storagerouter=storagerouter, aliases=['/dev/{0}'.format(disk_name)])
+                cls.add(DiskPartition, disk=disk, roles=list(disk_info.get('roles', [])), mountpoint='/mnt/{0}'.format(disk_name))
+            for vpool_name, vpool_info in sorted(storagerouter_info.get('vpools', {}).iteritems()):
+                if vpool_name not in vpools:
+                    vpools[vpool_name] = cls.add(VPool, name=vpool_name, metadata={'backend': {'backend_info': {'name': vpool_info.get('backend_name'),
+                                                                                                                 'preset': vpool_info.get('preset')}}})
+                cls._add_storagedriver(vpools[vpool_name], storagerouter, vpool_info.get('storage_ip', ip))
+
+    @classmethod
+    def _add_storagedriver(cls, vpool, storagerouter, storage_ip):
+        storagedriver_id = '{0}{1}'.format(vpool.name, storagerouter.machine_id)
+        return cls.add(StorageDriver, name=storagedriver_id, storagedriver_id=storagedriver_id, storage_ip=storage_ip, cluster_ip=storagerouter.ip,
+                       mountpoint='/mnt/{0}'.format(vpool.name), vpool=vpool, storagerouter=storagerouter)
+
+    @classmethod
+    def generate(cls, storagerouter_amount=10, disks_per_storagerouter=10, vpool_amount=1, vdisk_amount=100, domain_amount=2):
+        """
+        Populate the model with a generated cluster: every vpool is extended to all storagerouters,
+        the vdisks are spread evenly over the vpools and storagerouters
+        Names: storagerouter<i> (ip 10.<i / 256>.<i % 256>.1), disks sd<letter(s)>, vpool<i>, vdisk<i> (devicename /vdisk<i>.raw)
+        :return: None
+        """
+        domains = [cls.add(Domain, name='domain{0}'.format(index)) for index in xrange(domain_amount)]
+        vpools = [cls.add(VPool, name='vpool{0}'.format(index)) for index in xrange(vpool_amount)]
+        storagerouters = []
+        roles = [['DB', 'DTL'], ['WRITE'], ['SCRUB'], ['BACKEND']]
+        for index in xrange(storagerouter_amount):
+            storagerouter = cls.add(StorageRouter, name='storagerouter{0}'.format(index), ip='10.{0}.{1}.1'.format(index / 256, index % 256),
+                                    machine_id='machine{0}'.format(index))
+            storagerouters.append(storagerouter)
+            if domain_amount > 0:
+                cls.add(StorageRouterDomain, domain=domains[index % domain_amount], storagerouter=storagerouter, backup=False)
+                if domain_amount > 1:
+                    cls.add(StorageRouterDomain, domain=domains[(index + 1) % domain_amount], storagerouter=storagerouter, backup=True)
+            for disk_index in xrange(disks_per_storagerouter):
+                disk_name = 'sd{0}'.format(cls._get_disk_letters(disk_index))
+                disk = cls.add(Disk, name=disk_name, storagerouter=storagerouter, aliases=['/dev/{0}'.format(disk_name)], size=10 ** 12)
+                cls.add(DiskPartition, disk=disk, roles=list(roles[disk_index % len(roles)]), mountpoint='/mnt/{0}'.format(disk_name), size=10 ** 12)
+            for vpool in vpools:
+                cls._add_storagedriver(vpool, storagerouter, storagerouter.ip)
+        for index in xrange(vdisk_amount):
+            if vpool_amount == 0 or storagerouter_amount == 0:
+                break
+            cls.add(VDisk, name='vdisk{0}'.format(index), devicename='/vdisk{0}.raw'.format(index), volume_id=str(uuid.uuid4()), size=10 ** 10,
+                    vpool=vpools[index % vpool_amount], storagerouter_guid=storagerouters[(index / vpool_amount) % storagerouter_amount].guid)
+
+    @staticmethod
+    def _get_disk_letters(index):
+        letters = ''
+        index += 1
+        while index > 0:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(ord('a') + remainder) + letters
+        return letters
+
+
+FakeDal.register()
@@ -0,0 +1,147 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import sys
+import time
+import unittest
+from ci.api_lib.helpers.cache import IndexCache
+from ci.api_lib.helpers.ci_constants import CIConstants
+from ci.api_lib.helpers.disk import DiskHelper
+from ci.api_lib.helpers.domain import DomainHelper
+from ci.api_lib.helpers.storagerouter import StoragerouterHelper
+from ci.api_lib.helpers.tests.fakedal import FakeDal
+from ci.api_lib.helpers.tests.jsongeneratorbenchmarktestcase import generate_topology
+from ci.api_lib.helpers.vdisk import VDiskHelper
+from ci.api_lib.helpers.vpool import VPoolHelper
+
+
+class FakeDalTestcase(unittest.TestCase):
+
+    def setUp(self):
+        FakeDal.reset()
+        FakeDal.install()
+        IndexCache.invalidate()
+
+    def tearDown(self):
+        FakeDal.uninstall()
+        FakeDal.reset()
+        IndexCache.invalidate()
+
+    def test_install(self):
+        from ovs.dal.hybrids.vpool import VPool
+        from ovs.dal.lists.vpoollist import VPoolList
+        vpool = VPool()
+        vpool.name = 'vpool01'
+        vpool.save()
+        self.assertIs(VPoolList.get_vpool_by_name('vpool01'), vpool)
+        self.assertIs(VPoolHelper.get_vpool_by_name('vpool01'), vpool)  # Served through the LazyImport of the helper
+        FakeDal.uninstall()
+        self.assertIsNot(getattr(sys.modules.get('ovs.dal.lists.vpoollist'), 'VPoolList', None), VPoolList)
+        FakeDal.install()
+
+    def test_load_setup(self):
+        generator, _ = generate_topology(20, nodes_per_backend=5, domain_amount=2)
+        FakeDal.load_setup(generator.config)
+        storagerouter = StoragerouterHelper.get_storagerouter_by_ip('10.0.0.4')
+        self.assertEquals(storagerouter.name, 'node3')
+        self.assertEquals(DiskHelper.get_roles_from_disk(storagerouter.guid, 'sda'), ['WRITE', 'DTL', 'DB', 'SCRUB'])
+        self.assertEquals(len(VPoolHelper.get_vpool_by_name('vpool').storagedrivers), 20)
+        self.assertEquals(len(VPoolHelper.get_domains_by_vpool('vpool')), 2)
+        domain_guid = DomainHelper.get_domainguid_by_name('domain0')
+        self.assertIn(storagerouter.guid, DomainHelper.get_storagerouters_in_same_domain(domain_guid) +
+                      DomainHelper.get_domain_by_guid(domain_guid).storage_router_layout['recovery'])
+        backend = sys.modules['ovs.dal.lists.backendlist'].BackendList.get_by_name('backend-global')
+        self.assertEquals(len(backend.alba_backend.linked_backend_guids), 4)
+        self.assertIs(backend.alba_backend.backend, backend)
+
+    def test_relations(self):
+        FakeDal.generate(storagerouter_amount=4, disks_per_storagerouter=3, vpool_amount=2, vdisk_amount=16)
+        storagerouter = StoragerouterHelper.get_storagerouter_by_ip('10.0.2.1')
+        self.assertEquals([disk.name for disk in storagerouter.disks], ['sda', 'sdb', 'sdc'])
+        self.assertEquals(len(storagerouter.storagedrivers), 2)
+        storagedriver = storagerouter.storagedrivers[0]
+        self.assertEquals(len(storagedriver.vdisks_guids), 2)
+        partition = storagerouter.disks[0].partitions[0]
+        partition.delete()
+        self.assertEquals(storagerouter.disks[0].partitions, [])
+        vdisk = VDiskHelper.get_vdisk_by_name('vdisk3', 'vpool1')
+        vdisk.vpool = VPoolHelper.get_vpool_by_name('vpool0')
+        vdisk.save()
+        self.assertIn(vdisk.guid, VPoolHelper.get_vpool_by_name('vpool0').vdisks_guids)
+        self.assertNotIn(vdisk.guid, VPoolHelper.get_vpool_by_name('vpool1').vdisks_guids)
+
+    def test_role_inventory(self):
+        FakeDal.generate(storagerouter_amount=2, disks_per_storagerouter=2, vpool_amount=1, vdisk_amount=2)
+        storagerouter = StoragerouterHelper.get_storagerouter_by_ip('10.0.0.1')
+        inventory = DiskHelper.get_role_inventory()
+        self.assertIs(DiskHelper.get_role_inventory(), inventory)
+        disk_roles = DiskHelper.get_roles_from_disk(storagerouter.guid, 'sda')
+        self.assertEquals(inventory.get_roles(storagerouter.guid), set(disk_roles + DiskHelper.get_roles_from_disk(storagerouter.guid, 'sdb')))
+        self.assertTrue(DiskHelper.check_roles_on_disk(disk_roles, storagerouter.guid, 'sda'))
+        self.assertEquals(inventory.get_roles('unknown'), set())
+        # A disk added since the inventory was built is looked up on its storagerouter
+        from ovs.dal.hybrids.disk import Disk
+        from ovs.dal.hybrids.diskpartition import DiskPartition
+        disk = FakeDal.add(Disk, name='sdz', storagerouter=storagerouter)
+        self.assertIsInstance(DiskPartition.ROLES, dict)  # Like DataObject.enumerator
+        FakeDal.add(DiskPartition, disk=disk, roles=[DiskPartition.ROLES.BACKEND])
+        self.assertEquals(DiskHelper.get_roles_from_disk(storagerouter.guid, 'sdz'), ['BACKEND'])
+        self.assertIsNot(DiskHelper.get_role_inventory(), inventory)
+        self.assertIn('BACKEND', DiskHelper.get_role_inventory().get_roles(storagerouter.guid))
+        with self.assertRaises(RuntimeError):
+            DiskHelper.get_roles_from_disk(storagerouter.guid, 'sdy')
+
+    def test_storagerouter_lookups(self):
+        FakeDal.generate(storagerouter_amount=3, disks_per_storagerouter=1, vpool_amount=1, vdisk_amount=2)
+        IndexCache.reset_statistics()
+        storagerouter = StoragerouterHelper.get_storagerouter_by_ip('10.0.0.1')
+        for _ in xrange(5):  # Polling for objects which do not exist does not rebuild the indexes
+            self.assertIsNone(StoragerouterHelper.get_storagerouter_by_ip('10.0.9.9'))
+            self.assertIsNone(StoragerouterHelper.get_disk_by_name(storagerouter.guid, 'sdz'))
+        statistics = StoragerouterHelper.get_cache_statistics()
+        self.assertEquals(statistics[StoragerouterHelper.STORAGEROUTER_MAP_CACHE]['misses'], 1)
+        self.assertEquals(statistics[StoragerouterHelper.STORAGEROUTER_MAP_CACHE]['fallbacks'], 5)
+        self.assertEquals(statistics[StoragerouterHelper.DISK_MAP_CACHE]['misses'], 1)
+        from ovs.dal.hybrids.disk import Disk
+        disk = FakeDal.add(Disk, name='sdz', storagerouter=storagerouter)
+        self.assertEquals(StoragerouterHelper.get_disk_by_name(storagerouter.guid, 'sdz').guid, disk.guid)
+        self.assertEquals(StoragerouterHelper.get_disk_by_name(storagerouter.guid, 'sdz').guid, disk.guid)
+        self.assertEquals(StoragerouterHelper.get_cache_statistics()[StoragerouterHelper.DISK_MAP_CACHE]['misses'], 2)
+
+        ips = sorted(sr.ip for sr in StoragerouterHelper.get_storagerouters())
+        config = {'ci': {'grid_ip': ips[0], 'nodes': {ips[0]: {'role': 'VOLDRV'}, ips[1]: {'role': 'COMPUTE'}, ips[2]: {'role': 'VOLDRV'}}}}
+        CIConstants.set_config_source(config)
+        try:
+            roles = StoragerouterHelper.get_storagerouters_by_role()
+            self.assertEquals(sorted(sr.ip for sr in roles[:2]), [ips[0], ips[2]])
+            self.assertEquals(roles[2].ip, ips[1])
+            self.assertEquals(StoragerouterHelper.get_storagerouters_by_role(), roles)
+            config = {'ci': {'grid_ip': ips[0], 'nodes': {ips[0]: {'role': 'COMPUTE'}, ips[1]: {'role': 'VOLDRV'}, ips[2]: {'role': 'VOLDRV'}}}}
+            CIConstants.set_config_source(config)
+            self.assertEquals(StoragerouterHelper.get_storagerouters_by_role()[2].ip, ips[0])
+        finally:
+            CIConstants.set_config_source(None)
+
+    def test_scale(self):
+        start = time.time()
+        FakeDal.generate(storagerouter_amount=50, disks_per_storagerouter=10, vpool_amount=2, vdisk_amount=10000)
+        duration = time.time() - start
+        self.assertLess(duration, 5, 'Generating 10000 vdisks took {0:.3f}s'.format(duration))
+        self.assertEquals(len(DiskHelper.get_role_inventory().roles_by_disk), 500)
+        self.assertEquals(VDiskHelper.get_vdisk_by_name('vdisk9999', 'vpool1').name, 'vdisk9999')
+
+
+if __name__ == '__main__':
+    unittest.main()
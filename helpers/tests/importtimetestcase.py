@@ -0,0 +1,128 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+"""
+Import time benchmark, reporting like 'python -X importtime' does on newer Pythons:
+    python importtimetestcase.py ci.api_lib.helpers.vpool [more modules]
+"""
+import sys
+import json
+import unittest
+import subprocess
+from ci.api_lib.helpers.lazy import LazyImport, LazyModule
+
+# Executed in a fresh interpreter: a meta path finder times the loading of every module. Modules are reported
+# when their import finishes, so imported modules come before the module importing them
+PROFILER = r'''
+import imp
+import sys
+import json
+import time
+import importlib
+
+class Profiler(object):
+    def __init__(self):
+        self.loading = set()
+        self.stack = []
+        self.records = []
+
+    def find_module(self, fullname, path=None):
+        if fullname in self.loading:
+            return None
+        try:
+            handle = imp.find_module(fullname.rsplit('.', 1)[-1], path)
+        except ImportError:
+            return None  # Let the regular machinery handle (implicit relative) misses
+        if handle[0] is not None:
+            handle[0].close()
+        return self
+
+    def load_module(self, fullname):
+        if fullname in sys.modules:
+            return sys.modules[fullname]
+        self.loading.add(fullname)
+        self.stack.append([time.time(), 0.0])
+        try:
+            return importlib.import_module(fullname)
+        finally:
+            self.loading.discard(fullname)
+            start, children = self.stack.pop()
+            elapsed = time.time() - start
+            if self.stack:
+                self.stack[-1][1] += elapsed
+            self.records.append({'module': fullname, 'self': elapsed - children, 'cumulative': elapsed, 'depth': len(self.stack)})
+
+profiler = Profiler()
+sys.meta_path.insert(0, profiler)
+start = time.time()
+for module_name in sys.argv[1:]:
+    importlib.import_module(module_name)
+total = time.time() - start
+sys.meta_path.remove(profiler)
+sys.stdout.write(json.dumps({'total': total,
+                             'records': profiler.records,
+                             'modules': sorted(name for name, module in sys.modules.items() if module is not None)}))
+'''
+
+
+def measure(*module_names):
+    """
+    Import modules in a fresh interpreter
+    :param module_names: names of the modules to import
+    :return: dict with the total import time, a record per imported module and the names of all loaded modules
+    :rtype: dict
+    """
+    output = subprocess.check_output([sys.executable, '-c', PROFILER] + list(module_names))
+    return json.loads(output)
+
+
+def format_report(measurement):
+    """
+    :param measurement: result of measure
+    :type measurement: dict
+    :return: report with a line per imported module
+    :rtype: str
+    """
+    lines = ['import time: self [us] | cumulative | imported package']
+    for record in measurement['records']:
+        lines.append('import time: {0:>9} | {1:>10} | {2}{3}'.format(int(record['self'] * 1e6), int(record['cumulative'] * 1e6),
+                                                                      '  ' * record['depth'], record['module']))
+    lines.append('total: {0:.3f}s, {1} modules loaded'.format(measurement['total'], len(measurement['modules'])))
+    return '\n'.join(lines)
+
+
+class ImportTimeTestcase(unittest.TestCase):
+
+    def test_lazy_module(self):
+        module = LazyModule('json')
+        self.assertFalse(module.loaded)
+        self.assertEquals(module.dumps([1]), '[1]')
+        self.assertTrue(module.loaded)
+
+    def test_lazy_import(self):
+        dumps = LazyImport('json', 'dumps')
+        self.assertFalse(dumps.loaded)
+        self.assertEquals(dumps({}), '{}')
+        self.assertTrue(dumps.loaded)
+
+    def test_helpers_defer_heavy_modules(self):
+        measurement = measure('ci.api_lib.helpers.vpool', 'ci.api_lib.helpers.storagerouter', 'ci.api_lib.helpers.ci_constants',
+                              'ci.api_lib.helpers.hypervisor.apis.kvm.sdk', 'ci.api_lib.helpers.hypervisor.apis.vmware.sdk')
+        heavy = [module for module in measurement['modules'] if module.startswith(('ovs.dal.', 'ovs.lib.', 'libvirt', 'suds'))]
+        self.assertEquals(heavy, [], 'Heavy modules were imported eagerly:\n{0}'.format(format_report(measurement)))
+
+
+if __name__ == '__main__':
+    print format_report(measure(*sys.argv[1:]))
@@ -0,0 +1,93 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import json
+import time
+import unittest
+from ci.api_lib.helpers.instrumentation import Instrumentation
+from ci.api_lib.helpers.thread import ThreadHelper
+
+
+class _Setup(object):
+
+    @staticmethod
+    def add(amount):
+        for _ in xrange(amount):
+            Instrumentation.count(Instrumentation.API_CALLS)
+        return amount
+
+    @classmethod
+    def deploy(cls):
+        results, _ = ThreadHelper.run_in_parallel(cls.add, [1, 2, 3])
+        Instrumentation.count(Instrumentation.SSH_COMMANDS)
+        return sum(results.values())
+
+    @classmethod
+    def fail(cls):
+        raise RuntimeError('Failed')
+
+
+class InstrumentationTestcase(unittest.TestCase):
+
+    def setUp(self):
+        Instrumentation.enable(install=False)
+        Instrumentation.reset()
+        Instrumentation._instrument_class(_Setup)
+
+    def tearDown(self):
+        Instrumentation.disable()
+        Instrumentation.reset()
+
+    def test_disabled(self):
+        Instrumentation.disable()
+        self.assertEquals(_Setup.deploy(), 6)
+        self.assertEquals(Instrumentation.get_spans(), [])
+
+    def test_nested_spans(self):
+        self.assertEquals(_Setup.deploy(), 6)
+        spans = Instrumentation.get_spans()
+        self.assertEquals(len(spans), 1)
+        self.assertEquals(spans[0].name, '_Setup.deploy')
+        self.assertEquals(spans[0].counters, {'api_calls': 6, 'task_wait': 0, 'ssh_commands': 1})
+        # The calls in the threads of the ThreadHelper are nested under the span which started them
+        self.assertItemsEqual([(child.name, child.counters['api_calls']) for child in spans[0].children],
+                              [('_Setup.add', 1), ('_Setup.add', 2), ('_Setup.add', 3)])
+        exported = json.loads(Instrumentation.export_json())
+        self.assertEquals(len(exported[0]['children']), 3)
+
+    def test_totals(self):
+        _Setup.deploy()
+        with self.assertRaises(RuntimeError):
+            _Setup.fail()
+        totals = Instrumentation.get_totals()
+        self.assertEquals(totals['_Setup.add']['calls'], 3)
+        self.assertEquals(totals['_Setup.fail']['errors'], 1)
+        metrics = Instrumentation.export_prometheus()
+        self.assertIn('ci_operation_api_calls_total{operation="_Setup.deploy"} 6', metrics)
+        self.assertIn('ci_operation_errors_total{operation="_Setup.fail"} 1', metrics)
+
+    def test_task_wait(self):
+        @Instrumentation.instrument('wait', timer=Instrumentation.TASK_WAIT)
+        def _wait():
+            time.sleep(0.01)
+
+        with Instrumentation.span('outer') as span:
+            _wait()
+        self.assertGreaterEqual(span.counters['task_wait'], 0.01)
+        self.assertEquals(span.children[0].name, 'wait')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+"""
+Benchmark of the SetupJsonGenerator on large topologies:
+    python jsongeneratorbenchmarktestcase.py [amount of nodes]
+"""
+import sys
+import time
+import unittest
+from ci.api_lib.helpers.setupjsongenerator import SetupJsonGenerator
+
+
+def generate_topology(node_amount, nodes_per_backend=10, domain_amount=10):
+    """
+    Model a setup with a vpool on every storagerouter, a local backend per group of nodes and a global backend linking them
+    :param node_amount: amount of storagerouters
+    :type node_amount: int
+    :param nodes_per_backend: amount of storagerouters holding the osds of a local backend
+    :type nodes_per_backend: int
+    :param domain_amount: amount of domains
+    :type domain_amount: int
+    :return: tuple with the generator and the duration of the generation
+    :rtype: tuple(SetupJsonGenerator, float)
+    """
+    generator = SetupJsonGenerator(offline=True)
+    start = time.time()
+    ips = ['10.{0}.{1}.{2}'.format(index / 65536 % 256, index / 256 % 256, index % 256) for index in xrange(1, node_amount + 1)]
+    domains = ['domain{0}'.format(index) for index in xrange(domain_amount)]
+    generator.update_ci(ci_params={'setup': True, 'grid_ip': ips[0]})
+    for domain in domains:
+        generator.add_domain(domain)
+    local_backends = []
+    for index in xrange(0, node_amount, nodes_per_backend):
+        backend_name = 'backend{0}'.format(index / nodes_per_backend)
+        generator.add_backend(backend_name=backend_name, domains=[domains[index / nodes_per_backend % domain_amount]])
+        generator.add_preset_to_backend(backend_name=backend_name, preset_name='preset', policies=[[1, 2, 2, 1]])
+        generator.add_osd_to_backend(backend_name=backend_name, osds_on_disks=dict((ip, {'sdb': 2, 'sdc': 2}) for ip in ips[index:index + nodes_per_backend]))
+        local_backends.append(backend_name)
+    generator.add_backend(backend_name='backend-global', domains=domains, scaling='GLOBAL')
+    generator.add_preset_to_backend(backend_name='backend-global', preset_name='preset-global', policies=[[1, 2, 2, 1]])
+    for backend_name in local_backends:
+        generator.add_osd_to_backend(backend_name='backend-global', linked_backend=backend_name, linked_preset='preset')
+    for index, ip in enumerate(ips):
+        generator.add_storagerouter(storagerouter_ip=ip, hostname='node{0}'.format(index))
+        generator.add_domain_to_sr(storagerouter_ip=ip, name=domains[index % domain_amount])
+        generator.add_domain_to_sr(storagerouter_ip=ip, name=domains[(index + 1) % domain_amount], recovery=True)
+        generator.add_disk_to_sr(storagerouter_ip=ip, name='sda', roles=['WRITE', 'DTL', 'DB', 'SCRUB'])
+        generator.add_vpool(storagerouter_ip=ip, vpool_name='vpool', backend_name=local_backends[index / nodes_per_backend], preset_name='preset', storage_ip=ip)
+        generator.change_cache(storagerouter_ip=ip, vpool='vpool', block_cache=True, fragment_cache=False, on_write=False)
+        generator.update_storagedriver_of_vpool(sr_ip=ip, vpool_name='vpool')
+    return generator, time.time() - start
+
+
+class JsonGeneratorBenchmarkTestcase(unittest.TestCase):
+
+    def test_topology(self):
+        generator, _ = generate_topology(100)
+        setup = generator.config['setup']
+        self.assertEquals(len(setup['storagerouters']), 100)
+        self.assertEquals(len(setup['backends']), 11)
+        self.assertEquals(len(setup['backends'][-1]['osds']), 10)
+        generator.remove_preset_from_backend('backend3', 'preset')
+        self.assertEquals(setup['backends'][3]['presets'], [])
+        generator.remove_backend('backend3')
+        self.assertEquals(len(setup['backends']), 10)
+        with self.assertRaises(ValueError):
+            generator.add_osd_to_backend(backend_name='backend-global', linked_backend='backend3', linked_preset='preset')
+
+    def test_scales_linearly(self):
+        _, small = generate_topology(250)
+        _, large = generate_topology(1000)
+        # 4 times the nodes: a quadratic model would take 16 times longer
+        self.assertLess(large, max(small, 0.01) * 10, 'Generating 1000 nodes took {0:.3f}s, 250 nodes took {1:.3f}s'.format(large, small))
+
+
+if __name__ == '__main__':
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    _, duration = generate_topology(amount)
+    print 'Generated a topology of {0} nodes in {1:.3f}s'.format(amount, duration)
@@ -13,6 +13,7 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
+import socket
 import unittest
 from ci.api_lib.helpers.setupjsongenerator import SetupJsonGenerator
 
@@ -384,6 +385,21 @@ class JsonGeneratorTestcase(unittest.TestCase):
 
         self.assertDictEqual(self.generator.config, expected_output)
 
+    def test_reachability(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind((self.ip_1, 0))
+        listener.listen(1)
+        port = listener.getsockname()[1]
+        try:
+            self.generator.update_ci(ci_params={'setup': True, 'grid_ip': self.ip_1})
+            self.generator.add_storagerouter(storagerouter_ip=self.ip_1, hostname='hostname')
+            self.assertEquals(self.generator.get_ips(), set([self.ip_1]))
+            self.assertEquals(self.generator.validate_reachability(port=port, use_cache=False), {self.ip_1: True})
+        finally:
+            listener.close()
+        self.assertEquals(self.generator.validate_reachability(port=port), {self.ip_1: True})  # Cached
+        self.assertEquals(SetupJsonGenerator(offline=True).validate_reachability(port=port), {})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import socket
+import unittest
+from ci.api_lib.helpers import network
+from ci.api_lib.helpers.network import NetworkHelper
+
+
+class _Connection(object):
+    def close(self):
+        pass
+
+
+class NetworkHelperTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.up = set()
+        self.attempts = []
+        self._create_connection = network.socket.create_connection
+
+        def _create_connection(address, timeout=None):
+            self.attempts.append(address[0])
+            if address[0] not in self.up:
+                raise socket.timeout()
+            return _Connection()
+        network.socket.create_connection = _create_connection
+        NetworkHelper.clear_reachability_cache()
+
+    def tearDown(self):
+        network.socket.create_connection = self._create_connection
+        NetworkHelper.clear_reachability_cache()
+
+    def test_reachability_cache(self):
+        self.assertFalse(NetworkHelper.is_reachable('10.100.1.1'))
+        self.up.add('10.100.1.1')  # The host came up, eg after a reboot
+        self.assertTrue(NetworkHelper.is_reachable('10.100.1.1'))
+        self.assertTrue(NetworkHelper.is_reachable('10.100.1.1'))
+        self.assertEquals(self.attempts, ['10.100.1.1'] * 2)
+        self.up.clear()
+        self.assertTrue(NetworkHelper.is_reachable('10.100.1.1'))
+        self.assertFalse(NetworkHelper.is_reachable('10.100.1.1', use_cache=False))
+        self.assertFalse(NetworkHelper.is_reachable('10.100.1.1'))
+        self.assertEquals(len(self.attempts), 4)
+
+    def test_check_reachability(self):
+        self.up.update(['10.100.1.1', '10.100.1.3'])
+        ips = ['10.100.1.1', '10.100.1.2', '10.100.1.3']
+        self.assertEquals(NetworkHelper.check_reachability(ips), {'10.100.1.1': True, '10.100.1.2': False, '10.100.1.3': True})
+        self.up.add('10.100.1.2')
+        self.assertEquals(NetworkHelper.check_reachability(ips), dict((ip, True) for ip in ips))
+        self.assertEquals(sorted(self.attempts), sorted(ips + ['10.100.1.2']))
+
+
+if __name__ == '__main__':
+    unittest.main()
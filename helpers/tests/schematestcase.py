@@ -0,0 +1,110 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import os
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from ci.api_lib.helpers.ci_constants import CIConstants
+from ci.api_lib.helpers.tests.fakedal import DiskPartition, FakeDal
+from ci.api_lib.helpers.tests.jsongeneratorbenchmarktestcase import generate_topology
+from ci.api_lib.validate.schema import Mapping, Sequence, SetupSchema
+
+
+class SchemaTestcase(unittest.TestCase):
+
+    def test_fields(self):
+        schema = Mapping({'port': (int, {'min': 1024, 'max': 65535}, False),
+                          'transport': (str, ['tcp', 'rdma']),
+                          'names': Sequence((str, None, True), mandatory=False)}, extra=False)
+        self.assertEquals(schema.get_errors({'port': 8080, 'transport': u'tcp', 'names': ['a']}), [])
+        errors = schema.get_errors({'port': 80, 'names': ['a', 1], 'other': True}, path='proxy')
+        self.assertItemsEqual(errors, ['proxy/port: value 80 should be at least 1024',
+                                       'proxy/transport: missing mandatory key',
+                                       'proxy/names/1: is of type "int" but we expected type "str"',
+                                       'proxy/other: unsupported key'])
+        with self.assertRaises(RuntimeError):
+            schema.validate({'port': True, 'transport': 'udp'})
+        roles = DiskPartition.ROLES  # Dict subclass, like DataObject.enumerator
+        schema = Mapping({'roles': (list, roles, True)})
+        self.assertEquals(schema.get_errors({'roles': ['DB', roles.WRITE]}), [])
+        self.assertEquals(schema.get_errors({'roles': ['DB', 'NONE']}),
+                          ["/roles: entries of ['DB', 'NONE'] should be one of {0}".format(sorted(roles))])
+
+    def test_generated_topology(self):
+        generator, _ = generate_topology(1000)
+        config = json.loads(json.dumps(generator.config))  # Strings become unicode, as when loading setup.json
+        start = time.time()
+        errors = SetupSchema.get_errors(config)
+        duration = time.time() - start
+        self.assertEquals(errors, [])
+        self.assertLess(duration, 0.5, 'Validating 1000 nodes took {0:.3f}s'.format(duration))
+
+    def test_errors_are_collected(self):
+        generator, _ = generate_topology(20)
+        config = json.loads(json.dumps(generator.config))
+        setup = config['setup']
+        setup['backends'][0]['presets'][0]['policies'] = [[2, 1, 1, 1]]
+        setup['backends'][1]['osds']['10.0.0.15'] = {'sdb': 'two'}
+        storagerouter = setup['storagerouters']['10.0.0.3']
+        storagerouter['vpools']['vpool']['preset'] = 'unknown'
+        storagerouter['vpools']['vpool']['storagedriver'].pop('dtl_mode')
+        storagerouter['disks']['sda']['roles'].append('NONE')
+        errors = SetupSchema.get_errors(config)
+        self.assertEquals(len(errors), 5, '\n'.join(errors))
+        with self.assertRaises(RuntimeError):
+            SetupSchema.validate(config)
+
+    def test_config_file(self):
+        generator, _ = generate_topology(5)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'setup.json')
+        try:
+            with open(path, 'w') as config_file:
+                json.dump(generator.config, config_file)
+            CIConstants.set_config_source(path)
+            self.assertEquals(CIConstants.get_config()['ci']['grid_ip'], generator.config['ci']['grid_ip'])
+            generator.config['setup']['backends'][0]['scaling'] = 'REGIONAL'
+            with open(path, 'w') as config_file:
+                json.dump(generator.config, config_file)
+            # A long running process keeps the last valid config
+            self.assertEquals(CIConstants.reload()['setup']['backends'][0]['scaling'], 'LOCAL')
+            with open(path, 'w') as config_file:
+                config_file.write('{"ci": ')  # Being edited
+            self.assertEquals(CIConstants.reload()['ci']['grid_ip'], generator.config['ci']['grid_ip'])
+            # Nothing to fall back on
+            CIConstants.set_config_source(generator.config)
+            with self.assertRaises(RuntimeError) as context:
+                CIConstants.get_config()
+            self.assertIn('scaling: value "REGIONAL" should be one of', str(context.exception))
+        finally:
+            CIConstants.set_config_source(None)
+            shutil.rmtree(directory)
+
+    def test_proxy_configuration(self):
+        FakeDal.install()
+        try:
+            from ci.api_lib.setup.proxy import ProxySetup  # Imports from the DAL directly
+            with self.assertRaises(ValueError) as context:
+                ProxySetup.configure_proxy('backend01', {'log_level': 'debug', 'unknown': True})
+            self.assertIn('proxy/unknown: unsupported key', str(context.exception))
+        finally:
+            FakeDal.uninstall()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import time
+import unittest
+from threading import Event, Lock, Thread
+from ci.api_lib.helpers import sshclient
+from ci.api_lib.helpers.sshclient import SSHClientPool
+
+
+class _RawClient(object):
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _SSHClient(object):
+    """
+    Stand-in for an SSHClient which tracks whether it is used by more than one thread at a time
+    """
+    max_in_use = 0
+    lock = Lock()
+
+    def __init__(self, endpoint, username='root', password=None):
+        self.ip = endpoint
+        self.username = username
+        self._client = _RawClient()
+        self._users = 0
+
+    def is_connected(self):
+        return self._client.closed is False
+
+    def run(self, command):
+        with _SSHClient.lock:
+            self._users += 1
+            _SSHClient.max_in_use = max(_SSHClient.max_in_use, self._users)
+        time.sleep(0.01)
+        with _SSHClient.lock:
+            self._users -= 1
+        return command
+
+
+class SSHClientPoolTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self._ssh_client = sshclient.SSHClient
+        sshclient.SSHClient = _SSHClient
+        _SSHClient.max_in_use = 0
+        SSHClientPool.evict()
+        SSHClientPool.reset_statistics()
+
+    def tearDown(self):
+        SSHClientPool.evict()
+        SSHClientPool.reset_statistics()
+        sshclient.SSHClient = self._ssh_client
+
+    def test_checkout(self):
+        with SSHClientPool.checkout('10.100.1.1') as client:
+            with SSHClientPool.checkout('10.100.1.1') as other_client:
+                self.assertIsNot(client, other_client)  # A checked out client is never handed out twice
+            self.assertEquals(SSHClientPool.get_statistics()['checked_out'], 1)
+        with SSHClientPool.checkout('10.100.1.1') as reused_client:
+            self.assertIn(reused_client, [client, other_client])
+        statistics = SSHClientPool.get_statistics()
+        self.assertEquals((statistics['handshakes'], statistics['reused'], statistics['pooled'], statistics['checked_out']), (2, 1, 2, 0))
+        # A client which is not connected anymore is replaced
+        client._client.close()
+        other_client._client.close()
+        with SSHClientPool.checkout('10.100.1.1') as new_client:
+            self.assertNotIn(new_client, [client, other_client])
+        self.assertEquals(SSHClientPool.get_statistics()['dead'], 2)
+
+    def test_concurrent_users(self):
+        def _run(index):
+            with SSHClientPool.checkout('10.100.1.1') as client:
+                client.run('echo {0}'.format(index))
+
+        for _ in xrange(3):
+            threads = [Thread(target=_run, args=(index,)) for index in xrange(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEquals(_SSHClient.max_in_use, 1)
+        statistics = SSHClientPool.get_statistics()
+        self.assertEquals(statistics['handshakes'] + statistics['reused'], 24)
+        self.assertLessEqual(statistics['handshakes'], 8)
+        self.assertEquals(statistics['checked_out'], 0)
+
+    def test_evict_checked_out(self):
+        checked_out = Event()
+        evicted = Event()
+        clients = []
+
+        def _use():
+            with SSHClientPool.checkout('10.100.1.1') as client:
+                clients.append(client)
+                checked_out.set()
+                evicted.wait(5)
+
+        with SSHClientPool.checkout('10.100.1.1'):
+            pass
+        thread = Thread(target=_use)
+        thread.start()
+        checked_out.wait(5)
+        SSHClientPool.evict('10.100.1.1')  # Eg the node was rebooted while the client was in use
+        evicted.set()
+        thread.join(5)
+        self.assertTrue(clients[0]._client.closed)
+        statistics = SSHClientPool.get_statistics()
+        self.assertEquals((statistics['pooled'], statistics['evicted']), (0, 1))
+        with SSHClientPool.checkout('10.100.1.1') as client:
+            self.assertIsNot(client, clients[0])
+        self.assertEquals(SSHClientPool.get_statistics()['handshakes'], 2)
+
+    def test_release_unknown_client(self):
+        SSHClientPool.release(_SSHClient('10.100.1.1'))
+        self.assertEquals(SSHClientPool.get_statistics()['pooled'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
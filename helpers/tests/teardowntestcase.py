@@ -0,0 +1,101 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import unittest
+from threading import Lock
+from ci.api_lib.helpers.cache import IndexCache
+from ci.api_lib.helpers.tests.fakedal import FakeDal
+
+
+class TeardownTestcase(unittest.TestCase):
+
+    def setUp(self):
+        FakeDal.reset()
+        FakeDal.install()
+        IndexCache.invalidate()
+        # The remove modules import from the DAL directly
+        from ci.api_lib.remove.orchestrator import TeardownOrchestrator
+        from ci.api_lib.remove.vdisk import VDiskRemover
+        self.orchestrator_class = TeardownOrchestrator
+        self.remover_class = VDiskRemover
+        self.executed = []
+        self._lock = Lock()
+
+    def tearDown(self):
+        FakeDal.uninstall()
+        FakeDal.reset()
+        IndexCache.invalidate()
+
+    def _add_vpool(self):
+        from ovs.dal.hybrids.storagedriver import StorageDriver
+        from ovs.dal.hybrids.storagerouter import StorageRouter
+        from ovs.dal.hybrids.vdisk import VDisk
+        from ovs.dal.hybrids.vpool import VPool
+        storagerouter = FakeDal.add(StorageRouter, name='node1', ip='10.100.1.1')
+        vpool = FakeDal.add(VPool, name='vpool01', metadata={'backend': {'backend_info': {'name': 'backend01', 'preset': 'preset01'}}})
+        FakeDal.add(StorageDriver, vpool=vpool, storagerouter=storagerouter)
+        template = FakeDal.add(VDisk, name='template', devicename='/template.raw', vpool=vpool, is_vtemplate=True)
+        base = FakeDal.add(VDisk, name='base', devicename='/base.raw', vpool=vpool)
+        FakeDal.add(VDisk, name='clone01', devicename='/clone01.raw', vpool=vpool, parent_vdisk=template)
+        FakeDal.add(VDisk, name='clone02', devicename='/clone02.raw', vpool=vpool, parent_vdisk=base)
+        FakeDal.add(VDisk, name='single', devicename='/single.raw', vpool=vpool)
+
+    def _record(self, name):
+        def _execute(*args, **kwargs):
+            with self._lock:
+                self.executed.append(name)
+        return _execute
+
+    def _assert_vdisk_steps(self, executor):
+        vdisk_step = self.orchestrator_class.vdisk_step
+        nodes = executor.nodes
+        self.assertEquals(nodes[vdisk_step('vpool01', 'template.raw')].target, self.remover_class.remove_vtemplate_by_name)
+        for vdisk_name in ['base.raw', 'clone01.raw', 'clone02.raw', 'single.raw']:
+            self.assertEquals(nodes[vdisk_step('vpool01', vdisk_name)].target, self.remover_class.remove_vdisk_by_name)
+        self.assertEquals(nodes[vdisk_step('vpool01', 'template.raw')].dependencies, [vdisk_step('vpool01', 'clone01.raw')])
+        self.assertEquals(nodes[vdisk_step('vpool01', 'base.raw')].dependencies, [vdisk_step('vpool01', 'clone02.raw')])
+        self.assertEquals(nodes[vdisk_step('vpool01', 'single.raw')].dependencies, [])
+        for node in nodes.itervalues():
+            node.target = self._record(node.name)
+        self.assertTrue(executor.execute()['successful'])
+        for clone, parent in [('clone01.raw', 'template.raw'), ('clone02.raw', 'base.raw')]:
+            self.assertLess(self.executed.index(vdisk_step('vpool01', clone)), self.executed.index(vdisk_step('vpool01', parent)))
+        self.assertEquals(self.executed[-1], self.orchestrator_class.vpool_step('10.100.1.1', 'vpool01'))
+
+    def test_clones_and_templates(self):
+        self._add_vpool()
+        model = self.orchestrator_class.get_model_config()
+        structure = model['storagerouters']['10.100.1.1']['vpools']['vpool01']['vdisk_structure']
+        self.assertTrue(structure['template.raw']['is_vtemplate'])
+        self.assertEquals(structure['clone01.raw']['parent_vdisk_guid'], structure['template.raw']['guid'])
+        self._assert_vdisk_steps(self.orchestrator_class.build_graph(model, max_workers=4))
+
+    def test_prune_clones_and_templates(self):
+        from ci.api_lib.helpers.snapshot import ClusterSnapshot
+        from ci.api_lib.setup.reconcile import SetupReconciler
+        self._add_vpool()
+        # Build the snapshot from the objects as the API returns them
+        objects = {'storagerouters': [{'guid': sr.guid, 'name': sr.name, 'ip': sr.ip} for sr in FakeDal.get_objects('StorageRouter')],
+                   'vpools': [{'guid': vpool.guid, 'name': vpool.name, 'metadata': vpool.metadata} for vpool in FakeDal.get_objects('VPool')],
+                   'storagedrivers': [{'guid': sd.guid, 'vpool_guid': sd.vpool_guid, 'storagerouter_guid': sd.storagerouter_guid}
+                                      for sd in FakeDal.get_objects('StorageDriver')],
+                   'vdisks': [{'guid': vdisk.guid, 'devicename': vdisk.devicename, 'is_vtemplate': vdisk.is_vtemplate,
+                               'vpool_guid': vdisk.vpool_guid, 'parent_vdisk_guid': vdisk.parent_vdisk_guid} for vdisk in FakeDal.get_objects('VDisk')]}
+        executor = SetupReconciler.build_teardown_graph({}, ClusterSnapshot(objects, claimed_osds={}), max_workers=4)
+        self._assert_vdisk_steps(executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
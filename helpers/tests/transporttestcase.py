@@ -0,0 +1,103 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import os
+import gzip
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from ci.api_lib.helpers.api import OVSClient
+from ci.api_lib.helpers.transport import RecordedResponse, RecordingTransport, ReplayTransport
+
+
+class _Grid(object):
+    """
+    Transport answering like the API of a grid on which a task needs two polls to finish
+    """
+
+    def __init__(self):
+        self.polls = 0
+
+    def request(self, method, url, headers=None, data=None, verify=False):
+        if url.endswith('/oauth2/token/'):
+            return RecordedResponse(200, json.dumps({'access_token': 'live-token', 'token_type': 'Bearer'}))
+        if url.endswith('/tasks/task-1/'):
+            self.polls += 1
+            status = 'SUCCESS' if self.polls > 2 else 'PENDING'
+            return RecordedResponse(200, json.dumps({'id': 'task-1', 'status': status, 'successful': status == 'SUCCESS', 'result': self.polls}))
+        if method == 'GET' and '/storagerouters/' in url:
+            return RecordedResponse(200, json.dumps({'data': ['guid-1', 'guid-2']}))
+        return RecordedResponse(404, '{}')
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(seconds / 100.0)
+
+
+class TransportTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'grid.rec.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self):
+        transport = RecordingTransport(self.path, transport=_Grid())
+        client = OVSClient('10.100.1.1', 'admin', 'secret', transport=transport)
+        results = [client.get('/storagerouters/', params={'contents': 'name'}), client.wait_for_task('task-1')]
+        transport.close()
+        return results
+
+    def test_replay(self):
+        recorded = self._record()
+        transport = ReplayTransport(self.path)
+        client = OVSClient('10.100.1.2', 'admin', 'other', transport=transport)
+        start = time.time()
+        replayed = [client.get('/storagerouters/', params={'contents': 'name'}), client.wait_for_task('task-1')]
+        self.assertEquals(replayed, recorded)
+        self.assertEquals(replayed[1], (True, 3))
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEquals(transport.served, 5)  # Token, storagerouters and three polls
+        with self.assertRaises(RuntimeError):
+            client.get('/vpools/')
+
+    def test_recording_contents(self):
+        self._record()
+        replay = ReplayTransport(self.path)
+        self.assertItemsEqual(replay._responses.keys(), [('POST', '/api/oauth2/token/', None),
+                                                         ('GET', '/api/storagerouters/?contents=name', None),
+                                                         ('GET', '/api/tasks/task-1/', None)])
+        with gzip.open(self.path, 'rb') as recording:
+            contents = recording.read()
+        self.assertNotIn('secret', contents)
+        self.assertNotIn('live-token', contents)
+        token_response = replay._responses[('POST', '/api/oauth2/token/', None)][0]
+        self.assertEquals(json.loads(token_response['body']), {'access_token': RecordingTransport.REDACTED_TOKEN, 'token_type': 'Bearer'})
+
+    def test_timing(self):
+        self._record()
+        client = OVSClient('10.100.1.1', 'admin', 'secret', transport=ReplayTransport(self.path, speed=100))
+        start = time.time()
+        client.wait_for_task('task-1')
+        # Two polls wait a second each, replayed 100 times faster
+        self.assertGreaterEqual(time.time() - start, 0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+import unittest
+from threading import Event, Thread
+from ci.api_lib.validate import decorators
+from ci.api_lib.validate.decorators import ValidationContext, required_arakoon_cluster
+
+
+class ValidationContextTestcase(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.clusters = ['mycluster']
+        self._original_list = decorators._list_arakoon_clusters
+
+        def _list_arakoon_clusters():
+            self.calls.append('list')
+            return list(self.clusters)
+        decorators._list_arakoon_clusters = _list_arakoon_clusters
+
+    def tearDown(self):
+        decorators._list_arakoon_clusters = self._original_list
+
+    def _check(self, value):
+        self.calls.append(value)
+        return {'value': value}
+
+    def test_memoize(self):
+        self.assertEquals(ValidationContext.memoize(self._check, 1), {'value': 1})
+        self.assertEquals(ValidationContext.memoize(self._check, 1), {'value': 1})
+        self.assertEquals(self.calls, [1, 1])  # Nothing is memoized without a context
+        self.calls = []
+        with ValidationContext() as context:
+            first = ValidationContext.memoize(self._check, 1)
+            first['value'] = 'altered'
+            self.assertEquals(ValidationContext.memoize(self._check, 1), {'value': 1})
+            self.assertEquals(ValidationContext.memoize(self._check, 2), {'value': 2})
+            self.assertEquals(self.calls, [1, 2])
+            self.assertEquals(context.statistics['hits'], 1)
+            self.assertEquals(context.statistics['misses'], 2)
+            with self.assertRaises(RuntimeError):
+                with ValidationContext():
+                    pass
+        self.assertIsNone(ValidationContext._active)
+
+    def test_invalidation(self):
+        @required_arakoon_cluster
+        def _extend(cluster_name):
+            self.clusters.append('{0}-extended'.format(cluster_name))
+            return True
+
+        with ValidationContext() as context:
+            self.assertTrue(_extend(cluster_name='mycluster'))
+            self.assertTrue(_extend(cluster_name='mycluster-extended'))  # Only known after re-listing the clusters
+            self.assertEquals(self.calls, ['list', 'list'])
+            self.assertEquals(context.statistics['invalidations'], 2)
+            ValidationContext.memoize(decorators._list_arakoon_clusters)
+            ValidationContext.memoize(decorators._list_arakoon_clusters)
+            self.assertEquals(self.calls, ['list', 'list', 'list'])
+
+    def test_concurrent_invalidation(self):
+        started = Event()
+        invalidated = Event()
+
+        def _slow_check():
+            self.calls.append('slow')
+            started.set()
+            invalidated.wait(5)
+            return 'before change'
+
+        with ValidationContext() as context:
+            thread = Thread(target=ValidationContext.memoize, args=(_slow_check,))
+            thread.start()
+            started.wait(5)
+            ValidationContext.invalidate()  # Eg a parallel setup step which succeeded
+            invalidated.set()
+            thread.join(5)
+            self.assertEquals(context.statistics['stale'], 1)
+            # The outdated result was dropped so the check is executed again
+            self.assertEquals(ValidationContext.memoize(_slow_check), 'before change')
+            self.assertEquals(self.calls, ['slow', 'slow'])
+            self.assertEquals(ValidationContext.memoize(_slow_check), 'before change')
+            self.assertEquals(self.calls, ['slow', 'slow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
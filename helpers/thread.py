@@ -14,9 +14,11 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 import time
+import Queue
 import threading
 from threading import Lock
 from ovs.extensions.generic.logger import Logger
+from ..helpers.instrumentation import Instrumentation
 
 
 class ThreadHelper(object):
@@ -43,7 +45,7 @@ class ThreadHelper(object):
         ThreadHelper.LOGGER.info('Starting thread with target {0}'.format(target))
         event = threading.Event()
         kwargs['event'] = event
-        thread = threading.Thread(target=target, args=tuple(args), kwargs=kwargs)
+        thread = threading.Thread(target=Instrumentation.inherit(target), args=tuple(args), kwargs=kwargs)
         thread.setName(str(name))
         thread.setDaemon(True)
         thread.start()
@@ -54,12 +56,57 @@ class ThreadHelper(object):
         if kwargs is None:
             kwargs = {}
         ThreadHelper.LOGGER.info('Starting thread with target {0}'.format(target))
-        thread = threading.Thread(target=target, args=tuple(args), kwargs=kwargs)
+        thread = threading.Thread(target=Instrumentation.inherit(target), args=tuple(args), kwargs=kwargs)
         thread.setName(str(name))
         thread.setDaemon(True)
         thread.start()
         return thread
 
+    @staticmethod
+    def run_in_parallel(target, items, max_workers=10, name='ci_parallel'):
+        """
+        Executes the target for every item, using at most max_workers threads
+        :param target: function to call with a single item
+        :type target: callable
+        :param items: items to process. Must be hashable as they are used as keys of the results
+        :type items: iterable
+        :param max_workers: maximum amount of threads to use
+        :type max_workers: int
+        :param name: prefix of the thread names
+        :type name: str
+        :return: a tuple with the results and the raised exceptions, both mapped by item
+        :rtype: tuple(dict, dict)
+        """
+        items = list(items)
+        results = {}
+        errors = {}
+        if len(items) == 0:
+            return results, errors
+        lock = Lock()
+        work_queue = Queue.Queue()
+        for item in items:
+            work_queue.put(item)
+
+        def _worker():
+            while True:
+                try:
+                    work_item = work_queue.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    result = target(work_item)
+                    with lock:
+                        results[work_item] = result
+                except Exception as ex:
+                    ThreadHelper.LOGGER.exception('Processing {0} failed'.format(work_item))
+                    with lock:
+                        errors[work_item] = ex
+
+        threads = [ThreadHelper.start_thread(_worker, '{0}_{1}'.format(name, index)) for index in xrange(min(max_workers, len(items)))]
+        for thread in threads:
+            thread.join()
+        return results, errors
+
     @staticmethod
     def stop_evented_threads(thread_pairs, r_semaphore=None, logger=LOGGER, timeout=300):
         for thread_pair in thread_pairs:
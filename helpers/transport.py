@@ -0,0 +1,246 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Transports used by the OVSClient to execute its HTTP requests
+Recording the traffic of a run against a live grid:
+    OVSClient.set_default_transport(RecordingTransport('/tmp/grid.rec.gz'))
+Replaying it without a grid, 10 times faster than it happened:
+    OVSClient.set_default_transport(ReplayTransport('/tmp/grid.rec.gz', speed=10))
+"""
+import json
+import gzip
+import time
+import urlparse
+import requests
+from collections import deque
+from threading import Lock
+
+
+class RecordedResponse(object):
+    """
+    Response as returned by a transport: mimics the parts of requests.Response used by the OVSClient
+    """
+
+    def __init__(self, status_code, content):
+        """
+        :param status_code: HTTP status code
+        :type status_code: int
+        :param content: body of the response
+        :type content: str
+        """
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RequestsTransport(object):
+    """
+    Executes the requests against the API of the grid
+    """
+
+    @staticmethod
+    def request(method, url, headers=None, data=None, verify=False):
+        """
+        Execute a request
+        :param method: HTTP method (GET, POST, ...)
+        :type method: str
+        :param url: full url
+        :type url: str
+        :param headers: HTTP headers
+        :type headers: dict
+        :param data: body (str) or form data (dict)
+        :type data: str / dict
+        :param verify: verify the certificate of the API
+        :type verify: bool
+        :return: the response
+        :rtype: requests.Response
+        """
+        return requests.request(method, url, headers=headers, data=data, verify=verify)
+
+    @staticmethod
+    def sleep(seconds):
+        """
+        Wait in between requests (eg while polling a task)
+        :param seconds: amount of seconds to wait
+        :type seconds: float
+        :return: None
+        """
+        time.sleep(seconds)
+
+
+class RecordingTransport(object):
+    """
+    Executes requests through another transport and writes every request with its response and timing to a gzipped JSON lines file
+    Credentials posted to get a token are not recorded and the tokens handed out are replaced by a dummy one
+    """
+    TOKEN_PATH = '/api/oauth2/token/'
+    REDACTED_TOKEN = 'redacted'
+
+    def __init__(self, path, transport=None):
+        """
+        :param path: file to record to. An existing file is overwritten
+        :type path: str
+        :param transport: transport executing the requests. Defaults to a RequestsTransport
+        :type transport: RequestsTransport
+        """
+        self.path = path
+        self.transport = transport or RequestsTransport()
+        self._start = time.time()
+        self._lock = Lock()
+        self._file = gzip.open(path, 'wb')
+        self._write({'recorded': self._start})
+
+    def _write(self, entry):
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError('Recording to {0} has been closed'.format(self.path))
+            self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self._file.flush()
+
+    @staticmethod
+    def get_request_key(method, url, data):
+        """
+        Identify a request independent of the grid it is sent to
+        :return: tuple with the method, the path and query of the url and the body
+        :rtype: tuple
+        """
+        parsed_url = urlparse.urlsplit(url)
+        path = parsed_url.path if parsed_url.query == '' else '{0}?{1}'.format(parsed_url.path, parsed_url.query)
+        if path == RecordingTransport.TOKEN_PATH or isinstance(data, dict):
+            data = None
+        return method.upper(), path, data
+
+    @staticmethod
+    def redact_body(path, body):
+        """
+        Strip the tokens from the response of the token request. Replaying only needs a dummy token
+        :param path: path of the request, as returned by get_request_key
+        :type path: str
+        :param body: body of the response
+        :type body: str
+        :return: the body to record
+        :rtype: str
+        """
+        if path != RecordingTransport.TOKEN_PATH:
+            return body
+        try:
+            token_info = json.loads(body)
+        except ValueError:
+            return ''
+        if not isinstance(token_info, dict):
+            return ''
+        for key in ['access_token', 'refresh_token']:
+            if key in token_info:
+                token_info[key] = RecordingTransport.REDACTED_TOKEN
+        return json.dumps(token_info)
+
+    def request(self, method, url, headers=None, data=None, verify=False):
+        """
+        Execute and record a request. See RequestsTransport.request
+        """
+        start = time.time()
+        response = self.transport.request(method, url, headers=headers, data=data, verify=verify)
+        end = time.time()
+        method, path, data = self.get_request_key(method, url, data)
+        self._write({'method': method,
+                     'path': path,
+                     'data': data,
+                     'status': response.status_code,
+                     'body': self.redact_body(path, response.content),
+                     'start': start - self._start,
+                     'duration': end - start})
+        return response
+
+    def sleep(self, seconds):
+        """
+        See RequestsTransport.sleep
+        """
+        self.transport.sleep(seconds)
+
+    def close(self):
+        """
+        Stop recording
+        :return: None
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayTransport(object):
+    """
+    Serves the responses of a recording instead of contacting a grid
+    Identical requests are answered in the order they were recorded (eg the consecutive states of a polled task).
+    Once all recorded responses of a request have been served, the last one keeps being served.
+    """
+
+    def __init__(self, path, speed=None):
+        """
+        :param path: recording to replay
+        :type path: str
+        :param speed: None to answer immediately, 1 to take as long as the recorded requests and waits, 10 to go 10 times faster
+        :type speed: float
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError('Speed should be positive')
+        self.path = path
+        self.speed = speed
+        self._lock = Lock()
+        self._responses = {}
+        self.served = 0
+        self.unmatched = []
+        with gzip.open(path, 'rb') as recording:
+            for line in recording:
+                entry = json.loads(line)
+                if 'method' not in entry:
+                    continue  # Header
+                key = (entry['method'], entry['path'], entry['data'])
+                self._responses.setdefault(key, deque()).append(entry)
+
+    def _wait(self, seconds):
+        if self.speed is not None and seconds > 0:
+            time.sleep(float(seconds) / self.speed)
+
+    def request(self, method, url, headers=None, data=None, verify=False):
+        """
+        Serve the recorded response of a request. See RequestsTransport.request
+        :raises RuntimeError: when the request was not recorded
+        """
+        key = RecordingTransport.get_request_key(method, url, data)
+        with self._lock:
+            responses = self._responses.get(key)
+            if responses is None:
+                self.unmatched.append(key)
+                raise RuntimeError('No recorded response for {0} {1}'.format(key[0], key[1]))
+            entry = responses.popleft() if len(responses) > 1 else responses[0]
+            self.served += 1
+        self._wait(entry['duration'])
+        body = entry['body']
+        return RecordedResponse(entry['status'], body.encode('utf-8') if isinstance(body, unicode) else body)
+
+    def sleep(self, seconds):
+        """
+        Wait in between requests, at the speed of the replay. See RequestsTransport.sleep
+        """
+        self._wait(seconds)
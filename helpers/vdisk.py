@@ -14,12 +14,14 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 
-from ovs.dal.hybrids.vdisk import VDisk
-from ovs.dal.lists.vdisklist import VDiskList
-from ovs.dal.lists.vpoollist import VPoolList
 from ovs.extensions.generic.logger import Logger
 from ..helpers.ci_constants import CIConstants
 from ..helpers.exceptions import VPoolNotFoundError, VDiskNotFoundError
+from ..helpers.lazy import LazyImport
+
+VDisk = LazyImport('ovs.dal.hybrids.vdisk', 'VDisk')
+VDiskList = LazyImport('ovs.dal.lists.vdisklist', 'VDiskList')
+VPoolList = LazyImport('ovs.dal.lists.vpoollist', 'VPoolList')
 
 
 class VDiskHelper(CIConstants):
@@ -14,9 +14,11 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 
-from ovs.dal.lists.vpoollist import VPoolList
 from ovs.extensions.generic.logger import Logger
 from ..helpers.exceptions import VPoolNotFoundError
+from ..helpers.lazy import LazyImport
+
+VPoolList = LazyImport('ovs.dal.lists.vpoollist', 'VPoolList')
 
 
 class VPoolHelper(object):
@@ -79,8 +81,10 @@ class VPoolHelper(object):
 
         vpool = VPoolList.get_vpool_by_name(vpool_name)
         domains = []
-        for storagedriver in list(vpool.storagedrivers):
-            for domain in list(storagedriver.storagerouter.regular_domains):
-                if domain not in domains:
+        seen = set()
+        for storagedriver in vpool.storagedrivers:
+            for domain in storagedriver.storagerouter.regular_domains:
+                if domain not in seen:
+                    seen.add(domain)
                     domains.append(domain)
         return domains
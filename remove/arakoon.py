@@ -15,9 +15,11 @@
 # but WITHOUT ANY WARRANTY of any kind.
 
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.db.arakooninstaller import ArakoonInstaller
+from ..helpers.lazy import LazyImport
 from ..validate.decorators import required_arakoon_cluster
 
+ArakoonInstaller = LazyImport('ovs.extensions.db.arakooninstaller', 'ArakoonInstaller')
+
 
 class ArakoonRemover(object):
 
@@ -16,6 +16,7 @@
 from ovs.extensions.generic.logger import Logger
 from ..helpers.albanode import AlbaNodeHelper
 from ..helpers.backend import BackendHelper
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..validate.decorators import required_backend, required_preset
 
@@ -53,7 +54,7 @@ class BackendRemover(CIConstants):
 
         albabackend_guid = BackendHelper.get_alba_backend_guid_by_name(albabackend_name)
         # target is a node
-        node_mapping = AlbaNodeHelper._map_alba_nodes()
+        node_mapping = AlbaNodeHelper.map_alba_nodes()
 
         local_stack = BackendHelper.get_backend_local_stack(albabackend_name=albabackend_name)
         for disk, amount_of_osds in disks.iteritems():
@@ -158,6 +159,7 @@ class BackendRemover(CIConstants):
         task_guid = cls.api.delete(api='/alba/backends/{0}'.format(alba_backend_guid))
 
         result = cls.api.wait_for_task(task_id=task_guid, timeout=timeout)
+        IndexCache.invalidate(IndexCache.ALBABACKEND_BY_NAME)
         if result[0] is False:
             errormsg = "Removal of backend '{0}' failed with '{1}'".format(albabackend_name, result[1])
             BackendRemover.LOGGER.error(errormsg)
@@ -0,0 +1,279 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+from ovs.extensions.generic.logger import Logger
+from ..helpers.backend import BackendHelper
+from ..helpers.ci_constants import CIConstants
+from ..helpers.dag import DAGExecutor
+from ..helpers.storagerouter import StoragerouterHelper
+from ..helpers.vpool import VPoolHelper
+from ..remove.arakoon import ArakoonRemover
+from ..remove.backend import BackendRemover
+from ..remove.roles import RoleRemover
+from ..remove.vdisk import VDiskRemover
+from ..remove.vpool import VPoolRemover
+from ..validate.decorators import ValidationContext
+
+
+class TeardownOrchestrator(CIConstants):
+    """
+    Tears down a setup as a reverse dependency graph
+    Every object is removed as soon as everything using it is gone, so independent branches (eg vPools on different
+    storagerouters or ASDs on different nodes) are removed concurrently and a failing branch does not block the others.
+    """
+    LOGGER = Logger("remove-ci_teardown_orchestrator")
+    MAX_WORKERS = 10
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def vdisk_step(vpool_name, vdisk_name):
+        return 'vdisk:{0}:{1}'.format(vpool_name, vdisk_name)
+
+    @staticmethod
+    def vpool_step(storagerouter_ip, vpool_name):
+        return 'vpool:{0}:{1}'.format(storagerouter_ip, vpool_name)
+
+    @staticmethod
+    def unlink_step(globalbackend_name, backend_name):
+        return 'unlink:{0}:{1}'.format(globalbackend_name, backend_name)
+
+    @staticmethod
+    def asd_step(backend_name, target):
+        return 'asds:{0}:{1}'.format(backend_name, target)
+
+    @staticmethod
+    def preset_step(backend_name, preset_name):
+        return 'preset:{0}:{1}'.format(backend_name, preset_name)
+
+    @staticmethod
+    def backend_step(backend_name):
+        return 'backend:{0}'.format(backend_name)
+
+    @staticmethod
+    def arakoon_step(cluster_name):
+        return 'arakoon:{0}'.format(cluster_name)
+
+    @staticmethod
+    def role_step(storagerouter_ip, diskname):
+        return 'role:{0}:{1}'.format(storagerouter_ip, diskname)
+
+    @staticmethod
+    def get_vdisk_structure(vdisk_guid, parent_vdisk_guid, is_vtemplate):
+        """
+        :param vdisk_guid: guid of the vDisk
+        :type vdisk_guid: str
+        :param parent_vdisk_guid: guid of the vDisk or vTemplate the vDisk was cloned from, if any
+        :type parent_vdisk_guid: str
+        :param is_vtemplate: the vDisk is a vTemplate
+        :type is_vtemplate: bool
+        :return: the entry of the vDisk in the vdisk_structure of a vpool (see get_model_config)
+        :rtype: dict
+        """
+        return {'guid': vdisk_guid, 'parent_vdisk_guid': parent_vdisk_guid, 'is_vtemplate': is_vtemplate is True}
+
+    @classmethod
+    def get_model_config(cls):
+        """
+        Describe the current state of the cluster in the format of the setup section of setup.json
+        Only the parts needed for a teardown are filled in. Default presets are left out as they cannot be removed.
+        Next to the vdisks, vpools hold their vdisk_structure: the guid, parent vDisk guid and vTemplate flag per vDisk name
+        :return: setup section describing the cluster
+        :rtype: dict
+        """
+        storagerouters = {}
+        for storagerouter in StoragerouterHelper.get_storagerouters():
+            disks = {}
+            for disk in storagerouter.disks:
+                roles = set(role for partition in disk.partitions for role in partition.roles)
+                if len(roles) > 0:
+                    disks[disk.name] = {'roles': sorted(roles)}
+            storagerouters[storagerouter.ip] = {'disks': disks, 'vpools': {}}
+        for vpool in VPoolHelper.get_vpools():
+            backend_info = vpool.metadata['backend']['backend_info']
+            vdisks = vpool.vdisks
+            vdisk_structure = dict((vdisk.devicename.lstrip('/'), cls.get_vdisk_structure(vdisk.guid, vdisk.parent_vdisk_guid, vdisk.is_vtemplate))
+                                   for vdisk in vdisks)
+            vpool_details = {'backend_name': backend_info['name'],
+                             'preset': backend_info['preset'],
+                             'vdisks': dict((vdisk.devicename.lstrip('/'), vdisk.size) for vdisk in vdisks),
+                             'vdisk_structure': vdisk_structure}
+            for storagedriver in vpool.storagedrivers:
+                storagerouters[storagedriver.storagerouter.ip]['vpools'][vpool.name] = vpool_details
+
+        backends = []
+        albabackends = BackendHelper.get_alba_backends()
+        claimed_osds = BackendHelper.get_claimed_osds_per_backend([albabackend.name for albabackend in albabackends if albabackend.scaling == 'LOCAL'])
+        for albabackend in albabackends:
+            backend = {'name': albabackend.name,
+                       'scaling': albabackend.scaling,
+                       'presets': [{'name': preset['name']} for preset in albabackend.presets if preset.get('is_default') is not True]}
+            if albabackend.scaling == 'LOCAL':
+                backend['osds'] = claimed_osds[albabackend.name]
+            else:
+                # The preset used for the link is not part of the model
+                backend['osds'] = dict((BackendHelper.get_albabackend_by_guid(linked_guid).name, None)
+                                       for linked_guid in albabackend.linked_backend_guids)
+            backends.append(backend)
+        return {'storagerouters': storagerouters, 'backends': backends}
+
+    @classmethod
+    def build_graph(cls, setup_config=None, max_workers=MAX_WORKERS):
+        """
+        Translate a setup section into the reverse dependency graph of its teardown
+        :param setup_config: setup section of setup.json (see get_model_config). Defaults to the one of the CI config
+        :type setup_config: dict
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :return: executor holding all steps
+        :rtype: ci.api_lib.helpers.dag.DAGExecutor
+        """
+        if setup_config is None:
+            setup_config = cls.SETUP_CFG['setup']
+        storagerouters = setup_config.get('storagerouters', {})
+        backends = setup_config.get('backends', [])
+        executor = DAGExecutor(max_workers=max_workers, logger=cls.LOGGER)
+
+        # vDisks, then the vPools holding them. Shrinking the same vPool is serialized
+        # Clones are removed before the vDisk or vTemplate they were cloned from, as long as the vdisk_structure is known
+        vdisk_steps = {}
+        for storagerouter_details in storagerouters.itervalues():
+            for vpool_name, vpool_details in storagerouter_details.get('vpools', {}).iteritems():
+                vdisk_names = vpool_details.get('vdisks', {})
+                structure = vpool_details.get('vdisk_structure', {})
+                clone_steps = {}  # parent vdisk guid -> steps of its clones
+                for vdisk_name, vdisk_structure in structure.iteritems():
+                    if vdisk_name in vdisk_names and vdisk_structure.get('parent_vdisk_guid') is not None:
+                        clone_steps.setdefault(vdisk_structure['parent_vdisk_guid'], []).append(cls.vdisk_step(vpool_name, vdisk_name))
+                for vdisk_name in vdisk_names:
+                    step_name = cls.vdisk_step(vpool_name, vdisk_name)
+                    if step_name in executor.nodes:
+                        continue
+                    vdisk_structure = structure.get(vdisk_name, {})
+                    if vdisk_structure.get('is_vtemplate') is True:
+                        function = VDiskRemover.remove_vtemplate_by_name
+                    else:
+                        function = VDiskRemover.remove_vdisk_by_name
+                    executor.add(step_name, function, kwargs={'vdisk_name': vdisk_name, 'vpool_name': vpool_name},
+                                 dependencies=clone_steps.get(vdisk_structure.get('guid'), []))
+                    vdisk_steps.setdefault(vpool_name, []).append(step_name)
+        vpool_steps = {}  # storagerouter ip -> vpool steps
+        vpool_steps_by_backend = {}  # backend name -> vpool steps using the backend
+        vpool_steps_by_preset = {}  # (backend name, preset name) -> vpool steps using the preset
+        for storagerouter_ip, storagerouter_details in storagerouters.iteritems():
+            vpool_steps[storagerouter_ip] = []
+            for vpool_name, vpool_details in storagerouter_details.get('vpools', {}).iteritems():
+                vpool_step = executor.add(cls.vpool_step(storagerouter_ip, vpool_name), VPoolRemover.remove_vpool,
+                                          kwargs={'vpool_name': vpool_name, 'storagerouter_ip': storagerouter_ip},
+                                          dependencies=vdisk_steps.get(vpool_name, []),
+                                          resource='vpool:{0}'.format(vpool_name))
+                vpool_steps[storagerouter_ip].append(vpool_step)
+                used_backends = [(vpool_details['backend_name'], vpool_details['preset'])]
+                for cache_type in ['fragment_cache', 'block_cache']:
+                    cache_details = vpool_details.get(cache_type) or {}
+                    if cache_details.get('location') == 'backend':
+                        used_backends.append((cache_details['backend']['name'], cache_details['backend']['preset']))
+                for backend_name, preset_name in used_backends:
+                    vpool_steps_by_backend.setdefault(backend_name, []).append(vpool_step)
+                    vpool_steps_by_preset.setdefault((backend_name, preset_name), []).append(vpool_step)
+        all_vpool_steps = [step for steps in vpool_steps.itervalues() for step in steps]
+
+        # Unlink local backends from global backends once no vPool uses the global backend anymore
+        unlink_steps = {}  # backend name -> unlink steps in which the backend is either global or linked
+        for backend in backends:
+            if backend.get('scaling', 'LOCAL') == 'LOCAL':
+                continue
+            for linked_backend_name, preset_name in backend.get('osds', {}).iteritems():
+                unlink_step = executor.add(cls.unlink_step(backend['name'], linked_backend_name), BackendRemover.unlink_backend,
+                                           kwargs={'globalbackend_name': backend['name'], 'albabackend_name': linked_backend_name},
+                                           dependencies=vpool_steps_by_backend.get(backend['name'], []))
+                unlink_steps.setdefault(backend['name'], []).append(unlink_step)
+                unlink_steps.setdefault(linked_backend_name, []).append(unlink_step)
+                if preset_name is not None:
+                    vpool_steps_by_preset.setdefault((linked_backend_name, preset_name), []).append(unlink_step)
+
+        # ASDs, presets and backends
+        for backend in backends:
+            backend_name = backend['name']
+            users = vpool_steps_by_backend.get(backend_name, []) + unlink_steps.get(backend_name, [])
+            backend_dependencies = list(users)
+            if backend.get('scaling', 'LOCAL') == 'LOCAL':
+                for target, disks in backend.get('osds', {}).iteritems():
+                    backend_dependencies.append(executor.add(cls.asd_step(backend_name, target), BackendRemover.remove_asds,
+                                                             kwargs={'albabackend_name': backend_name, 'target': target, 'disks': disks},
+                                                             dependencies=users,
+                                                             resource='asd_manager:{0}'.format(target)))
+            for preset in backend.get('presets', []):
+                backend_dependencies.append(executor.add(cls.preset_step(backend_name, preset['name']), BackendRemover.remove_preset,
+                                                         kwargs={'preset_name': preset['name'], 'albabackend_name': backend_name},
+                                                         dependencies=vpool_steps_by_preset.get((backend_name, preset['name']), [])))
+            executor.add(cls.backend_step(backend_name), BackendRemover.remove_backend,
+                         kwargs={'albabackend_name': backend_name},
+                         dependencies=backend_dependencies)
+            # External arakoons are removed once the backend using them is gone. Their master is the first node they were deployed on
+            masters = {}
+            for ip, arakoons in backend.get('external_arakoon', {}).iteritems():
+                for arakoon_name in arakoons:
+                    masters.setdefault(arakoon_name, ip)
+            for arakoon_name, master_ip in masters.iteritems():
+                executor.add(cls.arakoon_step(arakoon_name), ArakoonRemover.remove_arakoon_cluster,
+                             kwargs={'cluster_name': arakoon_name, 'master_storagerouter_ip': master_ip},
+                             dependencies=[cls.backend_step(backend_name)])
+        cluster_steps = [name for name in executor.nodes if name.startswith(('backend:', 'arakoon:'))]
+
+        # Disk roles. The DB role hosts the cluster wide arakoons, other roles are only used by the local vPools
+        for storagerouter_ip, storagerouter_details in storagerouters.iteritems():
+            for diskname, disk_details in storagerouter_details.get('disks', {}).iteritems():
+                if 'DB' in disk_details.get('roles', []):
+                    dependencies = all_vpool_steps + cluster_steps
+                else:
+                    dependencies = vpool_steps[storagerouter_ip]
+                executor.add(cls.role_step(storagerouter_ip, diskname), RoleRemover.remove_role,
+                             kwargs={'storagerouter_ip': storagerouter_ip, 'diskname': diskname},
+                             dependencies=dependencies,
+                             resource=storagerouter_ip)
+        return executor
+
+    @classmethod
+    def teardown(cls, setup_config=None, from_model=False, max_workers=MAX_WORKERS, stop_on_error=False, callback=None):
+        """
+        Tear down a setup
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param from_model: tear down everything found in the model instead of the setup config
+        :type from_model: bool
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :param stop_on_error: do not start any new step after a step has failed. By default only the steps
+                              depending on a failed step are skipped
+        :type stop_on_error: bool
+        :param callback: called with every step as soon as it has finished
+        :type callback: callable
+        :return: report with the status and timing of every step and the critical path
+        :rtype: dict
+        """
+        if from_model is True:
+            setup_config = cls.get_model_config()
+        executor = cls.build_graph(setup_config, max_workers=max_workers)
+        with ValidationContext():
+            report = executor.execute(stop_on_error=stop_on_error, callback=callback)
+        failed = sorted(name for name, step in report['steps'].iteritems() if step['status'] != 'SUCCESS')
+        cls.LOGGER.info('Teardown took {0:.2f}s, the serial duration of all steps is {1:.2f}s. Critical path ({2:.2f}s): {3}'
+                        .format(report['total_duration'], report['serial_duration'], report['critical_path_duration'], ' -> '.join(report['critical_path'])))
+        if len(failed) > 0:
+            cls.LOGGER.warning('Steps not completed: {0}'.format(', '.join(failed)))
+        return report
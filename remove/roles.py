@@ -14,12 +14,13 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 
+from pipes import quote
 from subprocess import check_output
-from ovs.extensions.generic.system import System
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..helpers.fstab import FstabHelper
+from ..helpers.sshclient import CommandBatch, SSHClientPool
 from ..helpers.storagerouter import StoragerouterHelper
 from ..setup.roles import RoleSetup
 
@@ -30,39 +31,33 @@ class RoleRemover(CIConstants):
     CONFIGURE_DISK_TIMEOUT = 300
 
     @staticmethod
-    def _umount(mountpoint, client=None):
+    def _cleanup_partition(mountpoint, device, alias_part_label, client):
         """
-        Unmount the given partition
-        :param mountpoint: Location where the mountpoint is mounted
+        Unmount a partition, remove it from fstab and remove its filesystem in a single round trip
+        :param mountpoint: Location where the partition is mounted
         :type mountpoint: str
-        :return:
-        """
-        if client is None:
-            client = SSHClient(System.get_my_storagerouter(), username='root')
-        try:
-            client.run(['umount', mountpoint])
-        except Exception:
-            RoleRemover.LOGGER.exception('Unable to umount mountpoint {0}'.format(mountpoint))
-            raise RuntimeError('Could not unmount {0}'.format(mountpoint))
-
-    @staticmethod
-    def _remove_filesystem(device, alias_part_label, client=None):
-        """
-
+        :param device: device of the disk eg /dev/sdb
+        :type device: str
         :param alias_part_label: eg /dev/disk/by-partlabel/ata-QEMU_HARDDISK_QM00011
         :type alias_part_label: str
+        :param client: client connected to the storagerouter of the partition
+        :type client: ovs.extensions.generic.sshclient.SSHClient
         :return:
         """
-        if client is None:
-            client = SSHClient(System.get_my_storagerouter(), username='root')
-        try:
-            partition_cmd = "udevadm info --name={0} | awk -F '=' '/ID_PART_ENTRY_NUMBER/{{print $NF}}'".format(alias_part_label)
-            partition_number = client.run(partition_cmd, allow_insecure=True)
-            if partition_number:
-                format_cmd = 'parted {0} rm {1}'.format(device, partition_number)
-                client.run(format_cmd.split())
-        except Exception:
-            RoleRemover.LOGGER.exception('Unable to remove filesystem of {0}'.format(alias_part_label))
+        batch = CommandBatch(client)
+        batch.add(['umount', mountpoint])
+        batch.add(FstabHelper(client=client).build_remove_by_mountpoint_command(mountpoint))
+        batch.add("nr=$(udevadm info --name={0} | awk -F '=' '/ID_PART_ENTRY_NUMBER/{{print $NF}}'); "
+                  "[ -z \"$nr\" ] || parted {1} rm $nr".format(quote(alias_part_label), quote(device)))
+        umount_result, fstab_result, filesystem_result = batch.execute(stop_on_error=True)
+        if umount_result['exit_code'] != 0:
+            RoleRemover.LOGGER.error('Unable to umount mountpoint {0}: {1}'.format(mountpoint, umount_result['output']))
+            raise RuntimeError('Could not unmount {0}'.format(mountpoint))
+        if fstab_result['exit_code'] != 0:
+            RoleRemover.LOGGER.error('Unable to remove {0} from fstab: {1}'.format(mountpoint, fstab_result['output']))
+            raise RuntimeError('Could not remove {0} from fstab'.format(mountpoint))
+        if filesystem_result['exit_code'] != 0:
+            RoleRemover.LOGGER.error('Unable to remove filesystem of {0}: {1}'.format(alias_part_label, filesystem_result['output']))
             raise RuntimeError('Could not remove filesystem of {0}'.format(alias_part_label))
 
     @classmethod
@@ -74,8 +69,6 @@ class RoleRemover(CIConstants):
         storagerouter = StoragerouterHelper.get_storagerouter_by_ip(storagerouter_ip=storagerouter_ip)
         disk = StoragerouterHelper.get_disk_by_name(guid=storagerouter.guid, diskname=diskname)
         # Check if there are any partitions on the disk, if so check if there is enough space
-        client = SSHClient(storagerouter, username='root')
-
         if len(disk.partitions) > 0:
             for partition in disk.partitions:
                 # Remove all partitions that have roles
@@ -88,20 +81,17 @@ class RoleRemover(CIConstants):
                                              roles=[],
                                              partition_guid=partition.guid)
 
-
-                    cls._umount(partition.mountpoint, client=client)
-                    # Remove from fstab
-
-                    cls.LOGGER.info("Removing {0} from fstab".format(partition.mountpoint, partition.guid, diskname))
-                    FstabHelper(client=client).remove_by_mountpoint(partition.mountpoint,client)
-                    # Remove filesystem
-                    cls.LOGGER.info("Removing filesystem on partition {0} on disk {1}".format(partition.guid, diskname))
-                    alias = partition.aliases[0]
-                    device = '/dev/{0}'.format(diskname)
-                    cls._remove_filesystem(device, alias,client=client)
+                    # Unmount, remove from fstab and remove the filesystem in one go
+                    cls.LOGGER.info("Unmounting {0} and removing filesystem on partition {1} on disk {2}".format(partition.mountpoint, partition.guid, diskname))
+                    with SSHClientPool.checkout(storagerouter, username='root') as client:
+                        cls._cleanup_partition(mountpoint=partition.mountpoint,
+                                               device='/dev/{0}'.format(diskname),
+                                               alias_part_label=partition.aliases[0],
+                                               client=client)
                     # Remove partition from model
                     cls.LOGGER.info("Removing partition {0} on disk {1} from model".format(partition.guid, diskname))
                     partition.delete()
+                    IndexCache.invalidate(IndexCache.ROLE_INVENTORY)
                 else:
                     print 'Found no roles on partition'
                     RoleRemover.LOGGER.info("{1} on disk {2}".format(partition.roles, partition.guid, diskname))
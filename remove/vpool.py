@@ -15,6 +15,7 @@
 # but WITHOUT ANY WARRANTY of any kind.
 
 from ovs.extensions.generic.logger import Logger
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..helpers.storagerouter import StoragerouterHelper
 from ..helpers.vpool import VPoolHelper
@@ -43,6 +44,7 @@ class VPoolRemover(CIConstants):
         data = {"storagerouter_guid": storagerouter_guid}
         task_guid = cls.api.post(api='/vpools/{0}/shrink_vpool/'.format(vpool_guid), data=data)
         task_result = cls.api.wait_for_task(task_id=task_guid, timeout=timeout)
+        IndexCache.invalidate(IndexCache.STORAGEDRIVERS_BY_DOMAIN)
 
         if not task_result[0]:
             error_msg = "Deleting vPool `{0}` on storagerouter `{1}` has failed with error {2}".format(vpool_name, storagerouter_ip, task_result[1])
@@ -15,14 +15,16 @@
 # but WITHOUT ANY WARRANTY of any kind.
 
 from ovs.dal.hybrids.servicetype import ServiceType
-from ovs.extensions.db.arakooninstaller import ArakoonInstaller
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
-from ovs.lib.alba import AlbaController
 from ..helpers.backend import BackendHelper
+from ..helpers.lazy import LazyImport
+from ..helpers.sshclient import SSHClientPool
 from ..validate.decorators import required_backend, required_arakoon_cluster
 from ..validate.backend import BackendValidation
 
+ArakoonInstaller = LazyImport('ovs.extensions.db.arakooninstaller', 'ArakoonInstaller')
+AlbaController = LazyImport('ovs.lib.alba', 'AlbaController')
+
 
 class ArakoonSetup(object):
 
@@ -50,11 +52,10 @@ class ArakoonSetup(object):
         :type cluster_basedir: str
         :return:
         """
-        client = SSHClient(storagerouter_ip, username='root')
-
         # create required directories
-        if not client.dir_exists(cluster_basedir):
-            client.dir_create(cluster_basedir)
+        with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+            if not client.dir_exists(cluster_basedir):
+                client.dir_create(cluster_basedir)
 
         # determine plugin
         if service_type == ServiceType.ARAKOON_CLUSTER_TYPES.FWK:
@@ -80,10 +81,11 @@ class ArakoonSetup(object):
                                          internal=False,
                                          log_sinks=Logger.get_sink_path('automation_lib_arakoon_server'),
                                          crash_log_sinks=Logger.get_sink_path('automation_lib_arakoon_server_crash'))
-        if service_type == ServiceType.ARAKOON_CLUSTER_TYPES.ABM:
-            client.run(['ln', '-s', '/usr/lib/alba/albamgr_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
-        elif service_type == ServiceType.ARAKOON_CLUSTER_TYPES.NSM:
-            client.run(['ln', '-s', '/usr/lib/alba/nsm_host_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
+        with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+            if service_type == ServiceType.ARAKOON_CLUSTER_TYPES.ABM:
+                client.run(['ln', '-s', '/usr/lib/alba/albamgr_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
+            elif service_type == ServiceType.ARAKOON_CLUSTER_TYPES.NSM:
+                client.run(['ln', '-s', '/usr/lib/alba/nsm_host_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
         arakoon_installer.start_cluster()
         arakoon_installer.unclaim_cluster()
         ArakoonSetup.LOGGER.info("Finished creation of new arakoon cluster with name `{0}`, servicetype `{1}`, ip `{2}`, base_dir `{3}`".format(cluster_name, service_type, storagerouter_ip, cluster_basedir))
@@ -118,11 +120,10 @@ class ArakoonSetup(object):
         """
         if clustered_nodes is None:
             clustered_nodes = []
-        client = SSHClient(storagerouter_ip, username='root')
-
         # create required directories
-        if not client.dir_exists(cluster_basedir):
-            client.dir_create(cluster_basedir)
+        with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+            if not client.dir_exists(cluster_basedir):
+                client.dir_create(cluster_basedir)
 
         ArakoonSetup.LOGGER.info("Starting extending arakoon cluster with name `{0}`, master_ip `{1}`, slave_ip `{2}`, base_dir `{3}`"
                                  .format(cluster_name, master_storagerouter_ip, storagerouter_ip, cluster_basedir))
@@ -133,10 +134,11 @@ class ArakoonSetup(object):
                                          locked=False,
                                          log_sinks=Logger.get_sink_path('automation_lib_arakoon_server'),
                                          crash_log_sinks=Logger.get_sink_path('automation_lib_arakoon_server_crash'))
-        if service_type == ServiceType.ARAKOON_CLUSTER_TYPES.ABM:
-            client.run(['ln', '-s', '/usr/lib/alba/albamgr_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
-        elif service_type == ServiceType.ARAKOON_CLUSTER_TYPES.NSM:
-            client.run(['ln', '-s', '/usr/lib/alba/nsm_host_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
+        with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+            if service_type == ServiceType.ARAKOON_CLUSTER_TYPES.ABM:
+                client.run(['ln', '-s', '/usr/lib/alba/albamgr_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
+            elif service_type == ServiceType.ARAKOON_CLUSTER_TYPES.NSM:
+                client.run(['ln', '-s', '/usr/lib/alba/nsm_host_plugin.cmxs', '{0}/arakoon/{1}/db'.format(cluster_basedir, cluster_name)])
 
         # checking if we need to restart the given nodes
         if len(clustered_nodes) != 0:
@@ -17,6 +17,7 @@ import time
 from ovs.extensions.generic.logger import Logger
 from ..helpers.albanode import AlbaNodeHelper
 from ..helpers.backend import BackendHelper
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..validate.decorators import required_roles, required_backend, required_preset, check_backend, check_preset, \
     check_linked_backend, filter_osds
@@ -71,6 +72,7 @@ class BackendSetup(CIConstants):
 
         # ADD_ALBABACKEND
         cls.api.post(api='alba/backends', data={'backend_guid': backend['guid'], 'scaling': scaling})
+        IndexCache.invalidate(IndexCache.ALBABACKEND_BY_NAME)
 
         # CHECK_STATUS until done
         backend_running_status = "RUNNING"
@@ -224,7 +226,7 @@ class BackendSetup(CIConstants):
         :rtype: str
         """
         BackendSetup._discover_and_register_nodes()  # Make sure all backends are registered
-        node_mapping = AlbaNodeHelper._map_alba_nodes()  # target is a node
+        node_mapping = AlbaNodeHelper.map_alba_nodes()  # target is a node
         alba_backend_guid = BackendHelper.get_alba_backend_guid_by_name(albabackend_name)
 
         backend_info = BackendHelper.get_backend_local_stack(albabackend_name=albabackend_name)
@@ -16,8 +16,7 @@
 
 from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
-from ovs.extensions.services.servicefactory import ServiceFactory
+from ..helpers.service import ServiceHelper
 from ..helpers.storagerouter import StoragerouterHelper
 
 
@@ -30,11 +29,13 @@ class CelerySetup(object):
         pass
 
     @staticmethod
-    def override_scheduletasks(configuration):
+    def override_scheduletasks(configuration, max_parallel=5):
         """
         Override the scheduled tasks crontab with your own confguration
         :param configuration: configuration to override scheduled tasks
         :type configuration: dict
+        :param max_parallel: amount of nodes to restart the watcher on simultaneously
+        :type max_parallel: int
         :return:
         """
         service_name = 'ovs-watcher-framework'
@@ -42,14 +43,10 @@ class CelerySetup(object):
         fetched_cfg = Configuration.get(CelerySetup.SCHEDULED_TASK_CFG, configuration)
         if cmp(fetched_cfg, configuration) == 0:
             # restart ovs-watcher-framework on all nodes
-            for sr_ip in StoragerouterHelper.get_storagerouter_ips():
-                client = SSHClient(sr_ip, username='root')
-                service_manager = ServiceFactory.get_manager()
-                try:
-
-                    service_manager.restart_service(service_name, client)
-                except:
-                    return False
+            results = ServiceHelper.rolling_restart([(sr_ip, service_name) for sr_ip in StoragerouterHelper.get_storagerouter_ips()],
+                                                    max_parallel=max_parallel)
+            if not all(result['success'] for result in results.itervalues()):
+                return False
             CelerySetup.LOGGER.info("Successfully restarted all `{0}` services!".format(service_name))
             return True
         else:
@@ -0,0 +1,228 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+import os
+import json
+import time
+import hashlib
+from threading import Lock
+from ovs.extensions.generic.logger import Logger
+from ..helpers.backend import BackendHelper
+from ..helpers.ci_constants import CIConstants
+from ..helpers.dag import DAGNode
+from ..helpers.domain import DomainHelper
+from ..helpers.snapshot import ClusterSnapshot
+from ..helpers.vdisk import VDiskHelper
+from ..helpers.vpool import VPoolHelper
+from ..setup.orchestrator import SetupOrchestrator
+from ..setup.reconcile import SetupReconciler
+from ..validate.decorators import ValidationContext
+
+
+class SetupCheckpoint(CIConstants):
+    """
+    Journal of the completed steps of a setup, stored as JSON lines so a failed setup can be resumed
+    The first line holds a hash of the setup config. A journal written for another config is discarded.
+    Every completed step records the guid of the object it created, when the type of the step creates one.
+    """
+    LOGGER = Logger("setup-ci_setup_checkpoint")
+    JOURNAL_LOC = "/opt/OpenvStorage/ci/config/setup_journal.jsonl"
+
+    # Resolve the guid of the object created by a step from the keyword arguments of the step, per step type
+    # Presets have no guid of their own, so the guid of their alba backend is recorded
+    GUID_RESOLVERS = {'domain': lambda kwargs: DomainHelper.get_domainguid_by_name(kwargs['domain_name']),
+                      'backend': lambda kwargs: BackendHelper.get_alba_backend_guid_by_name(kwargs['backend_name']),
+                      'preset': lambda kwargs: BackendHelper.get_alba_backend_guid_by_name(kwargs['albabackend_name']),
+                      'vpool': lambda kwargs: VPoolHelper.get_vpool_by_name(kwargs['vpool_name']).guid,
+                      'vdisk': lambda kwargs: VDiskHelper.get_vdisk_by_name(kwargs['vdisk_name'], kwargs['vpool_name']).guid}
+
+    def __init__(self, setup_config=None, path=JOURNAL_LOC):
+        """
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param path: location of the journal
+        :type path: str
+        """
+        if setup_config is None:
+            setup_config = self.SETUP_CFG['setup']
+        self.path = path
+        self.config_hash = hashlib.sha1(json.dumps(setup_config, sort_keys=True)).hexdigest()
+        self._lock = Lock()
+        self._completed = {}
+        self._guids = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            self._write_header()
+            return
+        with open(self.path, 'r') as journal:
+            lines = journal.readlines()
+        try:
+            header = json.loads(lines[0]) if len(lines) > 0 else {}
+        except ValueError:
+            header = {}
+        if header.get('config_hash') != self.config_hash:
+            self.LOGGER.warning('Journal {0} belongs to another setup config, starting over'.format(self.path))
+            self._write_header()
+            return
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line might be incomplete when the process was killed while writing it
+                self.LOGGER.warning('Ignoring corrupt journal entry: {0}'.format(line.strip()))
+                continue
+            if entry['status'] == DAGNode.SUCCESS:
+                self._completed[entry['step']] = entry.get('result')
+                self._guids[entry['step']] = entry.get('guid')
+            else:
+                self._completed.pop(entry['step'], None)
+                self._guids.pop(entry['step'], None)
+
+    def _write_header(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self.path, 'w') as journal:
+            journal.write(json.dumps({'config_hash': self.config_hash, 'created': time.time()}) + '\n')
+        self._completed = {}
+        self._guids = {}
+
+    def _append(self, entry):
+        with self._lock:
+            with open(self.path, 'a') as journal:
+                journal.write(json.dumps(entry) + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def get_completed(self):
+        """
+        Fetch the completed steps
+        :return: results of the completed steps, mapped by step name
+        :rtype: dict
+        """
+        return dict(self._completed)
+
+    def get_guids(self):
+        """
+        Fetch the guids of the objects created by the completed steps
+        :return: guid of the created object (None when the type of step creates none), mapped by step name
+        :rtype: dict
+        """
+        return dict(self._guids)
+
+    def _resolve_guid(self, node):
+        resolver = self.GUID_RESOLVERS.get(node.name.split(':', 1)[0])
+        if resolver is None:
+            return None
+        try:
+            return resolver(node.kwargs)
+        except Exception:
+            self.LOGGER.exception('Unable to resolve the guid of the object created by step {0}'.format(node.name))
+            return None
+
+    def record(self, node):
+        """
+        Write the outcome of a step to the journal. Meant to be used as callback of the DAGExecutor
+        :param node: finished step
+        :type node: ci.api_lib.helpers.dag.DAGNode
+        :return: None
+        """
+        result = node.result
+        try:
+            json.dumps(result)
+        except (TypeError, ValueError):
+            result = repr(result)
+        guid = self._resolve_guid(node) if node.status == DAGNode.SUCCESS else None
+        self._append({'step': node.name, 'status': node.status, 'result': result, 'guid': guid, 'error': node.error,
+                      'duration': node.duration, 'time': time.time()})
+        if node.status == DAGNode.SUCCESS:
+            self._completed[node.name] = result
+            self._guids[node.name] = guid
+        else:
+            self._completed.pop(node.name, None)
+            self._guids.pop(node.name, None)
+
+    def invalidate(self, step):
+        """
+        Mark a completed step as incomplete
+        :param step: name of the step
+        :type step: str
+        :return: None
+        """
+        self._append({'step': step, 'status': DAGNode.PENDING, 'result': None, 'guid': None, 'error': 'Invalidated', 'duration': 0, 'time': time.time()})
+        self._completed.pop(step, None)
+        self._guids.pop(step, None)
+
+    def reset(self):
+        """
+        Forget all completed steps
+        :return: None
+        """
+        with self._lock:
+            self._write_header()
+
+    @classmethod
+    def deploy(cls, setup_config=None, path=JOURNAL_LOC, verify=True, max_workers=SetupOrchestrator.MAX_WORKERS,
+               stop_on_error=False, callback=None):
+        """
+        Deploy the setup section of setup.json, resuming from the journal of an earlier run
+        Steps completed by an earlier run are verified against a single snapshot of the cluster and skipped
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param path: location of the journal
+        :type path: str
+        :param verify: verify whether the completed steps are still in place. Unverified steps are trusted
+        :type verify: bool
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :param stop_on_error: do not start any new step after a step has failed
+        :type stop_on_error: bool
+        :param callback: called with every step as soon as it has finished
+        :type callback: callable
+        :return: report of the executed steps (see DAGExecutor.get_report) with the resumed steps under key resumed
+                 and the guids of the objects created by all completed steps under key guids
+        :rtype: dict
+        """
+        if setup_config is None:
+            setup_config = cls.SETUP_CFG['setup']
+        checkpoint = cls(setup_config, path=path)
+        executor = SetupOrchestrator.build_graph(setup_config, max_workers=max_workers)
+        completed = [name for name in checkpoint.get_completed() if name in executor.nodes]
+        if len(completed) > 0 and verify is True:
+            out_of_sync = set(action['step'] for action in SetupReconciler.get_plan(setup_config, ClusterSnapshot.load(include_osds=True)))
+            for name in completed:
+                if name in out_of_sync:
+                    cls.LOGGER.warning('Step {0} was completed but is no longer in place, executing it again'.format(name))
+                    checkpoint.invalidate(name)
+            completed = [name for name in completed if name not in out_of_sync]
+        if len(completed) > 0:
+            cls.LOGGER.info('Resuming setup, skipping {0} completed step(s)'.format(len(completed)))
+        executor.restrict([name for name in executor.nodes if name not in completed])
+
+        def _callback(node):
+            checkpoint.record(node)
+            if callback is not None:
+                callback(node)
+
+        with ValidationContext():
+            report = executor.execute(stop_on_error=stop_on_error, callback=_callback)
+        report['resumed'] = sorted(completed)
+        report['guids'] = checkpoint.get_guids()
+        cls.LOGGER.info('Setup took {0:.2f}s after resuming {1} step(s). Critical path ({2:.2f}s): {3}'
+                        .format(report['total_duration'], len(completed), report['critical_path_duration'], ' -> '.join(report['critical_path'])))
+        return report
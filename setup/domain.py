@@ -16,6 +16,7 @@
 
 from ovs.extensions.generic.logger import Logger
 from ..helpers.backend import BackendHelper
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..helpers.domain import DomainHelper
 from ..helpers.storagerouter import StoragerouterHelper
@@ -45,6 +46,7 @@ class DomainSetup(CIConstants):
                 api='/domains/',
                 data=data
             )
+            IndexCache.invalidate(IndexCache.DOMAIN_BY_NAME)
 
             if not DomainHelper.get_domain_by_name(domain_name):
                 error_msg = "Failed to add domain `{0}`".format(domain_name)
@@ -86,6 +88,7 @@ class DomainSetup(CIConstants):
             api='/storagerouters/{0}/set_domains/'.format(storagerouter_guid),
             data=data
         )
+        IndexCache.invalidate(IndexCache.STORAGEDRIVERS_BY_DOMAIN)
 
         storagerouter = StoragerouterHelper.get_storagerouter_by_guid(storagerouter_guid=storagerouter_guid)
         if len(set(domain_guids) - set(storagerouter.regular_domains)) != 0 or \
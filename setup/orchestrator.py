@@ -0,0 +1,215 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+from ovs.extensions.generic.logger import Logger
+from ..helpers.ci_constants import CIConstants
+from ..helpers.dag import DAGExecutor
+from ..setup.arakoon import ArakoonSetup
+from ..setup.backend import BackendSetup
+from ..setup.domain import DomainSetup
+from ..setup.roles import RoleSetup
+from ..setup.vdisk import VDiskSetup
+from ..setup.vpool import VPoolSetup
+from ..validate.decorators import ValidationContext
+
+
+class SetupOrchestrator(CIConstants):
+    """
+    Deploys the setup section of setup.json as a dependency graph
+    Independent steps (eg disk roles on different storagerouters) are executed concurrently, so a deployment
+    takes as long as its longest chain of dependent steps.
+    """
+    LOGGER = Logger("setup-ci_setup_orchestrator")
+    MAX_WORKERS = 10
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def domain_step(domain_name):
+        return 'domain:{0}'.format(domain_name)
+
+    @staticmethod
+    def domain_link_step(storagerouter_ip):
+        return 'domain_link:{0}'.format(storagerouter_ip)
+
+    @staticmethod
+    def role_step(storagerouter_ip, diskname):
+        return 'role:{0}:{1}'.format(storagerouter_ip, diskname)
+
+    @staticmethod
+    def arakoon_step(backend_name):
+        return 'arakoon:{0}'.format(backend_name)
+
+    @staticmethod
+    def backend_step(backend_name):
+        return 'backend:{0}'.format(backend_name)
+
+    @staticmethod
+    def backend_domain_step(backend_name):
+        return 'backend_domain:{0}'.format(backend_name)
+
+    @staticmethod
+    def preset_step(backend_name, preset_name):
+        return 'preset:{0}:{1}'.format(backend_name, preset_name)
+
+    @staticmethod
+    def asd_step(backend_name, target):
+        return 'asds:{0}:{1}'.format(backend_name, target)
+
+    @staticmethod
+    def link_step(globalbackend_name, backend_name):
+        return 'link:{0}:{1}'.format(globalbackend_name, backend_name)
+
+    @staticmethod
+    def vpool_step(storagerouter_ip, vpool_name):
+        return 'vpool:{0}:{1}'.format(storagerouter_ip, vpool_name)
+
+    @staticmethod
+    def vdisk_step(vpool_name, vdisk_name):
+        return 'vdisk:{0}:{1}'.format(vpool_name, vdisk_name)
+
+    @classmethod
+    def build_graph(cls, setup_config=None, max_workers=MAX_WORKERS):
+        """
+        Translate the setup section of setup.json into a dependency graph
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :return: executor holding all steps
+        :rtype: ci.api_lib.helpers.dag.DAGExecutor
+        """
+        if setup_config is None:
+            setup_config = cls.SETUP_CFG['setup']
+        storagerouters = setup_config.get('storagerouters', {})
+        backends = setup_config.get('backends', [])
+        backend_names = [backend['name'] for backend in backends]
+        executor = DAGExecutor(max_workers=max_workers, logger=cls.LOGGER)
+
+        # Domains
+        for domain_name in setup_config.get('domains', []):
+            executor.add(cls.domain_step(domain_name), DomainSetup.add_domain, kwargs={'domain_name': domain_name})
+
+        # Storagerouters: domains and disk roles. Partitioning is serialized per storagerouter
+        role_steps = {}
+        for storagerouter_ip, storagerouter_details in storagerouters.iteritems():
+            domain_details = storagerouter_details.get('domains')
+            if domain_details is not None:
+                domain_details = {'domain_guids': domain_details.get('domain_guids', []),
+                                  'recovery_domain_guids': domain_details.get('recovery_domain_guids', [])}
+                executor.add(cls.domain_link_step(storagerouter_ip), DomainSetup.link_domains_to_storagerouter,
+                             kwargs={'domain_details': domain_details, 'storagerouter_ip': storagerouter_ip},
+                             dependencies=[cls.domain_step(domain_name) for domain_name in domain_details['domain_guids'] + domain_details['recovery_domain_guids']])
+            role_steps[storagerouter_ip] = []
+            for diskname, disk_details in storagerouter_details.get('disks', {}).iteritems():
+                role_steps[storagerouter_ip].append(executor.add(cls.role_step(storagerouter_ip, diskname), RoleSetup.add_disk_role,
+                                                                 kwargs={'storagerouter_ip': storagerouter_ip, 'diskname': diskname, 'roles': disk_details['roles']},
+                                                                 resource=storagerouter_ip))
+        all_role_steps = [step for steps in role_steps.itervalues() for step in steps]
+
+        # Backends, presets, asds and links
+        capacity_steps = dict((backend_name, []) for backend_name in backend_names)
+        for backend in backends:
+            backend_name = backend['name']
+            backend_dependencies = list(all_role_steps)  # Backends require the DB role somewhere in the cluster
+            if backend.get('external_arakoon') is not None:
+                backend_dependencies.append(executor.add(cls.arakoon_step(backend_name), ArakoonSetup.setup_external_arakoons, args=(backend,)))
+            executor.add(cls.backend_step(backend_name), BackendSetup.add_backend,
+                         kwargs={'backend_name': backend_name, 'scaling': backend.get('scaling', 'LOCAL')},
+                         dependencies=backend_dependencies)
+            domain_names = backend.get('domains', {}).get('domain_guids', [])
+            if len(domain_names) > 0:
+                executor.add(cls.backend_domain_step(backend_name), DomainSetup.link_domains_to_backend,
+                             kwargs={'domain_details': {'domain_guids': domain_names}, 'albabackend_name': backend_name},
+                             dependencies=[cls.backend_step(backend_name)] + [cls.domain_step(domain_name) for domain_name in domain_names])
+            for preset in backend.get('presets', []):
+                executor.add(cls.preset_step(backend_name, preset['name']), BackendSetup.add_preset,
+                             kwargs={'albabackend_name': backend_name, 'preset_details': preset},
+                             dependencies=[cls.backend_step(backend_name)])
+        for backend in backends:
+            backend_name = backend['name']
+            for osd_identifier, osd_details in backend.get('osds', {}).iteritems():
+                if backend.get('scaling', 'LOCAL') == 'LOCAL':
+                    # osd_identifier is the ip of an asd manager, osd_details the disks to use
+                    capacity_steps[backend_name].append(executor.add(cls.asd_step(backend_name, osd_identifier), BackendSetup.add_asds,
+                                                                     kwargs={'target': osd_identifier, 'disks': osd_details, 'albabackend_name': backend_name},
+                                                                     dependencies=[cls.backend_step(backend_name)],
+                                                                     resource='asd_manager:{0}'.format(osd_identifier)))
+                else:
+                    # osd_identifier is the name of the linked backend, osd_details the preset to link with
+                    capacity_steps[backend_name].append(executor.add(cls.link_step(backend_name, osd_identifier), BackendSetup.link_backend,
+                                                                     kwargs={'albabackend_name': osd_identifier, 'globalbackend_name': backend_name, 'preset_name': osd_details},
+                                                                     dependencies=[cls.backend_step(backend_name), cls.preset_step(osd_identifier, osd_details)]))
+        # A linked backend should have capacity before it can be used as capacity of a global backend
+        for backend in backends:
+            if backend.get('scaling', 'LOCAL') != 'LOCAL':
+                for linked_backend_name in backend.get('osds', {}):
+                    executor.nodes[cls.link_step(backend['name'], linked_backend_name)].dependencies.extend(capacity_steps.get(linked_backend_name, []))
+
+        # vPools and vDisks. Extending the same vPool is serialized
+        for storagerouter_ip, storagerouter_details in storagerouters.iteritems():
+            for vpool_name, vpool_details in storagerouter_details.get('vpools', {}).iteritems():
+                dependencies = list(role_steps[storagerouter_ip])
+                if cls.domain_link_step(storagerouter_ip) in executor.nodes:
+                    dependencies.append(cls.domain_link_step(storagerouter_ip))
+                used_backends = [(vpool_details['backend_name'], vpool_details['preset'])]
+                for cache_type in ['fragment_cache', 'block_cache']:
+                    cache_details = vpool_details.get(cache_type) or {}
+                    if cache_details.get('location') == 'backend':
+                        used_backends.append((cache_details['backend']['name'], cache_details['backend']['preset']))
+                for backend_name, preset_name in used_backends:
+                    dependencies.append(cls.preset_step(backend_name, preset_name))
+                    dependencies.extend(capacity_steps.get(backend_name, []))
+                vpool_step = executor.add(cls.vpool_step(storagerouter_ip, vpool_name), VPoolSetup.add_vpool,
+                                          kwargs={'vpool_name': vpool_name, 'vpool_details': vpool_details, 'storagerouter_ip': storagerouter_ip},
+                                          dependencies=dependencies,
+                                          resource='vpool:{0}'.format(vpool_name))
+                # Optional vdisks to create on the vpool: {vdisk name: size in bytes}
+                for vdisk_name, size in vpool_details.get('vdisks', {}).iteritems():
+                    executor.add(cls.vdisk_step(vpool_name, vdisk_name), VDiskSetup.create_vdisk,
+                                 kwargs={'vdisk_name': vdisk_name, 'vpool_name': vpool_name, 'size': size, 'storagerouter_ip': storagerouter_ip},
+                                 dependencies=[vpool_step])
+
+        # Presets and backends which are not part of the config are expected to exist already
+        for node in executor.nodes.itervalues():
+            external = [dependency for dependency in node.dependencies if dependency not in executor.nodes]
+            if len(external) > 0:
+                cls.LOGGER.debug('Step {0} relies on existing {1}'.format(node.name, ', '.join(external)))
+                node.dependencies = [dependency for dependency in node.dependencies if dependency in executor.nodes]
+        return executor
+
+    @classmethod
+    def deploy(cls, setup_config=None, max_workers=MAX_WORKERS, stop_on_error=False, callback=None):
+        """
+        Deploy the setup section of setup.json
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :param stop_on_error: do not start any new step after a step has failed
+        :type stop_on_error: bool
+        :param callback: called with every step as soon as it has finished
+        :type callback: callable
+        :return: report with the status and timing of every step and the critical path
+        :rtype: dict
+        """
+        executor = cls.build_graph(setup_config, max_workers=max_workers)
+        with ValidationContext():
+            report = executor.execute(stop_on_error=stop_on_error, callback=callback)
+        cls.LOGGER.info('Deployment took {0:.2f}s, the serial duration of all steps is {1:.2f}s. Critical path ({2:.2f}s): {3}'
+                        .format(report['total_duration'], report['serial_duration'], report['critical_path_duration'], ' -> '.join(report['critical_path'])))
+        return report
@@ -15,14 +15,15 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 import json
-from ovs.dal.lists.vpoollist import VPoolList
 from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.generic.logger import Logger
-from ovs_extensions.generic.toolbox import ExtensionsToolbox
-from ovs.extensions.services.servicefactory import ServiceFactory
 from ovs.lib.helpers.toolbox import Toolbox
-from ovs.dal.hybrids.service import Service
-from ovs.extensions.generic.sshclient import SSHClient
+from ..helpers.lazy import LazyImport
+from ..helpers.service import ServiceHelper
+from ..validate.schema import Mapping
+
+VPoolList = LazyImport('ovs.dal.lists.vpoollist', 'VPoolList')
+Service = LazyImport('ovs.dal.hybrids.service', 'Service')
 
 
 class ProxySetup(object):
@@ -44,15 +45,29 @@ class ProxySetup(object):
               'use_fadvise': (str, ['true', 'false'], False),
               'upload_slack': (float, None, False),
               'read_preference': (list, None, False)}
+    PARAMS_SCHEMA = Mapping(PARAMS, extra=False)
 
     @staticmethod
-    def configure_proxy(backend_name, proxy_configuration):
-        faulty_keys = [key for key in proxy_configuration.keys() if key not in ProxySetup.PARAMS]
-        if len(faulty_keys) > 0:
-            raise ValueError('{0} are unsupported keys for proxy configuration.'.format(', '.join(faulty_keys)))
-        ExtensionsToolbox.verify_required_params(ProxySetup.PARAMS, proxy_configuration)
+    def configure_proxy(backend_name, proxy_configuration, max_parallel=10):
+        """
+        Update the configuration of all proxies of the vpools on a backend and restart them
+        :param backend_name: name of the backend
+        :type backend_name: str
+        :param proxy_configuration: configuration items to change
+        :type proxy_configuration: dict
+        :param max_parallel: amount of proxies to restart simultaneously
+        :type max_parallel: int
+        :raises ValueError: when the proxy configuration contains unsupported keys or invalid values
+        :raises RuntimeError: when a proxy did not come back after its restart
+        :return: dict with the restart result of every proxy, mapped by (storage ip, service name)
+        :rtype: dict
+        """
+        try:
+            ProxySetup.PARAMS_SCHEMA.validate(proxy_configuration, path='proxy')
+        except RuntimeError as ex:
+            raise ValueError(str(ex))
         vpools = VPoolList.get_vpools()
-        service_manager = ServiceFactory.get_manager()
+        restart_targets = []
         with open('/root/old_proxies', 'w') as backup_file:
             for vpool in vpools:
                 if vpool.metadata['backend']['backend_info']['name'] != backend_name:
@@ -68,5 +83,9 @@ class ProxySetup(object):
                         ProxySetup.LOGGER.info("Changed {0} to {1} for proxy {2}".format(old_proxy_config, proxy_config, config_loc))
                         ProxySetup.LOGGER.info("Changed items {0}".format([(key, value) for key, value in proxy_config.iteritems() if key not in old_proxy_config.keys()]))
                         Configuration.set(config_loc, json.dumps(proxy_config, indent=4), raw=True)
-                        client = SSHClient(storagedriver.storage_ip, username='root')
-                        service_manager.restart_service(proxy_service.name, client=client)
+                        restart_targets.append((storagedriver.storage_ip, proxy_service.name))
+        results = ServiceHelper.rolling_restart(restart_targets, max_parallel=max_parallel)
+        failed = ['{0} on {1}'.format(service_name, ip) for (ip, service_name), result in results.iteritems() if result['success'] is False]
+        if len(failed) > 0:
+            raise RuntimeError('The following proxies did not come back after their restart: {0}'.format(', '.join(sorted(failed))))
+        return results
@@ -0,0 +1,291 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+import ast
+from ovs.extensions.generic.logger import Logger
+from ..helpers.ci_constants import CIConstants
+from ..helpers.snapshot import ClusterSnapshot
+from ..remove.orchestrator import TeardownOrchestrator
+from ..setup.backend import BackendSetup
+from ..setup.orchestrator import SetupOrchestrator
+from ..validate.decorators import ValidationContext
+
+
+class SetupReconciler(CIConstants):
+    """
+    Brings the cluster in the state described by setup.json
+    The setup config is compared with a single snapshot of the cluster, resulting in a plan holding only the steps
+    that are out of sync. Re-running the setup of a deployed cluster therefore executes nothing.
+    """
+    LOGGER = Logger("setup-ci_setup_reconciler")
+    MAX_WORKERS = 10
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def _get_devicename(vdisk_name):
+        # Same conversion as VDiskHelper.get_vdisk_by_name
+        if not vdisk_name.startswith('/'):
+            vdisk_name = '/{0}'.format(vdisk_name)
+        if not vdisk_name.endswith('.raw'):
+            vdisk_name = '{0}.raw'.format(vdisk_name)
+        return vdisk_name
+
+    @staticmethod
+    def _normalize_policies(policies):
+        """
+        Policies are returned by the API as lists or as their string representation
+        :param policies: policies of a preset
+        :type policies: list
+        :return: policies as tuples
+        :rtype: list
+        """
+        normalized = []
+        for policy in policies:
+            if isinstance(policy, basestring):
+                policy = ast.literal_eval(policy)
+            normalized.append(tuple(policy))
+        return sorted(normalized)
+
+    @classmethod
+    def get_plan(cls, setup_config=None, snapshot=None, teardown_executor=None):
+        """
+        Compare the setup config with the cluster
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param snapshot: snapshot of the cluster, including the claimed ASDs. A new one is loaded when not given
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
+        :param teardown_executor: removal of the objects which are not part of the setup config (see build_teardown_graph)
+        :type teardown_executor: ci.api_lib.helpers.dag.DAGExecutor
+        :return: list of actions, every action being a dict with keys action, step and reason
+        :rtype: list
+        """
+        if setup_config is None:
+            setup_config = cls.SETUP_CFG['setup']
+        if snapshot is None:
+            snapshot = ClusterSnapshot.load(include_osds=True)
+        plan = []
+
+        def _plan(action, step, reason):
+            plan.append({'action': action, 'step': step, 'reason': reason})
+
+        if teardown_executor is not None:
+            for name in teardown_executor.get_topological_order():
+                _plan(cls.DELETE, name, 'not part of the setup config')
+
+        for domain_name in setup_config.get('domains', []):
+            if domain_name not in snapshot.domain_by_name:
+                _plan(cls.CREATE, SetupOrchestrator.domain_step(domain_name), 'domain does not exist')
+
+        storagerouters = setup_config.get('storagerouters', {})
+        for storagerouter_ip, storagerouter_details in storagerouters.iteritems():
+            storagerouter = snapshot.get_storagerouter_by_ip(storagerouter_ip)
+            if storagerouter is None:
+                raise RuntimeError('Storagerouter with ip `{0}` is not part of the cluster'.format(storagerouter_ip))
+            domain_details = storagerouter_details.get('domains')
+            if domain_details is not None:
+                if snapshot.get_domain_names(storagerouter['regular_domains']) != set(domain_details.get('domain_guids', [])) or \
+                   snapshot.get_domain_names(storagerouter['recovery_domains']) != set(domain_details.get('recovery_domain_guids', [])):
+                    _plan(cls.UPDATE, SetupOrchestrator.domain_link_step(storagerouter_ip), 'domains differ')
+            for diskname, disk_details in storagerouter_details.get('disks', {}).iteritems():
+                current_roles = set(snapshot.get_roles_from_disk(storagerouter['guid'], diskname))
+                missing_roles = set(disk_details['roles']).difference(current_roles)
+                if len(current_roles) == 0:
+                    _plan(cls.CREATE, SetupOrchestrator.role_step(storagerouter_ip, diskname), 'disk has no roles')
+                elif len(missing_roles) > 0:
+                    _plan(cls.UPDATE, SetupOrchestrator.role_step(storagerouter_ip, diskname), 'missing roles {0}'.format(', '.join(sorted(missing_roles))))
+
+        for backend in setup_config.get('backends', []):
+            backend_name = backend['name']
+            albabackend = snapshot.albabackend_by_name.get(backend_name)
+            scaling = backend.get('scaling', 'LOCAL')
+            domain_names = set(backend.get('domains', {}).get('domain_guids', []))
+            if albabackend is None:
+                if backend.get('external_arakoon') is not None:
+                    _plan(cls.CREATE, SetupOrchestrator.arakoon_step(backend_name), 'backend does not exist')
+                _plan(cls.CREATE, SetupOrchestrator.backend_step(backend_name), 'backend does not exist')
+                if len(domain_names) > 0:
+                    _plan(cls.CREATE, SetupOrchestrator.backend_domain_step(backend_name), 'backend does not exist')
+                for preset in backend.get('presets', []):
+                    _plan(cls.CREATE, SetupOrchestrator.preset_step(backend_name, preset['name']), 'backend does not exist')
+                for osd_identifier in backend.get('osds', {}):
+                    if scaling == 'LOCAL':
+                        _plan(cls.CREATE, SetupOrchestrator.asd_step(backend_name, osd_identifier), 'backend does not exist')
+                    else:
+                        _plan(cls.CREATE, SetupOrchestrator.link_step(backend_name, osd_identifier), 'backend does not exist')
+                continue
+
+            if len(domain_names.difference(snapshot.get_domain_names(snapshot.backend_by_name[backend_name]['regular_domains']))) > 0:
+                _plan(cls.UPDATE, SetupOrchestrator.backend_domain_step(backend_name), 'domains differ')
+            current_presets = dict((preset['name'], preset) for preset in albabackend['presets'])
+            for preset in backend.get('presets', []):
+                step_name = SetupOrchestrator.preset_step(backend_name, preset['name'])
+                if preset['name'] not in current_presets:
+                    _plan(cls.CREATE, step_name, 'preset does not exist')
+                elif cls._normalize_policies(preset['policies']) != cls._normalize_policies(current_presets[preset['name']]['policies']):
+                    _plan(cls.UPDATE, step_name, 'policies differ')
+            if scaling == 'LOCAL':
+                claimed_osds = snapshot.get_claimed_osds(backend_name) if len(backend.get('osds', {})) > 0 else {}
+                for target, disks in backend.get('osds', {}).iteritems():
+                    unclaimed = [diskname for diskname in disks if diskname not in claimed_osds.get(target, {})]
+                    if len(unclaimed) > 0:
+                        _plan(cls.CREATE, SetupOrchestrator.asd_step(backend_name, target), 'unclaimed disks {0}'.format(', '.join(sorted(unclaimed))))
+            else:
+                for linked_backend_name in backend.get('osds', {}):
+                    linked_albabackend = snapshot.albabackend_by_name.get(linked_backend_name)
+                    if linked_albabackend is None or linked_albabackend['guid'] not in albabackend['linked_backend_guids']:
+                        _plan(cls.CREATE, SetupOrchestrator.link_step(backend_name, linked_backend_name), 'backend is not linked')
+
+        for storagerouter_ip, storagerouter_details in storagerouters.iteritems():
+            storagerouter = snapshot.get_storagerouter_by_ip(storagerouter_ip)
+            storagedriver_names = [storagedriver['name'] for storagedriver in snapshot.get_storagedrivers_by_storagerouter(storagerouter['guid'])]
+            for vpool_name, vpool_details in storagerouter_details.get('vpools', {}).iteritems():
+                # Same check as VPoolValidation.check_vpool_on_storagerouter
+                if not any(vpool_name in storagedriver_name for storagedriver_name in storagedriver_names):
+                    _plan(cls.CREATE, SetupOrchestrator.vpool_step(storagerouter_ip, vpool_name), 'vPool is not extended to the storagerouter')
+                devicenames = set(vdisk['devicename'] for vdisk in snapshot.get_vdisks_by_vpool(vpool_name))
+                for vdisk_name in vpool_details.get('vdisks', {}):
+                    if cls._get_devicename(vdisk_name) not in devicenames:
+                        _plan(cls.CREATE, SetupOrchestrator.vdisk_step(vpool_name, vdisk_name), 'vDisk does not exist')
+        return plan
+
+    @classmethod
+    def build_teardown_graph(cls, setup_config=None, snapshot=None, max_workers=MAX_WORKERS):
+        """
+        Build the removal of the objects of the cluster which are not part of the setup config
+        Only vDisks, vPools, links, presets and backends are removed, disk roles, domains and arakoons are kept.
+        vDisks are only removed from vPools which list their vDisks in the setup config or which are removed themselves.
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param snapshot: snapshot of the cluster, including the claimed ASDs. A new one is loaded when not given
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :return: executor holding the removal steps
+        :rtype: ci.api_lib.helpers.dag.DAGExecutor
+        """
+        if setup_config is None:
+            setup_config = cls.SETUP_CFG['setup']
+        if snapshot is None:
+            snapshot = ClusterSnapshot.load(include_osds=True)
+        configured_backends = set(backend['name'] for backend in setup_config.get('backends', []))
+
+        # Describe the cluster in the format of the setup section
+        cluster_storagerouters = {}
+        for storagedriver in snapshot.storagedrivers:
+            storagerouter_ip = snapshot.storagerouter_by_guid[storagedriver['storagerouter_guid']]['ip']
+            vpool = snapshot.vpool_by_guid[storagedriver['vpool_guid']]
+            backend_info = vpool['metadata']['backend']['backend_info']
+            vdisks = snapshot.get_vdisks_by_vpool(vpool['name'])
+            vdisk_structure = dict((vdisk['devicename'].lstrip('/'),
+                                    TeardownOrchestrator.get_vdisk_structure(vdisk['guid'], vdisk.get('parent_vdisk_guid'), vdisk.get('is_vtemplate')))
+                                   for vdisk in vdisks)
+            cluster_storagerouters.setdefault(storagerouter_ip, {'disks': {}, 'vpools': {}})['vpools'][vpool['name']] = {
+                'backend_name': backend_info['name'],
+                'preset': backend_info['preset'],
+                'vdisks': dict((vdisk['devicename'].lstrip('/'), None) for vdisk in vdisks),
+                'vdisk_structure': vdisk_structure}
+        cluster_backends = []
+        for albabackend in snapshot.albabackends:
+            backend = {'name': albabackend['name'],
+                       'scaling': albabackend['scaling'],
+                       'presets': [{'name': preset['name']} for preset in albabackend['presets'] if preset.get('is_default') is not True],
+                       'osds': {}}
+            if albabackend['scaling'] != 'LOCAL':
+                backend['osds'] = dict((snapshot.albabackend_by_guid[linked_guid]['name'], None)
+                                       for linked_guid in albabackend['linked_backend_guids'] if linked_guid in snapshot.albabackend_by_guid)
+            elif albabackend['name'] not in configured_backends:
+                # The ASDs of the backends to keep are left alone, so only fetch the claimed ASDs of the others
+                backend['osds'] = snapshot.get_claimed_osds(albabackend['name'])
+            cluster_backends.append(backend)
+        executor = TeardownOrchestrator.build_graph({'storagerouters': cluster_storagerouters, 'backends': cluster_backends}, max_workers=max_workers)
+
+        # Keep everything the setup config describes
+        wanted = set()
+        for storagerouter_ip, storagerouter_details in setup_config.get('storagerouters', {}).iteritems():
+            for vpool_name, vpool_details in storagerouter_details.get('vpools', {}).iteritems():
+                wanted.add(TeardownOrchestrator.vpool_step(storagerouter_ip, vpool_name))
+                if 'vdisks' in vpool_details:
+                    wanted.update(TeardownOrchestrator.vdisk_step(vpool_name, cls._get_devicename(vdisk_name).lstrip('/')) for vdisk_name in vpool_details['vdisks'])
+                else:
+                    wanted.update(TeardownOrchestrator.vdisk_step(vpool_name, vdisk['devicename'].lstrip('/')) for vdisk in snapshot.get_vdisks_by_vpool(vpool_name))
+        for backend in setup_config.get('backends', []):
+            wanted.add(TeardownOrchestrator.backend_step(backend['name']))
+            wanted.update(TeardownOrchestrator.preset_step(backend['name'], preset['name']) for preset in backend.get('presets', []))
+            if backend.get('scaling', 'LOCAL') != 'LOCAL':
+                wanted.update(TeardownOrchestrator.unlink_step(backend['name'], linked_backend_name) for linked_backend_name in backend.get('osds', {}))
+        executor.restrict([name for name in executor.nodes if name not in wanted])
+        return executor
+
+    @classmethod
+    def reconcile(cls, setup_config=None, prune=False, max_workers=MAX_WORKERS, stop_on_error=False, callback=None):
+        """
+        Bring the cluster in the state described by the setup config, executing only the steps which are out of sync
+        :param setup_config: setup section of setup.json. Defaults to the one of the CI config
+        :type setup_config: dict
+        :param prune: also remove the objects which are not part of the setup config (see build_teardown_graph)
+        :type prune: bool
+        :param max_workers: maximum amount of steps executing simultaneously
+        :type max_workers: int
+        :param stop_on_error: do not start any new step after a step has failed
+        :type stop_on_error: bool
+        :param callback: called with every step as soon as it has finished
+        :type callback: callable
+        :return: dict with the plan and the reports of the teardown and the setup (None when nothing had to be done)
+        :rtype: dict
+        """
+        if setup_config is None:
+            setup_config = cls.SETUP_CFG['setup']
+        snapshot = ClusterSnapshot.load(include_osds=True)
+        teardown_executor = None
+        if prune is True:
+            teardown_executor = cls.build_teardown_graph(setup_config, snapshot, max_workers=max_workers)
+        plan = cls.get_plan(setup_config, snapshot, teardown_executor)
+        result = {'plan': plan, 'teardown': None, 'setup': None}
+        if len(plan) == 0:
+            cls.LOGGER.info('Cluster is in sync with the setup config')
+            return result
+        for action in plan:
+            cls.LOGGER.info('Planned to {0} {1}: {2}'.format(action['action'], action['step'], action['reason']))
+
+        if teardown_executor is not None and len(teardown_executor.nodes) > 0:
+            with ValidationContext():
+                result['teardown'] = teardown_executor.execute(stop_on_error=stop_on_error, callback=callback)
+            if stop_on_error is True and result['teardown']['successful'] is False:
+                return result
+
+        steps = [action['step'] for action in plan if action['action'] != cls.DELETE]
+        if len(steps) > 0:
+            executor = SetupOrchestrator.build_graph(setup_config, max_workers=max_workers)
+            executor.restrict(steps)
+            # add_preset skips existing presets, so changed policies are applied with update_preset instead
+            presets = dict((SetupOrchestrator.preset_step(backend['name'], preset['name']), (backend['name'], preset))
+                           for backend in setup_config.get('backends', []) for preset in backend.get('presets', []))
+            for action in plan:
+                if action['action'] == cls.UPDATE and action['step'] in presets:
+                    backend_name, preset = presets[action['step']]
+                    node = executor.nodes[action['step']]
+                    node.target = BackendSetup.update_preset
+                    node.kwargs = {'albabackend_name': backend_name, 'preset_name': preset['name'], 'policies': preset['policies']}
+            # The guards of the setup functions validate against a snapshot as well
+            with ValidationContext(use_snapshot=True):
+                result['setup'] = executor.execute(stop_on_error=stop_on_error, callback=callback)
+        return result
@@ -15,6 +15,7 @@
 # but WITHOUT ANY WARRANTY of any kind.
 
 from ovs.extensions.generic.logger import Logger
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
 from ..helpers.storagerouter import StoragerouterHelper
 from ..validate.decorators import check_role_on_disk
@@ -119,6 +120,7 @@ class RoleSetup(CIConstants):
             data=data
         )
         task_result = cls.api.wait_for_task(task_id=task_guid, timeout=timeout)
+        IndexCache.invalidate(IndexCache.ROLE_INVENTORY)
         if not task_result[0]:
             error_msg = "Adjusting disk `{0}` has failed on storagerouter `{1}` with error '{2}'" \
                 .format(disk_guid, storagerouter_guid, task_result[1])
@@ -14,9 +14,9 @@
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
 from ovs.extensions.generic.logger import Logger
-from ovs_extensions.generic.toolbox import ExtensionsToolbox
 from ..helpers.storagedriver import StoragedriverHelper
 from ..helpers.vpool import VPoolHelper
+from ..validate.schema import Mapping
 
 
 class StoragedriverSetup(object):
@@ -25,6 +25,7 @@ class StoragedriverSetup(object):
     # These will be all possible settings for the StorageDriver. Messing them up is their own responsibility (they should not bypass the API by default!!)
     STORAGEDRIVER_PARAMS = {"volume_manager": (dict, None, False),
                             "backend_connection_manager": (dict, None, False)}
+    STORAGEDRIVER_SCHEMA = Mapping(STORAGEDRIVER_PARAMS)
 
     @staticmethod
     def change_config(vpool_name, vpool_details, storagerouter_ip, *args, **kwargs):
@@ -32,7 +33,7 @@ class StoragedriverSetup(object):
         # Settings volumedriver
         storagedriver_config = vpool_details.get('storagedriver')
         if storagedriver_config is not None:
-            ExtensionsToolbox.verify_required_params(StoragedriverSetup.STORAGEDRIVER_PARAMS, storagedriver_config)
+            StoragedriverSetup.STORAGEDRIVER_SCHEMA.validate(storagedriver_config, path='storagedriver')
             StoragedriverSetup.LOGGER.info('Updating volumedriver configuration of vPool `{0}` on storagerouter `{1}`.'.format(vpool_name, storagerouter_ip))
             vpool = VPoolHelper.get_vpool_by_name(vpool_name)
             storagedriver = [sd for sd in vpool.storagedrivers if sd.storagerouter.ip == storagerouter_ip][0]
@@ -15,14 +15,17 @@
 # but WITHOUT ANY WARRANTY of any kind.
 
 from ovs.extensions.generic.logger import Logger
-from ovs_extensions.generic.toolbox import ExtensionsToolbox
-from ovs.lib.generic import GenericController
 from ..helpers.backend import BackendHelper
+from ..helpers.cache import IndexCache
 from ..helpers.ci_constants import CIConstants
-from ..helpers.storagerouter import StoragerouterHelper
+from ..helpers.lazy import LazyImport
 from ..helpers.storagedriver import StoragedriverHelper
+from ..helpers.storagerouter import StoragerouterHelper
 from ..helpers.vpool import VPoolHelper
 from ..validate.decorators import required_roles, check_vpool
+from ..validate.schema import Mapping
+
+GenericController = LazyImport('ovs.lib.generic', 'GenericController')
 
 
 class VPoolSetup(CIConstants):
@@ -34,6 +37,7 @@ class VPoolSetup(CIConstants):
     # These will be all possible settings for the StorageDriver. Messing them up is their own responsibility (they should not bypass the API by default!!)
     STORAGEDRIVER_PARAMS = {"volume_manager": (dict, None, False),
                             "backend_connection_manager": (dict, None, False)}
+    STORAGEDRIVER_SCHEMA = Mapping(STORAGEDRIVER_PARAMS)
 
     def __init__(self):
         pass
@@ -117,6 +121,7 @@ class VPoolSetup(CIConstants):
             data=api_data
         )
         task_result = cls.api.wait_for_task(task_id=task_guid, timeout=timeout)
+        IndexCache.invalidate(IndexCache.STORAGEDRIVERS_BY_DOMAIN)
         if not task_result[0]:
             error_msg = 'vPool {0} has failed to create on storagerouter {1} because: {2}'.format(vpool_name, storagerouter_ip, task_result[1])
             VPoolSetup.LOGGER.error(error_msg)
@@ -127,7 +132,7 @@ class VPoolSetup(CIConstants):
         # Settings volumedriver
         storagedriver_config = vpool_details.get('storagedriver')
         if storagedriver_config is not None:
-            ExtensionsToolbox.verify_required_params(VPoolSetup.STORAGEDRIVER_PARAMS, storagedriver_config)
+            VPoolSetup.STORAGEDRIVER_SCHEMA.validate(storagedriver_config, path='storagedriver')
             VPoolSetup.LOGGER.info('Updating volumedriver configuration of vPool `{0}` on storagerouter `{1}`.'.format(vpool_name, storagerouter_ip))
             vpool = VPoolHelper.get_vpool_by_name(vpool_name)
             storagedriver = [sd for sd in vpool.storagedrivers if sd.storagerouter.ip == storagerouter_ip][0]
@@ -29,7 +29,7 @@ class BackendValidation(object):
         pass
 
     @staticmethod
-    def check_preset_on_backend(preset_name, albabackend_name):
+    def check_preset_on_backend(preset_name, albabackend_name, snapshot=None):
         """
         Check if a preset is available on a backend
 
@@ -37,12 +37,17 @@ class BackendValidation(object):
         :type preset_name: str
         :param albabackend_name: name of a backend
         :type albabackend_name: str
+        :param snapshot: snapshot of the cluster to validate against instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
         :return: does preset exist on backend?
         :rtype: bool
         """
 
         try:
-            BackendHelper.get_preset_by_albabackend(preset_name, albabackend_name)
+            if snapshot is not None:
+                snapshot.get_preset_by_albabackend(preset_name, albabackend_name)
+            else:
+                BackendHelper.get_preset_by_albabackend(preset_name, albabackend_name)
             return True
         except PresetNotFoundError:
             return False
@@ -68,20 +73,23 @@ class BackendValidation(object):
         return [list(ast.literal_eval(policy)) for policy in preset_policies] == policies
 
     @staticmethod
-    def check_backend(backend_name):
+    def check_backend(backend_name, snapshot=None):
         """
         Check if a backend is available on the cluster
 
         :param backend_name: name of a existing backend
         :type backend_name: str
+        :param snapshot: snapshot of the cluster to validate against instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
         :return: if exists
         :rtype: bool
         """
-
+        if snapshot is not None:
+            return backend_name in snapshot.backend_by_name
         return BackendHelper.get_backend_by_name(backend_name) is not None
 
     @staticmethod
-    def check_linked_backend(albabackend_name, globalbackend_name):
+    def check_linked_backend(albabackend_name, globalbackend_name, snapshot=None):
         """
         Check if a backend is already linked to a given global backend
 
@@ -89,9 +97,14 @@ class BackendValidation(object):
         :type albabackend_name: str
         :param globalbackend_name: name of a existing global alba backend
         :type globalbackend_name: str
+        :param snapshot: snapshot of the cluster to validate against instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
         :return: if link exists
         :rtype: bool
         """
+        if snapshot is not None:
+            albabackend_guid = snapshot.get_albabackend_by_name(albabackend_name)['guid']
+            return albabackend_guid in snapshot.get_albabackend_by_name(globalbackend_name)['linked_backend_guids']
 
         albabackend_guid = BackendHelper.get_alba_backend_guid_by_name(albabackend_name)
         globalbackend = BackendHelper.get_albabackend_by_name(globalbackend_name)
@@ -13,11 +13,15 @@
 #
 # Open vStorage is distributed in the hope that it will be useful,
 # but WITHOUT ANY WARRANTY of any kind.
+import copy
+import json
+from threading import Lock
 from ovs.extensions.generic.configuration import Configuration
 from ovs.extensions.generic.logger import Logger
-from ovs.extensions.generic.sshclient import SSHClient
 from ..helpers.backend import BackendHelper
 from ..helpers.exceptions import DirectoryNotFoundError, ArakoonClusterNotFoundError
+from ..helpers.snapshot import ClusterSnapshot
+from ..helpers.sshclient import SSHClientPool
 from ..helpers.vdisk import VDiskHelper
 from ..validate.backend import BackendValidation
 from ..validate.roles import RoleValidation
@@ -27,6 +31,123 @@ LOGGER = Logger("validate-ci_decorator")
 LOCATION_OPTIONS = ['GLOBAL', 'LOCAL']
 
 
+class ValidationContext(object):
+    """
+    Opt-in memoization of the prerequisite checks executed by the decorators, for the duration of a run
+    All memoized results are dropped as soon as a decorated (mutating) function has succeeded
+    When use_snapshot is set, the checks validate against a ClusterSnapshot instead of querying the model object per object
+    Usage:
+        with ValidationContext(use_snapshot=True):
+            # decorated setup calls
+    """
+    _active = None
+    _lock = Lock()
+
+    def __init__(self, use_snapshot=False):
+        self._results = {}
+        self._snapshot = None
+        self._generation = 0  # Bumped by every invalidation
+        self.use_snapshot = use_snapshot
+        self.statistics = {'hits': 0, 'misses': 0, 'invalidations': 0, 'snapshots': 0, 'stale': 0}
+
+    def __enter__(self):
+        with ValidationContext._lock:
+            if ValidationContext._active is not None:
+                raise RuntimeError('A validation context is already active')
+            ValidationContext._active = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with ValidationContext._lock:
+            ValidationContext._active = None
+        LOGGER.debug('Validation context statistics: {0}'.format(self.statistics))
+
+    @classmethod
+    def memoize(cls, check, *args, **kwargs):
+        """
+        Execute a check, or return its memoized result when a context is active
+        Raised exceptions are never memoized. Neither are results of checks which started before an invalidation
+        happened concurrently (eg by a parallel setup step), as they might describe the cluster before the change
+        :param check: check to execute
+        :type check: callable
+        :return: result of the check
+        """
+        context = cls._active
+        if context is None:
+            return check(*args, **kwargs)
+        key = (getattr(check, '__module__', None), getattr(check, '__name__', repr(check)),
+               json.dumps([args, kwargs], sort_keys=True, default=repr))
+        with cls._lock:
+            if key in context._results:
+                context.statistics['hits'] += 1
+                return cls._copy(context._results[key])
+            generation = context._generation
+        result = check(*args, **kwargs)
+        with cls._lock:
+            context.statistics['misses'] += 1
+            if generation == context._generation:
+                context._results[key] = cls._copy(result)
+            else:
+                context.statistics['stale'] += 1
+        return result
+
+    @staticmethod
+    def _copy(result):
+        # Callers are allowed to alter returned collections, DAL objects are returned as is
+        if isinstance(result, (dict, list, set)):
+            return copy.deepcopy(result)
+        return result
+
+    @classmethod
+    def get_snapshot(cls):
+        """
+        Fetch the snapshot of the active context, loading it when required
+        :return: the snapshot or None when no context is active or the context does not use snapshots
+        :rtype: ci.api_lib.helpers.snapshot.ClusterSnapshot
+        """
+        context = cls._active
+        if context is None or context.use_snapshot is False:
+            return None
+        with cls._lock:
+            if context._snapshot is None:
+                context.statistics['snapshots'] += 1
+                context._snapshot = ClusterSnapshot.load()
+            return context._snapshot
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop all memoized results of the active context
+        :return: None
+        """
+        context = cls._active
+        if context is None:
+            return
+        with cls._lock:
+            context.statistics['invalidations'] += 1
+            context._generation += 1
+            context._results.clear()
+            context._snapshot = None
+
+
+def _list_arakoon_clusters():
+    return list(Configuration.list('ovs/arakoon'))
+
+
+def _dir_exists(storagerouter_ip, directory):
+    with SSHClientPool.checkout(storagerouter_ip, username='root') as client:
+        return client.dir_exists(directory)
+
+
+def _execute(func, *args, **kwargs):
+    """
+    Execute a decorated function and invalidate the memoized checks when it succeeded, as it probably changed the cluster
+    """
+    result = func(*args, **kwargs)
+    ValidationContext.invalidate()
+    return result
+
+
 def required_roles(roles, location="GLOBAL"):
     """
     Decorator that checks if the required roles are available on the cluster or on a local storagerouter
@@ -44,16 +165,17 @@ def required_roles(roles, location="GLOBAL"):
             if location in LOCATION_OPTIONS:
                 if location == "GLOBAL":
                     # check on cluster if roles are available
-                    RoleValidation.check_required_roles(roles)
+                    ValidationContext.memoize(RoleValidation.check_required_roles, roles, snapshot=ValidationContext.get_snapshot())
                 else:
                     # check on certain node if roles are available
-                    RoleValidation.check_required_roles(roles, kwargs['storagerouter_ip'], "LOCAL")
+                    ValidationContext.memoize(RoleValidation.check_required_roles, roles, kwargs['storagerouter_ip'], "LOCAL",
+                                              snapshot=ValidationContext.get_snapshot())
             else:
                 error_msg = "Chosen location `{0}` does not exists! It should be one of these options `{1}`"\
                     .format(location, LOCATION_OPTIONS)
                 LOGGER.error(error_msg)
                 raise RuntimeError(error_msg)
-            return func(*args, **kwargs)
+            return _execute(func, *args, **kwargs)
         return validate
     return validate_required_roles
 
@@ -70,16 +192,16 @@ def required_backend(func):
         # check if alba backend exists or not
         if type(kwargs['albabackend_name']) == list:
             for albabackend in kwargs['albabackend_name']:
-                BackendHelper.get_albabackend_by_name(albabackend)
+                ValidationContext.memoize(BackendHelper.get_albabackend_by_name, albabackend)
         elif type(kwargs['albabackend_name']) == str or type(kwargs['albabackend_name']) == unicode:
-            BackendHelper.get_albabackend_by_name(kwargs['albabackend_name'])
+            ValidationContext.memoize(BackendHelper.get_albabackend_by_name, kwargs['albabackend_name'])
         else:
             error_msg = "Type `{0}` is not supported to check the required backend(s)"\
                 .format(type(kwargs['albabackend_name']))
             LOGGER.error(error_msg)
             raise TypeError(error_msg)
 
-        return func(*args, **kwargs)
+        return _execute(func, *args, **kwargs)
     return validate
 
 
@@ -94,9 +216,8 @@ def required_cluster_basedir(func):
     def validate(*args, **kwargs):
         # check if alba backend exists or not
         if kwargs['cluster_basedir'] and kwargs['storagerouter_ip']:
-            client = SSHClient(kwargs['storagerouter_ip'], username='root')
-            if client.dir_exists(kwargs['cluster_basedir']):
-                return func(*args, **kwargs)
+            if ValidationContext.memoize(_dir_exists, kwargs['storagerouter_ip'], kwargs['cluster_basedir']):
+                return _execute(func, *args, **kwargs)
             else:
                 raise DirectoryNotFoundError("Required base_dir `{0}` not found on storagerouter `{1}`"
                                              .format(kwargs['cluster_basedir'], kwargs['storagerouter_ip']))
@@ -117,8 +238,8 @@ def required_arakoon_cluster(func):
     def validate(*args, **kwargs):
         # check if arakoon cluster exists or not
         if kwargs['cluster_name']:
-            if kwargs['cluster_name'] in list(Configuration.list('ovs/arakoon')):
-                return func(*args, **kwargs)
+            if kwargs['cluster_name'] in ValidationContext.memoize(_list_arakoon_clusters):
+                return _execute(func, *args, **kwargs)
             else:
                 raise ArakoonClusterNotFoundError("Arakoon cluster does not exists: {0}".format(kwargs['cluster_name']))
         else:
@@ -138,11 +259,11 @@ def required_preset(func):
     def validate(*args, **kwargs):
         # check if preset exists or not on existing alba backend
         if kwargs['albabackend_name'] and kwargs['preset_name']:
-            BackendHelper.get_preset_by_albabackend(kwargs['preset_name'], kwargs['albabackend_name'])
+            ValidationContext.memoize(BackendHelper.get_preset_by_albabackend, kwargs['preset_name'], kwargs['albabackend_name'])
         else:
             raise AttributeError("Missing parameter: albabackend_name or preset_name")
 
-        return func(*args, **kwargs)
+        return _execute(func, *args, **kwargs)
     return validate
 
 
@@ -163,7 +284,7 @@ def required_vdisk(func):
         else:
             raise AttributeError("Missing parameter: vdisk_name or vpool_name")
 
-        return func(*args, **kwargs)
+        return _execute(func, *args, **kwargs)
     return validate
 
 
@@ -186,7 +307,7 @@ def required_vtemplate(func):
         else:
             raise AttributeError("Missing parameter: vdisk_name or vpool_name")
 
-        return func(*args, **kwargs)
+        return _execute(func, *args, **kwargs)
     return validate
 
 
@@ -207,7 +328,7 @@ def required_snapshot(func):
             else:
                 raise AttributeError("Missing parameter: snapshot_id, vpool_name or vdisk_name")
 
-        return func(*args, **kwargs)
+        return _execute(func, *args, **kwargs)
     return validate
 
 
@@ -222,9 +343,11 @@ def check_vpool(func):
     def validate(*args, **kwargs):
         # if the vpool is not yet created, return the function
         if 'storagerouter_ip' in kwargs and 'vpool_name' in kwargs:
-            if not VPoolValidation.check_vpool_on_storagerouter(storagerouter_ip=kwargs['storagerouter_ip'],
-                                                                vpool_name=kwargs['vpool_name']):
-                return func(*args, **kwargs)
+            if not ValidationContext.memoize(VPoolValidation.check_vpool_on_storagerouter,
+                                             storagerouter_ip=kwargs['storagerouter_ip'],
+                                             vpool_name=kwargs['vpool_name'],
+                                             snapshot=ValidationContext.get_snapshot()):
+                return _execute(func, *args, **kwargs)
             else:
                 return
         else:
@@ -243,9 +366,11 @@ def check_linked_backend(func):
     def validate(*args, **kwargs):
         # if the vpool is not yet created, return the function
         if 'albabackend_name' in kwargs and 'globalbackend_name' in kwargs:
-            if not BackendValidation.check_linked_backend(albabackend_name=kwargs['albabackend_name'],
-                                                          globalbackend_name=kwargs['globalbackend_name']):
-                return func(*args, **kwargs)
+            if not ValidationContext.memoize(BackendValidation.check_linked_backend,
+                                             albabackend_name=kwargs['albabackend_name'],
+                                             globalbackend_name=kwargs['globalbackend_name'],
+                                             snapshot=ValidationContext.get_snapshot()):
+                return _execute(func, *args, **kwargs)
             else:
                 return
         else:
@@ -265,12 +390,12 @@ def filter_osds(func):
         # if the vpool is not yet created, return the function
         if 'target' in kwargs and 'disks' in kwargs:
             LOGGER.info("Starting to filtering the following disks: {0}".format(kwargs['disks']))
-            disks = BackendValidation.check_available_osds_on_asdmanager(ip=kwargs['target'], disks=kwargs['disks'])
+            disks = ValidationContext.memoize(BackendValidation.check_available_osds_on_asdmanager, ip=kwargs['target'], disks=kwargs['disks'])
             # if no disks are available anymore skip the wrapped func
             if len(disks.keys()) != 0:
                 LOGGER.info("Filtered the osds from {0} to {1}".format(kwargs['disks'], disks))
                 kwargs['disks'] = disks
-                return func(*args, **kwargs)
+                return _execute(func, *args, **kwargs)
             else:
                 LOGGER.error("Skipped wrapped function after filtering osds list, because its empty: {0}".format(disks))
                 return
@@ -289,9 +414,10 @@ def check_role_on_disk(func):
 
     def validate(*args, **kwargs):
         if kwargs['storagerouter_ip'] and kwargs['roles'] and kwargs['diskname']:
-            if not RoleValidation.check_role_on_disk(kwargs['roles'], kwargs['storagerouter_ip'], kwargs['diskname']):
+            if not ValidationContext.memoize(RoleValidation.check_role_on_disk, kwargs['roles'], kwargs['storagerouter_ip'], kwargs['diskname'],
+                                             snapshot=ValidationContext.get_snapshot()):
                 # if the disk is not yet initialized with the required role execute the method
-                return func(*args, **kwargs)
+                return _execute(func, *args, **kwargs)
             else:
                 return
         else:
@@ -309,9 +435,9 @@ def check_backend(func):
 
     def validate(*args, **kwargs):
         if kwargs['backend_name']:
-            if not BackendValidation.check_backend(kwargs['backend_name']):
+            if not ValidationContext.memoize(BackendValidation.check_backend, kwargs['backend_name'], snapshot=ValidationContext.get_snapshot()):
                 # if the backend is not yet created, create it
-                return func(*args, **kwargs)
+                return _execute(func, *args, **kwargs)
             else:
                 return
         else:
@@ -329,10 +455,12 @@ def check_preset(func):
 
     def validate(*args, **kwargs):
         if kwargs['albabackend_name'] and kwargs['preset_details']:
-            if not BackendValidation.check_preset_on_backend(preset_name=kwargs['preset_details']['name'],
-                                                             albabackend_name=kwargs['albabackend_name']):
+            if not ValidationContext.memoize(BackendValidation.check_preset_on_backend,
+                                             preset_name=kwargs['preset_details']['name'],
+                                             albabackend_name=kwargs['albabackend_name'],
+                                             snapshot=ValidationContext.get_snapshot()):
                 # if the preset is not yet created, create it
-                return func(*args, **kwargs)
+                return _execute(func, *args, **kwargs)
             else:
                 return
         else:
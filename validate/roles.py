@@ -26,7 +26,7 @@ class RoleValidation(object):
         pass
 
     @staticmethod
-    def check_required_roles(roles, storagerouter_ip=None, location="GLOBAL"):
+    def check_required_roles(roles, storagerouter_ip=None, location="GLOBAL", snapshot=None):
         """
         Check if the required roles are satisfied
 
@@ -38,26 +38,23 @@ class RoleValidation(object):
             * GLOBAL: checks the whole cluster if certain roles are available
             * LOCAL: checks the local storagerouter if certain roles are available
         :type location: str
+        :param snapshot: snapshot of the cluster to validate against instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
         :return: None
         """
         # fetch availabe roles
+        storagerouter_guid = None
         if location == "LOCAL":
             # LOCAL
-            storagerouter_guid = StoragerouterHelper.get_storagerouter_by_ip(storagerouter_ip).guid
-
-            available_roles = DiskHelper.get_roles_from_disks(storagerouter_guid=storagerouter_guid)
-        else:
-            # GLOBAL
-            available_roles = DiskHelper.get_roles_from_disks()
+            storagerouter_guid = StoragerouterHelper.get_storagerouter_guid_by_ip(storagerouter_ip, snapshot=snapshot)
+        # else GLOBAL
 
         # check if required roles are satisfied
-        req_roles = list(roles)
-        for disk_roles in available_roles:
-            for role in roles:
-                if role in disk_roles:
-                    # delete role in required roles if still exists
-                    if role in req_roles:  # never gonna give you up...
-                        req_roles.remove(role)
+        if snapshot is not None:
+            available_roles = set(role for disk_roles in snapshot.get_roles_from_disks(storagerouter_guid=storagerouter_guid) for role in disk_roles)
+            req_roles = [role for role in roles if role not in available_roles]
+        else:
+            req_roles = DiskHelper.get_role_inventory().get_missing_roles(roles, storagerouter_guid=storagerouter_guid)
 
         if len(req_roles) != 0:
             error_msg = "Some required roles are missing `{0}` with location option `{1}`".format(req_roles, location)
@@ -72,7 +69,7 @@ class RoleValidation(object):
             return
 
     @staticmethod
-    def check_role_on_disk(roles, storagerouter_ip, disk_name):
+    def check_role_on_disk(roles, storagerouter_ip, disk_name, snapshot=None):
         """
         Check if a certain role(s) is available on a certain disk
         :param roles: roles that should or should not be on a disk
@@ -81,8 +78,12 @@ class RoleValidation(object):
         :type storagerouter_ip: str
         :param disk_name: name of a certain disk on the given storagerouter
         :type disk_name: str
+        :param snapshot: snapshot of the cluster to validate against instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
         :return: if available on disk
         :rtype: bool
         """
-        storagerouter_guid = StoragerouterHelper.get_storagerouter_by_ip(storagerouter_ip).guid
-        return len(set(roles).difference(set(DiskHelper.get_roles_from_disk(storagerouter_guid, disk_name)))) == 0
+        storagerouter_guid = StoragerouterHelper.get_storagerouter_guid_by_ip(storagerouter_ip, snapshot=snapshot)
+        if snapshot is not None:
+            return len(set(roles).difference(set(snapshot.get_roles_from_disk(storagerouter_guid, disk_name)))) == 0
+        return DiskHelper.check_roles_on_disk(roles, storagerouter_guid, disk_name)
@@ -0,0 +1,502 @@
+# Copyright (C) 2016 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+import re
+import json
+from threading import Lock
+from ovs.extensions.generic.logger import Logger
+from ..helpers.lazy import LazyImport
+
+AlbaBackend = LazyImport('ovs.dal.hybrids.albabackend', 'AlbaBackend')
+DiskPartition = LazyImport('ovs.dal.hybrids.diskpartition', 'DiskPartition')
+StorageDriverClient = LazyImport('ovs.extensions.storageserver.storagedriver', 'StorageDriverClient')
+Toolbox = LazyImport('ovs.lib.helpers.toolbox', 'Toolbox')
+
+_REGEX_TYPE = type(re.compile(''))
+_ACCEPTED_TYPES = {str: basestring, int: (int, long), float: (int, long, float)}
+
+
+class SchemaNode(object):
+    """
+    Part of a schema. Nodes are compiled once into a validator function: validator(value, path, errors)
+    The validator appends a message to errors for every problem found, so a whole document is validated in one pass
+    """
+
+    def __init__(self, mandatory=True):
+        """
+        :param mandatory: a mapping holding this node should contain its key
+        :type mandatory: bool
+        """
+        self.mandatory = mandatory
+        self._validator = None
+        self._lock = Lock()
+
+    def _compile(self):
+        raise NotImplementedError()
+
+    def get_validator(self):
+        """
+        Compile the node, the first time it is used
+        :return: validator function
+        :rtype: callable
+        """
+        if self._validator is None:
+            with self._lock:
+                if self._validator is None:
+                    self._validator = self._compile()
+        return self._validator
+
+    def get_errors(self, value, path=''):
+        """
+        Validate a value
+        :param value: value to validate
+        :param path: path of the value, used in the error messages
+        :type path: str
+        :return: all errors found
+        :rtype: list
+        """
+        errors = []
+        self.get_validator()(value, path, errors)
+        return errors
+
+    def validate(self, value, path=''):
+        """
+        Validate a value
+        :param value: value to validate
+        :param path: path of the value, used in the error messages
+        :type path: str
+        :raises RuntimeError: when the value is invalid, listing all errors
+        :return: None
+        """
+        errors = self.get_errors(value, path)
+        if len(errors) > 0:
+            raise RuntimeError('\n' + '\n'.join(errors))
+
+
+class Field(SchemaNode):
+    """
+    Single value, described by a tuple (type, expected value, mandatory) as used by ExtensionsToolbox.verify_required_params
+    The expected value can be None, a regex, a list of allowed values, a dict with 'min' and/or 'max' or a literal string
+    Enumerators of the DAL (dict subclasses, eg DiskPartition.ROLES) are handled as a list of allowed values
+    For lists, the regex or allowed values apply to every entry
+    """
+
+    def __init__(self, key_info):
+        """
+        :param key_info: (type, expected value) or (type, expected value, mandatory)
+        :type key_info: tuple
+        """
+        super(Field, self).__init__(mandatory=len(key_info) < 3 or key_info[2] is not False)
+        self.expected_type = key_info[0]
+        self.expected_value = key_info[1]
+
+    def _compile_check(self):
+        # Returns a function returning an error message for invalid values, None for valid ones
+        expected_type = self.expected_type
+        expected_value = self.expected_value
+        if expected_value is None:
+            return None
+        if isinstance(expected_value, dict) and type(expected_value) is not dict:
+            expected_value = list(expected_value)  # DataObject.enumerator, its keys are the allowed values
+        if isinstance(expected_value, (_REGEX_TYPE, basestring)) and expected_type != str and expected_type != list:
+            raise ValueError('A regex or literal can only be expected of a str or a list, not of {0}'.format(expected_type))
+        if isinstance(expected_value, _REGEX_TYPE):
+            pattern = expected_value.pattern
+            if expected_type == list:
+                return lambda value: None if all(isinstance(entry, basestring) and expected_value.match(entry) for entry in value) else \
+                    'entries of {0} should match regex "{1}"'.format(value, pattern)
+            return lambda value: None if expected_value.match(value) else 'value "{0}" does not match regex "{1}"'.format(value, pattern)
+        if isinstance(expected_value, list):
+            try:
+                allowed = frozenset(expected_value)
+            except TypeError:
+                allowed = list(expected_value)
+            if expected_type == list:
+                return lambda value: None if all(entry in allowed for entry in value) else \
+                    'entries of {0} should be one of {1}'.format(value, sorted(expected_value))
+            return lambda value: None if value in allowed else 'value "{0}" should be one of {1}'.format(value, sorted(expected_value))
+        if isinstance(expected_value, dict):
+            minimum = expected_value.get('min')
+            maximum = expected_value.get('max')
+            return lambda value: 'value {0} should be at least {1}'.format(value, minimum) if minimum is not None and value < minimum else \
+                'value {0} should be at most {1}'.format(value, maximum) if maximum is not None and value > maximum else None
+        if isinstance(expected_value, basestring):
+            return lambda value: None if value == expected_value else 'value "{0}" should be "{1}"'.format(value, expected_value)
+        raise ValueError('Unsupported expected value {0}'.format(expected_value))
+
+    def _compile(self):
+        accepted_types = _ACCEPTED_TYPES.get(self.expected_type, self.expected_type)
+        type_name = self.expected_type.__name__
+        check = self._compile_check()
+
+        def _validate(value, path, errors):
+            if not isinstance(value, accepted_types) or (isinstance(value, bool) and self.expected_type in (int, float)):
+                errors.append('{0}: is of type "{1}" but we expected type "{2}"'.format(path, type(value).__name__, type_name))
+                return
+            if check is not None:
+                message = check(value)
+                if message is not None:
+                    errors.append('{0}: {1}'.format(path, message))
+        return _validate
+
+
+class Mapping(SchemaNode):
+    """
+    Dict with known keys (fields) and/or arbitrary keys (eg ips or names) of which the keys and values follow a schema
+    """
+
+    def __init__(self, fields=None, keys=None, values=None, extra=True, mandatory=True):
+        """
+        :param fields: schema per known key. Tuples are converted into a Field
+        :type fields: dict
+        :param keys: schema of the other keys
+        :type keys: SchemaNode or tuple
+        :param values: schema of the values of the other keys
+        :type values: SchemaNode or tuple
+        :param extra: allow keys which are not in fields when neither keys nor values are given
+        :type extra: bool
+        :param mandatory: a mapping holding this node should contain its key
+        :type mandatory: bool
+        """
+        super(Mapping, self).__init__(mandatory=mandatory)
+        self.fields = dict((key, to_node(schema)) for key, schema in (fields or {}).iteritems())
+        self.keys = to_node(keys)
+        self.values = to_node(values)
+        self.extra = extra
+
+    def _compile(self):
+        fields = [(key, node.get_validator(), node.mandatory) for key, node in self.fields.iteritems()]
+        known_keys = frozenset(self.fields)
+        key_validator = None if self.keys is None else self.keys.get_validator()
+        value_validator = None if self.values is None else self.values.get_validator()
+        check_other_keys = key_validator is not None or value_validator is not None or self.extra is False
+
+        def _validate(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append('{0}: is of type "{1}" but we expected type "dict"'.format(path, type(value).__name__))
+                return
+            for key, validator, mandatory in fields:
+                item = value.get(key)
+                if item is None or item == '':
+                    if mandatory is True:
+                        errors.append('{0}/{1}: missing mandatory key'.format(path, key))
+                    continue
+                validator(item, '{0}/{1}'.format(path, key), errors)
+            if check_other_keys is False:
+                return
+            for key, item in value.iteritems():
+                if key in known_keys:
+                    continue
+                item_path = '{0}/{1}'.format(path, key)
+                if key_validator is None and value_validator is None:
+                    errors.append('{0}: unsupported key'.format(item_path))
+                    continue
+                if key_validator is not None:
+                    key_validator(key, item_path, errors)
+                if value_validator is not None:
+                    value_validator(item, item_path, errors)
+        return _validate
+
+
+class Sequence(SchemaNode):
+    """
+    List of which all entries follow a schema
+    """
+
+    def __init__(self, items, mandatory=True):
+        """
+        :param items: schema of the entries
+        :type items: SchemaNode or tuple
+        :param mandatory: a mapping holding this node should contain its key
+        :type mandatory: bool
+        """
+        super(Sequence, self).__init__(mandatory=mandatory)
+        self.items = to_node(items)
+
+    def _compile(self):
+        item_validator = self.items.get_validator()
+
+        def _validate(value, path, errors):
+            if not isinstance(value, list):
+                errors.append('{0}: is of type "{1}" but we expected type "list"'.format(path, type(value).__name__))
+                return
+            for index, item in enumerate(value):
+                item_validator(item, '{0}/{1}'.format(path, index), errors)
+        return _validate
+
+
+class Check(SchemaNode):
+    """
+    Value validated by a function returning a list of error messages
+    """
+
+    def __init__(self, function, mandatory=True):
+        """
+        :param function: function returning the problems with the value it is given
+        :type function: callable
+        :param mandatory: a mapping holding this node should contain its key
+        :type mandatory: bool
+        """
+        super(Check, self).__init__(mandatory=mandatory)
+        self.function = function
+
+    def _compile(self):
+        function = self.function
+
+        def _validate(value, path, errors):
+            errors.extend('{0}: {1}'.format(path, message) for message in function(value))
+        return _validate
+
+
+def to_node(schema):
+    """
+    :param schema: schema node, or tuple describing a Field
+    :return: schema node
+    :rtype: SchemaNode
+    """
+    if schema is None or isinstance(schema, SchemaNode):
+        return schema
+    if isinstance(schema, tuple):
+        return Field(schema)
+    raise ValueError('Unsupported schema {0}'.format(schema))
+
+
+class SetupSchema(object):
+    """
+    Schema of setup.json. The schema is compiled once, after which a document is validated in a single pass
+    Besides the structure, references between the sections are checked (domains, backends and presets in use should be modelled)
+    """
+    LOGGER = Logger('validate-ci_setup_schema')
+    COMPRESSIONS = ['snappy', 'bz2', 'none']
+    ENCRYPTIONS = ['aes-cbc-256', 'aes-ctr-256', 'none']
+    CACHE_LOCATIONS = ['disk', 'backend']
+
+    _schema = None
+    _lock = Lock()
+
+    @staticmethod
+    def get_policy_errors(policy):
+        """
+        Check a single policy [k, c, m, x]
+        :param policy: policy to check
+        :type policy: list
+        :return: problems with the policy
+        :rtype: list
+        """
+        if not isinstance(policy, list) or len(policy) != 4:
+            return ['Policy {0} must be of type list with length = 4'.format(policy)]
+        if not all(isinstance(entry, (int, long)) and not isinstance(entry, bool) for entry in policy):
+            return ['All entries of policy {0} should be integers'.format(policy)]
+        k, c, m, x = policy
+        errors = []
+        if k > c:
+            errors.append('Invalid policy {0}: k({1}) < c({2}) is required'.format(policy, k, c))
+        if c > k + m:
+            errors.append('Invalid policy {0}: c({1}) < k + m ({2} + {3}) is required'.format(policy, c, k, m))
+        for name, value in [('k', k), ('c', c), ('x', x)]:
+            if value == 0:
+                errors.append('Invalid policy {0}: {1} cannot be equal to zero'.format(policy, name))
+        return errors
+
+    @classmethod
+    def _build(cls):
+        cache = Mapping({'location': (str, cls.CACHE_LOCATIONS, True),
+                         'strategy': Mapping({'cache_on_read': (bool, None, True),
+                                              'cache_on_write': (bool, None, True)}),
+                         'backend': Mapping({'name': (str, None, True),
+                                             'preset': (str, None, True)}, mandatory=False)}, mandatory=False)
+        storagedriver = Mapping({'sco_size': (int, StorageDriverClient.TLOG_MULTIPLIER_MAP.keys()),
+                                 'cluster_size': (int, StorageDriverClient.CLUSTER_SIZES),
+                                 'volume_write_buffer': (int, {'min': 128, 'max': 10240}),
+                                 'global_write_buffer': (int, {'min': 128}),
+                                 'global_read_buffer': (int, {'min': 128, 'max': 10240}, False),
+                                 'strategy': (str, None, False),
+                                 'deduplication': (str, None, False),
+                                 'dtl_transport': (str, StorageDriverClient.VPOOL_DTL_TRANSPORT_MAP.keys()),
+                                 'dtl_mode': (str, StorageDriverClient.VPOOL_DTL_MODE_MAP.keys()),
+                                 'volume_manager': (dict, None, False),
+                                 'backend_connection_manager': (dict, None, False)})
+        vpool = Mapping({'backend_name': (str, None, True),
+                         'preset': (str, None, True),
+                         'storage_ip': (str, Toolbox.regex_ip, True),
+                         'proxies': (int, {'min': 1}, False),
+                         'mds_safety': (int, {'min': 1}, False),
+                         'fragment_cache': cache,
+                         'block_cache': cache,
+                         'storagedriver': storagedriver,
+                         'vdisks': Mapping(values=(int, {'min': 1}, True), mandatory=False)})
+        storagerouter = Mapping({'hostname': (str, None, False),
+                                 'domains': Mapping({'domain_guids': (list, None, False),
+                                                     'recovery_domain_guids': (list, None, False)}, mandatory=False),
+                                 'disks': Mapping(values=Mapping({'roles': (list, list(DiskPartition.ROLES), True)}), mandatory=False),
+                                 'vpools': Mapping(values=vpool, mandatory=False)})
+        preset = Mapping({'name': (str, Toolbox.regex_preset, True),
+                          'compression': (str, cls.COMPRESSIONS, True),
+                          'encryption': (str, cls.ENCRYPTIONS, True),
+                          'fragment_size': (int, {'min': 16, 'max': 1024 ** 3}, True),
+                          'policies': Sequence(Check(cls.get_policy_errors))})
+        backend = Mapping({'name': (str, Toolbox.regex_backend, True),
+                           'scaling': (str, list(AlbaBackend.SCALINGS), False),
+                           'domains': Mapping({'domain_guids': (list, None, False)}, mandatory=False),
+                           'presets': Sequence(preset, mandatory=False),
+                           'osds': (dict, None, False),
+                           'external_arakoon': Mapping(keys=(str, Toolbox.regex_ip, True),
+                                                       values=Mapping(values=Mapping({'base_dir': (str, None, True),
+                                                                                      'type': (str, None, True)})), mandatory=False)})
+        credentials = {'user': (str, None, True), 'password': (str, None, True), 'type': (str, None, True)}
+        login = Mapping({'username': (str, None, True), 'password': (str, None, True)}, mandatory=False)
+        hypervisor_fields = dict(credentials, ip=(str, Toolbox.regex_ip, True),
+                                 vms=Mapping(keys=(str, Toolbox.regex_ip, True), values=Mapping({'name': (str, None, True),
+                                                                                                 'role': (str, None, True)})))
+        ci = Mapping({'setup': (bool, None, False),
+                      'grid_ip': (str, Toolbox.regex_ip, True),
+                      'validation': (bool, None, False),
+                      'cleanup': (bool, None, False),
+                      'send_to_testrail': (bool, None, False),
+                      'fail_on_failed_scenario': (bool, None, False),
+                      'scenarios': (bool, None, False),
+                      'scenario_retries': (int, {'min': 1}, False),
+                      'version': (str, None, False),
+                      'config_manager': (str, None, False),
+                      'local_hypervisor': Mapping(credentials, mandatory=False),
+                      'hypervisor': Mapping(hypervisor_fields, mandatory=False),
+                      'user': Mapping({'shell': login, 'api': login}, mandatory=False)}, mandatory=False)
+        setup = Mapping({'domains': Sequence((str, None, True), mandatory=False),
+                         'storagerouters': Mapping(keys=(str, Toolbox.regex_ip, True), values=storagerouter, mandatory=False),
+                         'backends': Sequence(backend, mandatory=False)}, mandatory=False)
+        return Mapping({'ci': ci,
+                        'scenarios': (list, None, False),
+                        'setup': setup})
+
+    @classmethod
+    def get_schema(cls):
+        """
+        Build and compile the schema, the first time it is used
+        :return: schema of setup.json
+        :rtype: Mapping
+        """
+        if cls._schema is None:
+            with cls._lock:
+                if cls._schema is None:
+                    schema = cls._build()
+                    schema.get_validator()
+                    cls._schema = schema
+        return cls._schema
+
+    @staticmethod
+    def _get_reference_errors(setup):
+        errors = []
+        if not isinstance(setup, dict):
+            return errors
+        domains = set(setup.get('domains') or [])
+        backends = dict((backend.get('name'), backend) for backend in setup.get('backends') or [] if isinstance(backend, dict))
+        presets = dict((name, set(preset.get('name') for preset in backend.get('presets') or [] if isinstance(preset, dict)))
+                       for name, backend in backends.iteritems())
+
+        def _check_domains(path, domain_names):
+            for domain_name in domain_names or []:
+                if domain_name not in domains:
+                    errors.append('{0}: unknown domain "{1}"'.format(path, domain_name))
+
+        def _check_preset(path, backend_name, preset_name):
+            if backend_name not in backends:
+                errors.append('{0}: unknown backend "{1}"'.format(path, backend_name))
+            elif preset_name not in presets[backend_name]:
+                errors.append('{0}: unknown preset "{1}" of backend "{2}"'.format(path, preset_name, backend_name))
+
+        for index, backend in enumerate(setup.get('backends') or []):
+            if not isinstance(backend, dict):
+                continue
+            path = 'setup/backends/{0}'.format(index)
+            _check_domains('{0}/domains'.format(path), (backend.get('domains') or {}).get('domain_guids'))
+            osds = backend.get('osds') or {}
+            if not isinstance(osds, dict):
+                continue
+            for identifier, details in osds.iteritems():
+                osd_path = '{0}/osds/{1}'.format(path, identifier)
+                if backend.get('scaling', 'LOCAL') == 'LOCAL':
+                    # Identifier is the ip of an asd manager, details the amount of asds per disk
+                    if not Toolbox.regex_ip.match(identifier):
+                        errors.append('{0}: "{1}" is not an ip'.format(osd_path, identifier))
+                    if not isinstance(details, dict) or not all(isinstance(amount, (int, long)) for amount in details.itervalues()):
+                        errors.append('{0}: should map disk names onto an amount of asds'.format(osd_path))
+                else:
+                    # Identifier is the name of the linked backend, details its preset
+                    _check_preset(osd_path, identifier, details)
+        for storagerouter_ip, storagerouter in (setup.get('storagerouters') or {}).iteritems():
+            if not isinstance(storagerouter, dict):
+                continue
+            path = 'setup/storagerouters/{0}'.format(storagerouter_ip)
+            domain_details = storagerouter.get('domains') or {}
+            _check_domains('{0}/domains'.format(path), domain_details.get('domain_guids'))
+            _check_domains('{0}/domains'.format(path), domain_details.get('recovery_domain_guids'))
+            for vpool_name, vpool in (storagerouter.get('vpools') or {}).iteritems():
+                if not isinstance(vpool, dict):
+                    continue
+                vpool_path = '{0}/vpools/{1}'.format(path, vpool_name)
+                _check_preset(vpool_path, vpool.get('backend_name'), vpool.get('preset'))
+                for cache_type in ['fragment_cache', 'block_cache']:
+                    cache = vpool.get(cache_type) or {}
+                    if cache.get('location') == 'backend':
+                        cache_backend = cache.get('backend') or {}
+                        if len(cache_backend) == 0:
+                            errors.append('{0}/{1}: a backend is required for location "backend"'.format(vpool_path, cache_type))
+                        else:
+                            _check_preset('{0}/{1}/backend'.format(vpool_path, cache_type), cache_backend.get('name'), cache_backend.get('preset'))
+        return errors
+
+    @classmethod
+    def get_errors(cls, config):
+        """
+        Validate a complete setup.json document
+        :param config: contents of setup.json
+        :type config: dict
+        :return: all problems found
+        :rtype: list
+        """
+        errors = cls.get_schema().get_errors(config)
+        if isinstance(config, dict):
+            errors.extend(cls._get_reference_errors(config.get('setup')))
+        return errors
+
+    @classmethod
+    def validate(cls, config):
+        """
+        Validate a complete setup.json document
+        :param config: contents of setup.json
+        :type config: dict
+        :raises RuntimeError: when the document is invalid, listing all problems
+        :return: None
+        """
+        errors = cls.get_errors(config)
+        if len(errors) > 0:
+            cls.LOGGER.error('setup.json contains {0} error(s)'.format(len(errors)))
+            raise RuntimeError('\n' + '\n'.join(errors))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load and validate a setup.json file
+        :param path: location of the file
+        :type path: str
+        :raises RuntimeError: when the document is invalid, listing all problems
+        :return: contents of the file
+        :rtype: dict
+        """
+        with open(path, 'r') as config_file:
+            config = json.load(config_file)
+        cls.validate(config)
+        return config
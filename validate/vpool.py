@@ -26,7 +26,7 @@ class VPoolValidation(object):
         pass
 
     @staticmethod
-    def check_vpool_on_storagerouter(storagerouter_ip, vpool_name):
+    def check_vpool_on_storagerouter(storagerouter_ip, vpool_name, snapshot=None):
         """
         Check if the required roles are satisfied
 
@@ -34,14 +34,18 @@ class VPoolValidation(object):
         :type storagerouter_ip: str
         :param vpool_name: name of a vpool
         :type vpool_name: str
+        :param snapshot: snapshot of the cluster to validate against instead of querying the model
+        :type snapshot: ci.api_lib.helpers.snapshot.ClusterSnapshot
         :return: is vpool available? True = YES, False = NO
         :rtype: bool
         """
+        storagerouter_guid = StoragerouterHelper.get_storagerouter_guid_by_ip(storagerouter_ip, snapshot=snapshot)
+        if snapshot is not None:
+            return any(vpool_name in storagedriver['name'] for storagedriver in snapshot.get_storagedrivers_by_storagerouter(storagerouter_guid))
 
-        storagerouter = StoragerouterHelper.get_storagerouter_by_ip(storagerouter_ip)
         try:
             return next(True for storagedriver in
-                        StoragedriverHelper.get_storagedrivers_by_storagerouterguid(storagerouter.guid)
+                        StoragedriverHelper.get_storagedrivers_by_storagerouterguid(storagerouter_guid)
                         if vpool_name in storagedriver.name)
         except StopIteration:
             return False